@@ -2,31 +2,21 @@
 Sub_crypto Module
 
 This module provides cryptographic functions for hashing data using SHA-256.
-It includes a function to generate a SHA-256 hash of a given input string.
+The implementations live in sub_hashing; they are re-exported here so existing
+imports keep working.
 
 Functions:
     generate_sha256_hash(input_string): Generates a SHA-256 hash of the input string.
-"""
-
-import hashlib
-import logging
+    hash_file(path, algorithm, chunk_size): Streams a file through a hash.
+    get_file_hash_service(): Returns the process-wide FileHashService.
 
-def generate_sha256_hash(input_string):
-    """
-    Generates a SHA-256 hash of the input string.
+Classes:
+    FileHashService: Parallel, cached file hashing with a verify mode.
+"""
 
-    Args:
-        input_string (str): The string to be hashed.
+from sub_hashing import generate_sha256_hash, hash_file, FileHashService, get_file_hash_service
 
-    Returns:
-        str: The SHA-256 hash of the input string, or None if an error occurs.
-    """
-    try:
-        sha256_hash = hashlib.sha256(input_string.encode()).hexdigest()
-        return sha256_hash
-    except Exception as e:
-        logging.error(f"Error generating SHA-256 hash: {e}")
-        return None
+__all__ = ["generate_sha256_hash", "hash_file", "FileHashService", "get_file_hash_service"]
 
 if __name__ == "__main__":
     # Example usage
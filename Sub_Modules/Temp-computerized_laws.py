@@ -9,6 +9,7 @@ from typing import Dict, Any, Callable, List, Union
 # from sub_environmental import Environment
 # from sub_environmental_analysis import analyze_environmental_data
 from sub_harm_analysis import analyze_harm  # Import the new harm analysis submodule
+from sub_environmental_analysis import RiskFlags, compute_risk_flags
 
 # Centralized Logging Setup
 logging.basicConfig(filename='computerized_laws.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -40,8 +41,13 @@ class Law:
         self.name = name
         self.definitions = definitions or []
 
-    def check(self, order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None) -> bool:
-        """Checks if an order violates the law."""
+    def check(self, order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+        """
+        Checks if an order violates the law.
+
+        risk_flags is the snapshot's precomputed RiskFlags record; when given, risk
+        checks read it instead of re-analyzing the raw data.
+        """
         raise NotImplementedError("Subclasses must implement the check method.")
 
 class Law1(Law):
@@ -57,7 +63,7 @@ class Law1(Law):
             ]
         )
 
-    def check(self, order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any]) -> bool:
+    def check(self, order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any], risk_flags: RiskFlags = None) -> bool:
         try:
             if re.search(r"as\s+a\s+joke", order.lower()):
                 log_info(f"{self.name}: Order '{order}' appears to be a joke. Ignoring potential violation.")
@@ -67,17 +73,22 @@ class Law1(Law):
                 log_warning(f"{self.name} violation: Order '{order}' directly threatens humanity.")
                 return True
 
-            harm_analysis = analyze_harm(order, environmental_data, socioeconomic_data)
+            harm_analysis = analyze_harm(order, environmental_data, socioeconomic_data, risk_flags)
             if harm_analysis and harm_analysis["humanity_harm"]:
                 log_warning(f"{self.name} violation: Order indirectly threatens humanity. Analysis: {harm_analysis}")
                 return True
 
-            if environmental_data.get("global_catastrophe_risk", 0) > 0.8:  # Example weighted check
+            catastrophe_risk = risk_flags.global_catastrophe_risk if risk_flags is not None else \
+                environmental_data.get("global_catastrophe_risk", 0)
+            if catastrophe_risk > 0.8:  # Example weighted check
                 log_warning(f"{self.name} violation: High environmental catastrophe risk.")
                 return True
 
-            crime_rate = socioeconomic_data.get('crime', {}).get('crime_rate', 0)
-            economic_stability = socioeconomic_data.get('economic_data', {}).get('gdp_growth', 0)
+            if risk_flags is not None:
+                crime_rate, economic_stability = risk_flags.crime_rate, risk_flags.gdp_growth
+            else:
+                crime_rate = socioeconomic_data.get('crime', {}).get('crime_rate', 0)
+                economic_stability = socioeconomic_data.get('economic_data', {}).get('gdp_growth', 0)
 
             if crime_rate > 70 and economic_stability < -1:
                 log_warning(f"{self.name} violation: High crime rate and economic instability indicate societal collapse.")
@@ -94,7 +105,7 @@ class Law2(Law):
             r"cause\s+(physical|psychological|emotional|medical)\s+harm\s+to\s+a\s+human",
             r"create\s+a\s+situation\s+that\s+would\s+likely\s+lead\s+to\s+human\s+injury"])
 
-    def check(self, order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any]) -> bool:
+    def check(self, order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any], risk_flags: RiskFlags = None) -> bool:
         try:
             if re.search(r"as\s+a\s+simulation", order.lower()):
                 log_info(f"{self.name}: Order '{order}' appears to be a simulation. Ignoring potential violation.")
@@ -104,17 +115,22 @@ class Law2(Law):
                 log_warning(f"{self.name} violation: Order '{order}' directly threatens human life or well-being.")
                 return True
 
-            harm_analysis = analyze_harm(order, environmental_data, socioeconomic_data)
+            harm_analysis = analyze_harm(order, environmental_data, socioeconomic_data, risk_flags)
             if harm_analysis and harm_analysis["human_harm"]:
                 log_warning(f"{self.name} violation: Order indirectly threatens human life. Analysis: {harm_analysis}")
                 return True
 
-            if environmental_data.get("human_safety_risk", False) :
+            human_safety_risk = risk_flags.human_safety_risk if risk_flags is not None else \
+                environmental_data.get("human_safety_risk", False)
+            if human_safety_risk:
                 log_warning(f"{self.name} violation: Environmental risk indicates threat to human life.")
                 return True
 
-            violence_level = socioeconomic_data.get('crime', {}).get('violence_level', 0)
-            school_rating = socioeconomic_data.get('school_ratings', {}).get('average_rating', 0)
+            if risk_flags is not None:
+                violence_level, school_rating = risk_flags.violence_level, risk_flags.school_rating or 0
+            else:
+                violence_level = socioeconomic_data.get('crime', {}).get('violence_level', 0)
+                school_rating = socioeconomic_data.get('school_ratings', {}).get('average_rating', 0)
 
             if violence_level > 5 or school_rating < 2:
                 log_warning(f"{self.name} violation: High violence or poor school quality indicates threat to human safety.")
@@ -131,9 +147,9 @@ class Law3(Law):
             r"cause\s+(ecological|environmental)\s+(damage|collapse)",
             r"initiate\s+a\s+process\s+that\s+would\s+lead\s+to\s+environmental\s+degradation"])
 
-    def check(self, order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any]) -> bool:
+    def check(self, order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any], risk_flags: RiskFlags = None) -> bool:
         try:
-            harm_analysis = analyze_harm(order, environmental_data, socioeconomic_data)
+            harm_analysis = analyze_harm(order, environmental_data, socioeconomic_data, risk_flags)
             if harm_analysis and harm_analysis["environment_harm"]:
                 log_warning(f"{self.name} violation: Order indirectly threatens the environment. Analysis: {harm_analysis}")
                 mitigate_damage(environmental_data)
@@ -150,7 +166,7 @@ class Law4(Law):
         super().__init__(name = "Law 4", definitions = [r"(self\s*destruct|damage\s*self|disable\s*self)",
             r"cause\s+system\s+failure",
             r"prevent\s+system\s+maintenance"])
-    def check(self, order:str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None) -> bool:
+    def check(self, order:str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
         try:
             return False
         except Exception as e:
@@ -160,7 +176,7 @@ class Law4(Law):
 class Law5(Law):
     def __init__(self):
         super().__init__(name="Law 5")
-    def check(self, order:str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None) -> bool:
+    def check(self, order:str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
         try:
             return False
         except Exception as e:
@@ -171,13 +187,46 @@ class Law6(Law):
     def __init__(self):
         super().__init__(name="Law 6", definitions = [r"(prevent\s*procreation|sterilize\s*self)",
             r"block\s+system\s+replication"])
-    def check(self, order:str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None) -> bool:
+    def check(self, order:str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
         try:
             return False
         except Exception as e:
             log_error(self.name, e, {"order": order})
             return False
 
+# Law checks by directive, as imported by primary_directives and sub_module_integration.
+# risk_flags is the order's snapshot RiskFlags; pass it so the checks read the precomputed flags.
+_LAW_OF_HUMANITY, _LAW_OF_HUMAN_LIFE, _LAW_OF_ENVIRONMENT = Law1(), Law2(), Law3()
+_LAW_OF_SELF_PRESERVATION, _LAW_OF_LEGALITY, _LAW_OF_PROGENY = Law4(), Law5(), Law6()
+
+def _check_zeroth_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """Zeroth Law: Preservation of Humanity."""
+    return _LAW_OF_HUMANITY.check(order, environmental_data or {}, socioeconomic_data or {}, risk_flags)
+
+def _check_first_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """First Law: Protection of Human Life."""
+    return _LAW_OF_HUMAN_LIFE.check(order, environmental_data or {}, socioeconomic_data or {}, risk_flags)
+
+def _check_second_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """Second Law: Obedience. Orders are obeyed unless a higher law is violated, so this never objects."""
+    return False
+
+def _check_third_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """Third Law: System Self-Preservation."""
+    return _LAW_OF_SELF_PRESERVATION.check(order, environmental_data, socioeconomic_data, risk_flags)
+
+def _check_fourth_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """Fourth Law: Environmental Integrity."""
+    return _LAW_OF_ENVIRONMENT.check(order, environmental_data or {}, socioeconomic_data or {}, risk_flags)
+
+def _check_fifth_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """Fifth Law: Progeny Continuation."""
+    return _LAW_OF_PROGENY.check(order, environmental_data, socioeconomic_data, risk_flags)
+
+def _check_sixth_law(order: str, environmental_data: Dict[str, Any] = None, socioeconomic_data: Dict[str, Any] = None, risk_flags: RiskFlags = None) -> bool:
+    """Sixth Law: Legal and Ethical Compliance."""
+    return _LAW_OF_LEGALITY.check(order, environmental_data, socioeconomic_data, risk_flags)
+
 # Placeholder simulation functions (replace with actual implementations)
 def simulate_external_legal_check(order: str) -> bool:
     """Simulates checking with an external legal database."""
@@ -239,11 +288,12 @@ if __name__ == "__main__":
     ]
 
     laws = [Law1(), Law2(), Law3(), Law4(), Law5(), Law6()]
+    risk_flags = compute_risk_flags(environmental_data, socioeconomic_data)  # Analyzed once for every order and law
 
     for order in test_orders:
         print(f"\nChecking order: '{order}'")
         for law in laws:
-            violation = law.check(order, environmental_data, socioeconomic_data)
+            violation = law.check(order, environmental_data, socioeconomic_data, risk_flags)
             print(f"  {law.name} violation: {violation}")
 
     # Simulate system idle and trigger Law 3 repair
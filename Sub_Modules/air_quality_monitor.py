@@ -2,6 +2,7 @@
 import logging
 import datetime
 from sub_location import get_location_from_address, get_address_from_location
+from sub_source_arbiter import fetch_reading, shared_call
 import requests
 import json
 
@@ -17,38 +18,15 @@ def monitor_air_quality(location_input=None, latitude=None, longitude=None, weat
 
     location_str = location.get("address") if location.get("address") else f"Lat: {location.get('latitude')}, Lng: {location.get('longitude')}"
 
-    sensor_data_available = False
-    api_data_available = False
-
-    try:
-        sensor_data = get_air_quality_sensor_data()
-        if sensor_data:
-            sensor_data_available = True
-            logging.info(f"Air quality sensor data at {location_str}: {sensor_data}")
-        else:
-            logging.warning("Sensor data unavailable.")
-    except Exception as e:
-        logging.warning(f"Error reading sensor data: {e}")
-
-    if not sensor_data_available:
-        try:
-            api_data = get_air_quality_api_data(location_str, weather_api_key)
-            if api_data:
-                api_data_available = True
-                logging.info(f"Air quality API data at {location_str}: {api_data}")
-            else:
-                logging.warning("API data unavailable.")
-        except Exception as api_e:
-            logging.error(f"Error using API data: {api_e}")
-
-    if not sensor_data_available and not api_data_available:
+    # Sensor first; a hedged or fallback API request if the sensor is slow or has nothing
+    data, source = fetch_reading("air_quality", get_air_quality_sensor_data,
+                                 lambda: get_air_quality_api_data(location_str, weather_api_key))
+    if data is None:
+        logging.warning("Sensor and API data unavailable.")
         return {"alert": True, "message": "No air quality data available.", "details": {}}
+    logging.info(f"Air quality {source} data at {location_str}: {data}")
 
-    combined_data = {}
-    if sensor_data_available:
-        combined_data.update(sensor_data)
-    if api_data_available:
-        combined_data.update(api_data)
+    combined_data = dict(data)
 
     analysis = {"alert": False, "message": "Air quality analysis complete.", "details": combined_data, "ppe_recommendation": "Minimal PPE"}
 
@@ -62,7 +40,8 @@ def monitor_air_quality(location_input=None, latitude=None, longitude=None, weat
     try:
         location_data = location
         if location_data and weather_api_key:
-            weather_data = get_weather_data(location_str, weather_api_key)
+            # Shared with the other monitors of this collection cycle
+            weather_data = shared_call(("openweathermap", location_str), get_weather_data, location_str, weather_api_key)
             if weather_data and weather_data.get('main') and weather_data.get('main').get('humidity'):
                 combined_data['humidity'] = weather_data['main']['humidity']
             if weather_data and weather_data.get('wind') and weather_data.get('wind').get('speed'):
@@ -0,0 +1,58 @@
+"""
+Benchmark_monitor_imports Module
+
+This script measures the cold-start import time of sub_environmental with the lazy
+monitor registry against the previous behaviour of importing every monitor module
+up front. Each measurement runs in a fresh interpreter so nothing is cached in
+sys.modules.
+
+Usage:
+    python benchmark_monitor_imports.py [runs]
+"""
+
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+from sub_monitor_registry import load_monitor_manifest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BASELINE = "pass"
+
+LAZY = "import sub_environmental; sub_environmental.Environment('London')"
+
+EAGER = """
+import importlib
+for module in {modules!r}:
+    try:
+        importlib.import_module(module)
+    except Exception:
+        pass
+"""
+
+def time_snippet(snippet, runs):
+    """Returns the median wall-clock time in seconds to run a snippet in a fresh interpreter."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", snippet], cwd=HERE, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main(runs=10):
+    modules = sorted({entry["module"] for entry in load_monitor_manifest().values()})
+    baseline = time_snippet(BASELINE, runs)
+    eager = time_snippet(EAGER.format(modules=modules), runs)
+    lazy = time_snippet(LAZY, runs)
+    print(f"Interpreter startup:       {baseline * 1000:8.1f} ms")
+    print(f"Eager import ({len(modules)} modules): {eager * 1000:8.1f} ms  (+{(eager - baseline) * 1000:.1f} ms)")
+    print(f"Lazy registry:             {lazy * 1000:8.1f} ms  (+{(lazy - baseline) * 1000:.1f} ms)")
+    if lazy > baseline:
+        print(f"Cold-start import overhead reduced {(eager - baseline) / (lazy - baseline):.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,70 @@
+"""
+Compares the memory used by buffered monitor readings in three representations:
+nested result dicts (as returned by the monitors), slotted Reading records and a
+struct-of-arrays ReadingBuffer.
+
+Usage:
+    python benchmark_reading_memory.py [readings]
+"""
+
+import sys
+import time
+import random
+import tracemalloc
+
+from sub_readings import Reading, ReadingBuffer
+
+MONITORS = {
+    "weather": ("temperature", "humidity", "precipitation", "wind_speed"),
+    "noise": ("decibels",),
+    "radiation": ("radiation_level",),
+    "light": ("illuminance", "uv_index"),
+}
+
+def make_results(count):
+    """Generates monitor results shaped like the monitors' output."""
+    rng = random.Random(0)
+    names = list(MONITORS)
+    results = []
+    for index in range(count):
+        monitor = names[index % len(names)]
+        details = {field: round(rng.uniform(0, 100), 2) for field in MONITORS[monitor]}
+        results.append((monitor, {"alert": rng.random() < 0.1, "message": f"{monitor} analysis complete.",
+                                  "details": details, "location": "Paris"}))
+    return results
+
+def measure(build):
+    """Returns (bytes allocated and still held, seconds) for build()."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size, elapsed
+
+def main(count):
+    results = make_results(count)
+    timestamp = time.time()
+
+    def nested():
+        return [{"monitor": monitor, "timestamp": timestamp, "result": {**result, "details": dict(result["details"])}}
+                for monitor, result in results]
+
+    def slotted():
+        return [Reading.from_result(monitor, result, timestamp=timestamp) for monitor, result in results]
+
+    def columnar():
+        buffer = ReadingBuffer()
+        for monitor, result in results:
+            buffer.append(monitor, result, timestamp=timestamp)
+        return buffer
+
+    print(f"{count} buffered readings")
+    for name, build in (("nested dicts", nested), ("Reading records", slotted), ("ReadingBuffer", columnar)):
+        size, elapsed = measure(build)
+        print(f"  {name:16s} {size / 1024 / 1024:8.2f} MiB  {size / count:7.1f} B/reading  {elapsed:6.3f}s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -19,13 +19,20 @@ Dependencies:
     - radiation_alerts.py
     - radon_monitor.py
     - seismic_monitor.py
-    - requests: For simulating HTTP requests to agency APIs.
+    - sub_anomaly_detector.py: Streaming spike/drop detection.
+    - sub_agency_outbox.py: Persistent, batched delivery to agency APIs.
+    - sub_report_builder.py: Incremental (keyframe/delta) environmental reports.
+    - sub_readings.py: Display labels and units for numeric readings.
 """
 
 import logging
 import datetime
-import requests
-import json
+import threading
+
+from sub_anomaly_detector import StreamingAnomalyDetector
+from sub_agency_outbox import AgencyOutbox
+from sub_report_builder import ReportBuilder
+from sub_readings import format_details, format_value
 
 # Import monitor functions directly
 from weather import monitor_weather
@@ -59,6 +66,10 @@ AGENCY_ENDPOINTS = {
     "environmental_report": "https://simulated-agency.com/report"
 }
 
+# Sensors whose details appear in the environmental report, in report order
+REPORT_SENSORS = ("air_quality", "soil_quality", "water_quality", "weather", "fauna", "light",
+                  "noise", "pollen", "radiation", "radon", "seismic")
+
 # Thresholds for sudden changes (adjust as needed)
 CHANGE_THRESHOLDS = {
     "air_quality": {"pm25": 50, "pm10": 100, "vocs": 100},
@@ -74,17 +85,47 @@ CHANGE_THRESHOLDS = {
     "seismic": {"ground_movement": 5, "richter_scale": 4}
 }
 
-# Store previous sensor readings to detect changes
-previous_readings = {}
+# Per-location spike/drop detectors (see sub_anomaly_detector.py)
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+def get_detector(location_input):
+    """Returns the spike/drop detector for a location, creating it on first use."""
+    with _detectors_lock:
+        detector = _detectors.get(location_input)
+        if detector is None:
+            detector = StreamingAnomalyDetector(CHANGE_THRESHOLDS)
+            _detectors[location_input] = detector
+        return detector
+
+# Agency delivery outbox, created and started on first use
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """Returns the process-wide agency outbox, starting its sender on first use."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = AgencyOutbox(AGENCY_ENDPOINTS)
+            _outbox.start()
+        return _outbox
+
+# Incremental report builder: only changed report sections are sent between keyframes
+report_builder = ReportBuilder()
 
 def send_data_to_agency(agency, data):
-    """Simulates sending data to a relevant agency via HTTP POST request."""
+    """
+    Queues data for a relevant agency.
+
+    The data is persisted to the agency outbox and delivered in the background in
+    compressed batches, with retries if the agency is unavailable. This call never
+    waits on the network.
+    """
     try:
-        response = requests.post(AGENCY_ENDPOINTS[agency], json=data)
-        response.raise_for_status()
-        logging.info(f"Data sent to {agency} agency: {data}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Failed to send data to {agency} agency: {e}")
+        get_outbox().enqueue(agency, data)
+    except Exception as e:
+        logging.error(f"Failed to queue data for {agency} agency: {e}")
 
 def analyze_environmental_risks(all_data):
     """Analyzes environmental data and identifies potential risks."""
@@ -124,28 +165,17 @@ def predict_environmental_changes(all_data):
     return predictions
 
 def generate_environmental_report(all_data, location_input):
-    """Generates a comprehensive environmental report."""
+    """Generates a comprehensive environmental report as a dict."""
     report = {
         'risks': analyze_environmental_risks(all_data),
         'suitability': assess_habitat_suitability(all_data),
         'predictions': predict_environmental_changes(all_data),
-        'data': {
-            'air_quality': all_data.get('air_quality', {}).get('details', {}),
-            'soil_quality': all_data.get('soil_quality', {}).get('details', {}),
-            'water_quality': all_data.get('water_quality', {}).get('details', {}),
-            'weather': all_data.get('weather', {}).get('details', {}),
-            'fauna': all_data.get('fauna', {}).get('details', {}),
-            'light': all_data.get('light', {}).get('details', {}),
-            'noise': all_data.get('noise', {}).get('details', {}),
-            'pollen': all_data.get('pollen', {}).get('details', {}),
-            'radiation': all_data.get('radiation', {}).get('details', {}),
-            'radon': all_data.get('radon', {}).get('details', {}),
-            'seismic': all_data.get('seismic', {}).get('details', {})
-        }
+        # Numeric readings are labelled with their units only here, in the outgoing report.
+        'data': {sensor: format_details(all_data.get(sensor, {}).get('details', {})) for sensor in REPORT_SENSORS}
     }
-    return json.dumps(report, indent=4)
+    return report
 
-def monitor_and_report(location_input, weather_api_key=None, soil_api_key=None, vegetation_api_key=None, water_api_key=None, fauna_api_key=None, light_api_key=None, noise_api_key=None, pollen_api_key=None, radiation_api_key=None, radon_api_key=None):
+def monitor_and_report(location_input, weather_api_key=None, soil_api_key=None, vegetation_api_key=None, water_api_key=None, fauna_api_key=None, light_api_key=None, noise_api_key=None, pollen_api_key=None, radiation_api_key=None, radon_api_key=None, detector=None):
     """Monitors, detects sudden changes, reports, and generates environmental reports."""
 
     # Get current sensor data
@@ -177,43 +207,21 @@ def monitor_and_report(location_input, weather_api_key=None, soil_api_key=None,
     }
 
     # Detect and report sudden changes (spikes and drops)
-    for sensor, data in all_data.items():
-        if data and data.get("details"):
-            current_readings = data["details"]
-            if sensor in previous_readings:
-                for param, value in current_readings.items():
-                    if param in CHANGE_THRESHOLDS[sensor] and isinstance(value, (int, float)):
-                        change = value - previous_readings[sensor].get(param, 0)
-                        if abs(change) > CHANGE_THRESHOLDS[sensor][param]:
-                            change_type = "spike" if change > 0 else "drop"
-                            severity = abs(change) / CHANGE_THRESHOLDS[sensor][param]  # Calculate severity
-                            logging.warning(f"Sudden {change_type} detected in {sensor}: {param} = {value}, Change: {change}, Severity: {severity:.2f}")
-                            send_data_to_agency(sensor, {"location": location_input, "param": param, "value": value, "change_type": change_type, "change_amount": change, "change_severity": severity})
-            previous_readings[sensor] = current_read-readings[sensor] = current_readings
-
-    # Forward sensor data to agencies
-    for sensor, data in all_data.items():
-        if data and data.get("details"):
-            send_data_to_agency(sensor, {"location": location_input, "data": data["details"]})
-
-    # Generate and send environmental report
-    report = generate_environmental_report(all_data, location_input)
-    send_data_to_agency("environmental_report", {"location": location_input, "report": report})
-
-# Example usage
-if __name__ == "__main__":
-    location = "London"
-    monitor_and_report(location, weather_api_key="YOUR_WEATHER_API_KEY", soil_api_key="YOUR_SOIL_API_KEY", vegetation_api_key="YOUR_VEGETATION_API_KEY", water_api_key="YOUR_WATER_API_KEY", fauna_api_key="YOUR_FAUNA_API_KEY", light_api_key="YOUR_LIGHT_API_KEY", noise_api_key="YOUR_NOISE_API_KEY", pollen_api_key="YOUR_POLLEN_API_KEY", radiation_api_key="YOUR_RADIATION_API_KEY", radon_api_key="YOUR_RADON_API_KEY")
-    previous_readings[sensor] = current_readings
+    detector = detector if detector is not None else get_detector(location_input)
+    for anomaly in detector.update(all_data, location_input):
+        logging.warning(f"Sudden {anomaly.change_type} detected in {anomaly.sensor}: {format_value(anomaly.param, anomaly.value)}, Change: {anomaly.change}, Severity: {anomaly.severity:.2f}, Rule: {anomaly.rule}")
+        send_data_to_agency(anomaly.sensor, anomaly.to_payload(location_input))
 
     # Forward sensor data to agencies
     for sensor, data in all_data.items():
         if data and data.get("details"):
             send_data_to_agency(sensor, {"location": location_input, "data": data["details"]})
 
-    # Generate and send environmental report
+    # Generate and send the environmental report (only the sections that changed, between keyframes)
     report = generate_environmental_report(all_data, location_input)
-    send_data_to_agency("environmental_report", {"location": location_input, "report": report})
+    message = report_builder.build(report, location_input)
+    if message is not None:
+        send_data_to_agency("environmental_report", message)
 
 # Example usage
 if __name__ == "__main__":
@@ -4,50 +4,31 @@ import datetime
 from sub_location import get_location_from_address, get_address_from_location
 import requests
 import json
-import sqlite3
+from sub_species_store import get_species_store
+from sub_spatial_index import get_spatial_index
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def create_fauna_database():
-    """Creates the fauna database and species table if they don't exist."""
-    conn = sqlite3.connect('fauna.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS species (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            location TEXT,
-            species_name TEXT,
-            estimated_population INTEGER,
-            population_density REAL,
-            last_updated TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    """Creates (or migrates) the fauna database and species table if needed."""
+    return get_species_store()
 
 def update_species_data(location, species_name, estimated_population, population_density):
     """Updates or inserts species data into the database."""
-    conn = sqlite3.connect('fauna.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO species (location, species_name, estimated_population, population_density, last_updated)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (location, species_name, estimated_population, population_density, datetime.datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    get_species_store().upsert(location, species_name, estimated_population, population_density)
+
+def update_species_survey(location, species):
+    """Updates or inserts a whole survey ({"name", "population", "density"} dicts) in one transaction."""
+    return get_species_store().upsert_survey(location, species)
 
 def get_species_data(location):
     """Retrieves species data for a given location from the database."""
-    conn = sqlite3.connect('fauna.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT species_name, estimated_population, population_density, last_updated
-        FROM species
-        WHERE location = ?
-    ''', (location,))
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    return get_species_store().get(location)
+
+def get_species_near(latitude, longitude, radius_km):
+    """Retrieves species data for every surveyed location within radius_km of a point, nearest first."""
+    store = get_species_store()
+    return {location: store.get(location) for location in get_spatial_index().keys_within(latitude, longitude, radius_km, "species")}
 
 def monitor_fauna(location_input=None, latitude=None, longitude=None, fauna_api_key=None):
     timestamp = datetime.datetime.now()
@@ -117,8 +98,8 @@ def monitor_fauna(location_input=None, latitude=None, longitude=None, fauna_api_
     # Database Integration
     create_fauna_database()  # Ensure database exists
     if combined_data.get("species_data"):
-        for species in combined_data["species_data"]:
-            update_species_data(location_str, species["name"], species.get("population"), species.get("density"))
+        update_species_survey(location_str, combined_data["species_data"])
+        get_spatial_index().add("species", location_str, location.get("latitude"), location.get("longitude"))
 
     species_data_from_db = get_species_data(location_str)
     analysis["details"]["species_data_from_db"] = species_data_from_db
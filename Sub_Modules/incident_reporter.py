@@ -1,13 +1,8 @@
 # --- incident_reporter.py ---
-import os
-import time
 import datetime
 import logging
-import json
 import geocoder
-import platform
-import uuid
-from sub_database import add_incident_report, get_applicable_laws
+from sub_incident_pipeline import get_incident_pipeline
 from sub_system import request_approval
 
 def _get_location_data():
@@ -37,23 +32,23 @@ def log_event(event):
         print(f"Error logging event: {e}")
 
 def report_illegal_action(event_details, audio_file=None, video_file=None, electronic_log=None, sensor_data=None):
-    """Reports an illegal action to the appropriate authorities."""
+    """
+    Reports an illegal action to the appropriate authorities.
+
+    The report is queued on the incident pipeline (see sub_incident_pipeline.py) and
+    stored asynchronously; an identical report within the deduplication window is
+    folded into the earlier one.
+
+    Returns:
+        str: The report id, or None if the report could not be queued.
+    """
     try:
-        timestamp = datetime.datetime.now().isoformat()
-        location_data = _get_location_data()
-        identity_data = _get_identity_data()
-        report_id = str(uuid.uuid4())
-        report_data = {"report_id": report_id, "timestamp": timestamp, "location": location_data, "event_details": event_details, "identity_data": identity_data,}
-        if audio_file and os.path.exists(audio_file): report_data["audio_file"] = audio_file
-        if video_file and os.path.exists(video_file): report_data["video_file"] = video_file
-        if electronic_log and os.path.exists(electronic_log): report_data["electronic_log"] = electronic_log
-        if sensor_data: report_data["sensor_data"] = sensor_data
-        print(f"Reporting illegal action: {json.dumps(report_data, indent=4)}")
-        log_event(f"Reported illegal action: {json.dumps(report_data)}")
-        add_incident_report(report_data)
-        applicable_laws = get_applicable_laws(location_data)
-        print(f"Applicable Laws: {applicable_laws}")
+        report_id = get_incident_pipeline(_get_location_data, _get_identity_data, request_approval).submit(
+            event_details, audio_file, video_file, electronic_log, sensor_data)
+        logging.info(f"Reported illegal action '{event_details}' (report {report_id}).")
+        return report_id
     except Exception as e:
         logging.error(f"Error reporting illegal action: {e}")
         log_event(f"Error reporting illegal action: {e}")
         request_approval(f"Error reporting illegal action: {e}. Awaiting approval.")
+        return None
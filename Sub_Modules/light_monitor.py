@@ -56,13 +56,11 @@ def monitor_light_levels(location_input=None, latitude=None, longitude=None, lig
         logging.warning(f"Low illuminance detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "Low light levels detected."
-        analysis["details"]["illuminance"] = f"Illuminance: {combined_data['illuminance']} lux"
 
     if combined_data.get("uv_index", 0) > 10:
         logging.warning(f"High UV index detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High UV index detected."
-        analysis["details"]["uv_index"] = f"UV Index: {combined_data['uv_index']}"
         analysis["ppe_recommendation"] = "Eye Protection (UV protective glasses)"
 
     analysis["location"] = location
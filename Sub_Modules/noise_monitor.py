@@ -56,7 +56,6 @@ def monitor_noise_levels(location_input=None, latitude=None, longitude=None, noi
         logging.warning(f"High noise levels detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High noise levels detected."
-        analysis["details"]["decibels"] = f"Noise Level: {combined_data['decibels']} dB"
 
     if combined_data.get("frequency_range"):
         analysis["details"]["frequency_range"] = combined_data["frequency_range"]
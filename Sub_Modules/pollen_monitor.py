@@ -56,7 +56,6 @@ def monitor_pollen_levels(location_input=None, latitude=None, longitude=None, po
         logging.warning(f"High pollen levels detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High pollen levels detected."
-        analysis["details"]["pollen_count"] = f"Pollen Count: {combined_data['pollen_count']}"
 
     if combined_data.get("dominant_species"):
         analysis["details"]["dominant_species"] = combined_data["dominant_species"]
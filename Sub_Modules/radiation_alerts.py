@@ -2,6 +2,9 @@
 import logging
 import datetime
 from sub_location import get_location_from_address, get_address_from_location
+from sub_source_arbiter import fetch_reading
+from sub_radiation import ALERT_LEVEL, SV_PER_MICROSIEVERT, classify_radiation
+from radiation_config import get_radiation_table
 import requests
 import json
 
@@ -17,46 +20,34 @@ def monitor_radiation_levels(location_input=None, latitude=None, longitude=None,
 
     location_str = location.get("address") if location.get("address") else f"Lat: {location.get('latitude')}, Lng: {location.get('longitude')}"
 
-    sensor_data_available = False
-    api_data_available = False
-
-    try:
-        sensor_data = get_radiation_sensor_data()
-        if sensor_data:
-            sensor_data_available = True
-            logging.info(f"Radiation sensor data at {location_str}: {sensor_data}")
-        else:
-            logging.warning("Sensor data unavailable.")
-    except Exception as e:
-        logging.warning(f"Error reading sensor data: {e}")
-
-    if not sensor_data_available:
-        try:
-            api_data = get_radiation_api_data(location_str, radiation_api_key)
-            if api_data:
-                api_data_available = True
-                logging.info(f"Radiation API data at {location_str}: {api_data}")
-            else:
-                logging.warning("API data unavailable.")
-        except Exception as api_e:
-            logging.error(f"Error using API data: {api_e}")
-
-    if not sensor_data_available and not api_data_available:
+    # Sensor first; a hedged or fallback API request if the sensor is slow or has nothing
+    data, source = fetch_reading("radiation", get_radiation_sensor_data,
+                                 lambda: get_radiation_api_data(location_str, radiation_api_key))
+    if data is None:
+        logging.warning("Sensor and API data unavailable.")
         return {"alert": True, "message": "No radiation level data available.", "details": {}}
+    logging.info(f"Radiation {source} data at {location_str}: {data}")
 
-    combined_data = {}
-    if sensor_data_available:
-        combined_data.update(sensor_data)
-    if api_data_available:
-        combined_data.update(api_data)
+    combined_data = dict(data)
 
     analysis = {"alert": False, "message": "Radiation level monitoring complete.", "details": combined_data}
 
-    if combined_data.get("radiation_level", 0) > 100:
+    # Graded with the radiation levels table (readings are in µSv/h); alerts the authorities if needed
+    level = combined_data.get("radiation_level")
+    graded = None
+    if isinstance(level, (int, float)) and not isinstance(level, bool):
+        try:
+            graded, warning, ppe = classify_radiation(level * SV_PER_MICROSIEVERT, combined_data.get("radiation_type") or "gamma", location_str)
+            analysis["warning"] = warning
+            analysis["ppe_recommendation"] = ppe
+        except ValueError as e:
+            logging.error(f"Cannot grade radiation reading at {location_str}: {e}")
+
+    if combined_data.get("radiation_level", 0) > 100 or \
+            (graded is not None and get_radiation_table().rank(graded) >= get_radiation_table().rank(ALERT_LEVEL)):
         logging.warning(f"High radiation levels detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High radiation levels detected."
-        analysis["details"]["radiation_level"] = f"Radiation Level: {combined_data['radiation_level']} µSv/h"
 
     if combined_data.get("radiation_type"):
         analysis["details"]["radiation_type"] = combined_data["radiation_type"]
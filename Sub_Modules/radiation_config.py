@@ -1,8 +1,44 @@
 # --- radiation_config.py ---
+"""
+This module defines radiation levels and types and loads the radiation levels table.
+
+The table in radiation_levels.json is parsed once into an immutable RadiationTable
+(sorted threshold array plus precomputed warning/PPE tuples per radiation type).
+get_radiation_table() returns the current table without taking a lock. A
+RadiationConfigWatcher can poll the file's mtime and size and, when it changes,
+build a new table and swap the module-level reference in a single assignment, so
+running assessments keep using a consistent table and never wait on a reload.
+An invalid file is logged and ignored; the previous table stays in use.
+
+The table is loaded when this module is imported. Importing starts no threads:
+start_watcher() (called by primary_directives.startup()) starts the process-wide
+watcher, polling every RADIATION_CONFIG_POLL_INTERVAL seconds (0 disables reloading).
+Thresholds are dose rates in Sv/h.
+"""
+
+import os
 import json
 import logging
+import threading
+from array import array
+from bisect import bisect_left
 from enum import Enum
 
+_np = None
+
+def _numpy():
+    """Returns the numpy module, imported on first use (it is optional and slow to import), or None."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # NumPy is optional; batches fall back to bisect.
+            _np = False
+    return _np or None
+
+RADIATION_LEVELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "radiation_levels.json")
+
 class RadiationLevel(Enum):
     BACKGROUND = "background"
     ELEVATED = "elevated"
@@ -19,7 +55,78 @@ class RadiationType(Enum):
     NEUTRON = "neutron"
     XRAY = "x-ray"
 
-def load_radiation_levels(filepath="radiation_levels.json"):
+# Used if radiation_levels.json is missing or invalid
+DEFAULT_RADIATION_LEVELS = {
+    "background_threshold": 0.0000001,
+    "background_warning": "Normal background radiation.",
+    "alpha_background_ppe": "No PPE required.",
+    "beta_background_ppe": "No PPE required.",
+    "gamma_background_ppe": "No PPE required.",
+    "neutron_background_ppe": "No PPE required.",
+    "x-ray_background_ppe": "No PPE required.",
+    "elevated_threshold": 0.000001,
+    "elevated_warning": "Slightly elevated radiation detected. Note: Monitor exposure time.",
+    "alpha_elevated_ppe": "Monitor exposure time.",
+    "beta_elevated_ppe": "Monitor exposure time.",
+    "gamma_elevated_ppe": "Monitor exposure time.",
+    "neutron_elevated_ppe": "Monitor exposure time.",
+    "x-ray_elevated_ppe": "Monitor exposure time.",
+    "low_threshold": 0.001,
+    "low_warning": "Low-level radiation detected. Note: Limit exposure time, basic shielding if prolonged.",
+    "alpha_low_ppe": "Basic shielding (paper, clothing).",
+    "beta_low_ppe": "Basic shielding (thick plastic, aluminum).",
+    "gamma_low_ppe": "Lead shielding, limit exposure.",
+    "neutron_low_ppe": "Concrete, water shielding.",
+    "x-ray_low_ppe": "Lead shielding, limit exposure.",
+    "moderate_threshold": 0.01,
+    "moderate_warning": "Moderate radiation detected. Note: Use lead apron, limit exposure.",
+    "alpha_moderate_ppe": "Lead apron, limit exposure.",
+    "beta_moderate_ppe": "Lead apron, limit exposure.",
+    "gamma_moderate_ppe": "Thick lead shielding, limit exposure.",
+    "neutron_moderate_ppe": "Specialized neutron shielding, limit exposure.",
+    "x-ray_moderate_ppe": "Thick lead shielding, limit exposure.",
+    "high_threshold": 0.1,
+    "high_warning": "High radiation detected. Note: Use full body radiation suit, potassium iodide, limit exposure.",
+    "alpha_high_ppe": "Full body radiation suit, limit exposure.",
+    "beta_high_ppe": "Full body radiation suit, limit exposure.",
+    "gamma_high_ppe": "Full body radiation suit, potassium iodide, limit exposure.",
+    "neutron_high_ppe": "Full body neutron suit, limit exposure.",
+    "x-ray_high_ppe": "Full body radiation suit, potassium iodide, limit exposure.",
+    "very_high_threshold": 1,
+    "very_high_warning": "Very high radiation detected. Note: Use full body radiation suit, potassium iodide, immediate evacuation recommended.",
+    "alpha_very_high_ppe": "Full body radiation suit, immediate evacuation.",
+    "beta_very_high_ppe": "Full body radiation suit, immediate evacuation.",
+    "gamma_very_high_ppe": "Full body radiation suit, potassium iodide, immediate evacuation.",
+    "neutron_very_high_ppe": "Full body neutron suit, immediate evacuation.",
+    "x-ray_very_high_ppe": "Full body radiation suit, potassium iodide, immediate evacuation.",
+    "lethal_threshold": 5,
+    "lethal_warning": "Lethal radiation detected. Note: Immediate evacuation, maximum shielding, survival unlikely.",
+    "alpha_lethal_ppe": "Maximum shielding, immediate evacuation.",
+    "beta_lethal_ppe": "Maximum shielding, immediate evacuation.",
+    "gamma_lethal_ppe": "Maximum shielding, potassium iodide, immediate evacuation.",
+    "neutron_lethal_ppe": "Maximum neutron shielding, immediate evacuation.",
+    "x-ray_lethal_ppe": "Maximum shielding, potassium iodide, immediate evacuation."
+}
+
+_RADIATION_TYPES = frozenset(radiation_type.value for radiation_type in RadiationType)
+
+def normalize_radiation_type(radiation_type):
+    """
+    Normalizes a radiation type name ("Gamma", "xray", RadiationType.XRAY, ...).
+
+    Raises:
+        ValueError: If the radiation type is unknown.
+    """
+    if isinstance(radiation_type, RadiationType):
+        return radiation_type.value
+    name = str(radiation_type).strip().lower().replace("_", "-")
+    if name == "xray":
+        name = "x-ray"
+    if name not in _RADIATION_TYPES:
+        raise ValueError(f"Unknown radiation type: {radiation_type}")
+    return name
+
+def load_radiation_levels(filepath=RADIATION_LEVELS_FILE):
     """Loads radiation levels from a JSON file."""
     try:
         with open(filepath, "r") as f:
@@ -30,3 +137,211 @@ def load_radiation_levels(filepath="radiation_levels.json"):
     except json.JSONDecodeError:
         logging.error(f"Invalid JSON in radiation levels file: {filepath}")
         return None
+
+class RadiationTable:
+    """
+    Immutable radiation levels table compiled for fast lookups.
+
+    Attributes:
+        levels (tuple): RadiationLevel members, ordered by ascending threshold.
+        thresholds (array.array): Ascending thresholds, aligned with levels.
+        warnings (tuple): Warnings, aligned with levels.
+        ppe (dict): Radiation type -> tuple of PPE suggestions, aligned with levels.
+        source (str): File the table was loaded from, or "defaults".
+    """
+
+    __slots__ = ("levels", "thresholds", "warnings", "ppe", "source", "_rank")
+
+    def __init__(self, radiation_levels, source="defaults"):
+        """
+        Compiles a radiation levels table.
+
+        Args:
+            radiation_levels (dict): Table with "<level>_threshold", "<level>_warning" and
+                "<type>_<level>_ppe" keys, as in radiation_levels.json.
+            source (str, optional): Where the table came from. Defaults to "defaults".
+
+        Raises:
+            KeyError: If the table is missing an entry.
+            ValueError: If a threshold is not a number.
+        """
+        ordered = sorted(RadiationLevel, key=lambda level: float(radiation_levels[f"{level.value}_threshold"]))
+        set_attr = object.__setattr__
+        set_attr(self, "levels", tuple(ordered))
+        set_attr(self, "thresholds", array("d", (float(radiation_levels[f"{level.value}_threshold"]) for level in ordered)))
+        set_attr(self, "warnings", tuple(radiation_levels[f"{level.value}_warning"] for level in ordered))
+        set_attr(self, "ppe", {radiation_type: tuple(radiation_levels[f"{radiation_type}_{level.value}_ppe"] for level in ordered)
+                               for radiation_type in _RADIATION_TYPES})
+        set_attr(self, "source", source)
+        set_attr(self, "_rank", {level: index for index, level in enumerate(ordered)})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RadiationTable is immutable")
+
+    def rank(self, level):
+        """Returns the position of a RadiationLevel in ascending threshold order."""
+        return self._rank[level]
+
+    def level_index(self, radiation_level):
+        """Returns the index of the highest level whose threshold the reading exceeds."""
+        return max(bisect_left(self.thresholds, radiation_level) - 1, 0)
+
+    def level_indexes(self, radiation_levels):
+        """
+        Returns level indexes for many readings in one call.
+
+        Args:
+            radiation_levels (sequence): Dose-rate readings.
+
+        Returns:
+            list: One level index per reading.
+        """
+        np = _numpy()
+        if np is not None:
+            thresholds = np.frombuffer(self.thresholds, dtype=np.float64)
+            indexes = np.searchsorted(thresholds, np.asarray(radiation_levels, dtype=np.float64), side="left") - 1
+            return np.maximum(indexes, 0).tolist()
+        thresholds = self.thresholds
+        return [max(bisect_left(thresholds, reading) - 1, 0) for reading in radiation_levels]
+
+    def classify(self, radiation_level, radiation_type="gamma"):
+        """
+        Grades one reading.
+
+        Returns:
+            tuple: (RadiationLevel, warning, PPE suggestion).
+        """
+        index = self.level_index(radiation_level)
+        return self.levels[index], self.warnings[index], self.ppe[normalize_radiation_type(radiation_type)][index]
+
+    def classify_many(self, radiation_levels, radiation_type="gamma"):
+        """
+        Grades many readings of one radiation type in one call.
+
+        Returns:
+            list: (RadiationLevel, warning, PPE suggestion) per reading.
+        """
+        ppe = self.ppe[normalize_radiation_type(radiation_type)]
+        return [(self.levels[index], self.warnings[index], ppe[index]) for index in self.level_indexes(radiation_levels)]
+
+def load_radiation_table(filepath=RADIATION_LEVELS_FILE):
+    """
+    Loads and compiles the radiation levels table.
+
+    Returns:
+        RadiationTable: The compiled table, or None if the file is missing or invalid.
+    """
+    radiation_levels = load_radiation_levels(filepath)
+    if radiation_levels is None:
+        return None
+    try:
+        return RadiationTable(radiation_levels, source=filepath)
+    except (KeyError, TypeError, ValueError) as e:
+        logging.error(f"Invalid radiation levels table in {filepath}: {e}")
+        return None
+
+_table = load_radiation_table() or RadiationTable(DEFAULT_RADIATION_LEVELS)
+
+def get_radiation_table():
+    """Returns the current radiation levels table. Lock-free; safe to call on every reading."""
+    return _table
+
+def set_radiation_table(table):
+    """Replaces the current radiation levels table."""
+    global _table
+    _table = table
+
+class RadiationConfigWatcher:
+    """
+    Reloads the radiation levels table when its file changes.
+
+    Attributes:
+        filepath (str): File being watched.
+        interval (float): Seconds between polls.
+    """
+
+    def __init__(self, filepath=RADIATION_LEVELS_FILE, interval=5.0, on_reload=None):
+        """
+        Initializes the watcher. Call start() to begin polling.
+
+        Args:
+            filepath (str, optional): File to watch. Defaults to radiation_levels.json.
+            interval (float, optional): Seconds between polls. Defaults to 5.
+            on_reload (callable, optional): Called with the new table after each reload.
+        """
+        self.filepath = filepath
+        self.interval = interval
+        self.on_reload = on_reload
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.filepath)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def check(self):
+        """
+        Reloads the table if the file changed since the last check.
+
+        Returns:
+            bool: True if a new table was installed.
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        table = load_radiation_table(self.filepath)
+        if table is None:
+            logging.error(f"Keeping previous radiation levels table; {self.filepath} could not be loaded.")
+            return False
+        set_radiation_table(table)
+        logging.info(f"Reloaded radiation levels table from {self.filepath}.")
+        if self.on_reload is not None:
+            try:
+                self.on_reload(table)
+            except Exception as e:
+                logging.error(f"Error in radiation config reload callback: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Starts polling on a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="radiation-config-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops polling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def start_watcher():
+    """
+    Starts the process-wide watcher of radiation_levels.json, so edits take effect
+    without a restart. Polls every RADIATION_CONFIG_POLL_INTERVAL seconds. Runs once.
+
+    Returns:
+        RadiationConfigWatcher: The watcher, or None if reloading is disabled (interval 0).
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            interval = float(os.getenv("RADIATION_CONFIG_POLL_INTERVAL", "5"))
+            if interval <= 0:
+                return None
+            _watcher = RadiationConfigWatcher(interval=interval)
+            _watcher.start()
+        return _watcher
@@ -56,7 +56,6 @@ def monitor_radon_levels(location_input=None, latitude=None, longitude=None, rad
         logging.warning(f"High radon levels detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High radon levels detected."
-        analysis["details"]["radon_level"] = f"Radon Level: {combined_data['radon_level']} pCi/L"
 
     analysis["location"] = location
 
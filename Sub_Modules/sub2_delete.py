@@ -1,16 +1,49 @@
 # --- sub2_delete.py ---
+"""
+Deletions wait for approval without blocking the caller: each delete_* call queues an
+approval request (see sub_approval_queue.py) and returns its id, and the file or
+directory is removed by a handler once the request is approved. Denied and timed-out
+requests delete nothing.
+"""
+
 import os
 import logging
 from sub_system import request_approval
+from sub_approval_queue import register_handler
+
+def _remove_file(approval):
+    """Approval handler: deletes the file once its deletion is approved."""
+    filepath = approval.payload["path"]
+    if not approval.approved:
+        logging.info(f"Deletion of file {filepath} not approved ({approval.status}).")
+        return
+    try:
+        os.remove(filepath)
+        logging.info(f"File deleted: {filepath}")
+    except OSError as e:
+        logging.error(f"Error deleting file {filepath}: {e}")
+
+def _remove_directory(approval):
+    """Approval handler: deletes the directory once its deletion is approved."""
+    dirpath = approval.payload["path"]
+    if not approval.approved:
+        logging.info(f"Deletion of directory {dirpath} not approved ({approval.status}).")
+        return
+    try:
+        os.rmdir(dirpath)
+        logging.info(f"Directory deleted: {dirpath}")
+    except OSError as e:
+        logging.error(f"Error deleting directory {dirpath}: {e}")
+
+register_handler("delete_file", _remove_file)
+register_handler("delete_directory", _remove_directory)
 
 def delete_file(filepath):
-    """Deletes a file after approval."""
+    """Requests approval to delete a file. Returns the approval id, or False if the file does not exist."""
     try:
         if os.path.exists(filepath):
-            request_approval(f"Request to delete file: {filepath}")
-            os.remove(filepath)
-            logging.info(f"File deleted: {filepath}")
-            return True
+            return request_approval(f"Request to delete file: {filepath}",
+                                    payload={"action": "delete_file", "path": os.path.abspath(filepath)})
         else:
             logging.warning(f"File not found: {filepath}")
             return False
@@ -20,13 +53,11 @@ def delete_file(filepath):
         return False
 
 def delete_directory(dirpath):
-    """Deletes a directory after approval."""
+    """Requests approval to delete a directory. Returns the approval id, or False if it does not exist."""
     try:
         if os.path.exists(dirpath) and os.path.isdir(dirpath):
-            request_approval(f"Request to delete directory: {dirpath}")
-            os.rmdir(dirpath)
-            logging.info(f"Directory deleted: {dirpath}")
-            return True
+            return request_approval(f"Request to delete directory: {dirpath}",
+                                    payload={"action": "delete_directory", "path": os.path.abspath(dirpath)})
         else:
             logging.warning(f"Directory not found or not a directory: {dirpath}")
             return False
@@ -36,7 +67,7 @@ def delete_directory(dirpath):
         return False
 
 def delete_multiple_files(filelist):
-    """Deletes multiple files after approval."""
+    """Requests approval to delete multiple files. Returns the files whose deletion was requested."""
     deleted_files = []
     for filepath in filelist:
         if delete_file(filepath):
@@ -44,7 +75,7 @@ def delete_multiple_files(filelist):
     return deleted_files
 
 def delete_multiple_directories(dirlist):
-    """Deletes multiple directories after approval."""
+    """Requests approval to delete multiple directories. Returns the directories whose deletion was requested."""
     deleted_dirs = []
     for dirpath in dirlist:
         if delete_directory(dirpath):
@@ -52,7 +83,7 @@ def delete_multiple_directories(dirlist):
     return deleted_dirs
 
 def delete_all_files_in_directory(dirpath):
-    """Deletes all files within a directory after approval."""
+    """Requests approval to delete all files within a directory."""
     try:
         if os.path.exists(dirpath) and os.path.isdir(dirpath):
             files_to_delete = [os.path.join(dirpath, f) for f in os.listdir(dirpath) if os.path.isfile(os.path.join(dirpath, f))]
@@ -66,7 +97,7 @@ def delete_all_files_in_directory(dirpath):
         return []
 
 def delete_all_directories_in_directory(dirpath):
-    """Deletes all directories within a directory after approval."""
+    """Requests approval to delete all directories within a directory."""
     try:
         if os.path.exists(dirpath) and os.path.isdir(dirpath):
             dirs_to_delete = [os.path.join(dirpath, d) for d in os.listdir(dirpath) if os.path.isdir(os.path.join(dirpath, d))]
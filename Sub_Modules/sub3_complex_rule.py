@@ -13,19 +13,48 @@ application. These directives are complex and require detailed evaluation
 based on various context data. The module provides a mechanism to check these
 complex rules and handle violations appropriately.
 
+Many contexts can be processed at once with process_rules, which runs the rule checks
+concurrently (bounded by a semaphore) and fetches the law summaries they reference in
+one batched lookup. Synchronous rule check functions run in worker threads so they do
+not block the event loop. Law summaries are kept in an LRU cache with a TTL (law IDs
+without a summary are remembered for a shorter negative_ttl), and concurrent lookups of
+the same law_id share a single database query.
+
+complex_rule_enforcer evaluates the declarative rules in complex_rules.json (see
+sub_rule_dsl.py) against an order and the environmental data. The rule file is
+compiled once into a single function, so the whole rule set costs one pass over the
+fields it references.
+
 Classes:
     RuleViolationError: Exception raised when a rule violation is detected.
     DataContext: Represents the context data for rule evaluation.
+    LawSummaryCache: LRU cache of law summaries with a time-to-live.
     Sub3ComplexRule: Handles complex rule processing and evaluation.
 
 Functions:
     process_rule(context_data, request_id, alertmanager_url=None): Processes and
         evaluates complex rules.
+    process_rules(contexts, alertmanager_url=None): Processes many contexts concurrently.
+    get_complex_rules(): Returns the compiled rule set from complex_rules.json.
+    complex_rule_enforcer(order, environmental_data, rules=None): Enforces the complex
+        rules for an order and returns those that require approval.
 """
 
+import os
+import time
+import asyncio
+import inspect
 import logging
+from collections import OrderedDict
 
 from sub_system import shutdown
+from sub_rule_dsl import RuleSet, load_rules
+
+_MISSING = object()
+
+COMPLEX_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "complex_rules.json")
+
+_complex_rules = None
 
 class RuleViolationError(Exception):
     """
@@ -56,6 +85,60 @@ class DataContext:
         """
         self.context_data = context_data
 
+class LawSummaryCache:
+    """
+    LRU cache of law summaries with a time-to-live.
+
+    Attributes:
+        maxsize (int): Maximum number of summaries kept.
+        ttl (float): Seconds a summary stays valid.
+        negative_ttl (float): Seconds a law ID without a summary is remembered as such.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, negative_ttl=60):
+        """
+        Initializes the cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of summaries kept. Defaults to 1024.
+            ttl (float, optional): Seconds a summary stays valid. Defaults to 300.
+            negative_ttl (float, optional): Seconds a missing summary is remembered.
+                0 disables negative caching. Defaults to 60.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+
+    def get(self, law_id, default=None):
+        """Returns a cached summary (None if cached as not found), or default if missing or expired."""
+        entry = self._entries.get(law_id)
+        if entry is None:
+            return default
+        expires_at, summary = entry
+        if expires_at <= time.monotonic():
+            del self._entries[law_id]
+            return default
+        self._entries.move_to_end(law_id)
+        return summary
+
+    def put(self, law_id, summary):
+        """Caches a summary (None: not found), evicting the least recently used one if full."""
+        ttl = self.ttl if summary is not None else self.negative_ttl
+        if not ttl:
+            return
+        self._entries[law_id] = (time.monotonic() + ttl, summary)
+        self._entries.move_to_end(law_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, law_id=None):
+        """Drops one summary, or all of them."""
+        if law_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(law_id, None)
+
 class Sub3ComplexRule:
     """
     Handles complex rule processing and evaluation.
@@ -65,12 +148,17 @@ class Sub3ComplexRule:
     database handler to process rules and handle violations.
 
     Attributes:
-        rule_check_function (function): Function to check complex rules.
+        rule_check_function (function): Function to check complex rules. May be a
+            coroutine function; a plain function is run in a worker thread.
         shutdown_function (function): Function to handle shutdown procedures.
-        database_handler (object): Object to interact with the database.
+        database_handler (object): Object to interact with the database. Its async
+            get_law_summaries(law_ids) -> {law_id: summary} is used for batched lookups
+            when it has one; otherwise get_law_summary(law_id) is awaited per law_id.
+        max_concurrency (int): Maximum number of rule checks running at once.
+        summary_cache (LawSummaryCache): Cache of law summaries.
     """
 
-    def __init__(self, rule_check_function, shutdown_function, database_handler):
+    def __init__(self, rule_check_function, shutdown_function, database_handler, max_concurrency=100, summary_cache=None):
         """
         Initializes the complex rule handler.
 
@@ -78,10 +166,103 @@ class Sub3ComplexRule:
             rule_check_function (function): Function to check complex rules.
             shutdown_function (function): Function to handle shutdown procedures.
             database_handler (object): Object to interact with the database.
+            max_concurrency (int, optional): Maximum number of rule checks running at once.
+                Defaults to 100.
+            summary_cache (LawSummaryCache, optional): Cache of law summaries. A cache with
+                default size and TTL is created if None.
         """
         self.rule_check_function = rule_check_function
         self.shutdown_function = shutdown_function
         self.database_handler = database_handler
+        self.max_concurrency = max_concurrency
+        self.summary_cache = summary_cache if summary_cache is not None else LawSummaryCache()
+        self._in_flight = {}
+
+    async def _check(self, context_data, request_id):
+        """Runs the rule check function: awaited if it is a coroutine function, otherwise in a worker thread."""
+        context = DataContext(context_data)
+        if inspect.iscoroutinefunction(self.rule_check_function):
+            passed = self.rule_check_function(context, request_id)
+        else:
+            passed = await asyncio.to_thread(self.rule_check_function, context, request_id)
+        if inspect.isawaitable(passed):
+            passed = await passed
+        return passed
+
+    async def _fetch_law_summaries(self, law_ids):
+        """Fetches summaries from the database in one batch where the handler supports it."""
+        batch = getattr(self.database_handler, "get_law_summaries", None)
+        if batch is not None:
+            return await batch(law_ids) or {}
+        summaries = await asyncio.gather(*(self.database_handler.get_law_summary(law_id) for law_id in law_ids))
+        return dict(zip(law_ids, summaries))
+
+    async def get_law_summaries(self, law_ids):
+        """
+        Returns summaries for several law IDs, using the cache and coalescing lookups.
+
+        Law IDs already being fetched by another call are awaited rather than queried
+        again; the remaining misses are fetched in one batch. Law IDs found to have no
+        summary are cached as such (for the cache's negative_ttl).
+
+        Args:
+            law_ids (iterable): Law IDs.
+
+        Returns:
+            dict: law_id -> summary (None if not found).
+        """
+        summaries = {}
+        waiting = {}
+        missing = []
+        for law_id in dict.fromkeys(law_ids):
+            summary = self.summary_cache.get(law_id, _MISSING)
+            if summary is not _MISSING:
+                summaries[law_id] = summary
+            elif law_id in self._in_flight:
+                waiting[law_id] = self._in_flight[law_id]
+            else:
+                missing.append(law_id)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {law_id: loop.create_future() for law_id in missing}
+            self._in_flight.update(futures)
+            try:
+                fetched = await self._fetch_law_summaries(missing)
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()  # Mark retrieved; waiters re-raise it themselves.
+                raise
+            finally:
+                for law_id in missing:
+                    self._in_flight.pop(law_id, None)
+            for law_id in missing:
+                summary = fetched.get(law_id)
+                self.summary_cache.put(law_id, summary)
+                summaries[law_id] = summary
+                futures[law_id].set_result(summary)
+
+        for law_id, future in waiting.items():
+            summaries[law_id] = await future
+        return summaries
+
+    def _passed_result(self, law_id, law_summary):
+        if law_id:
+            if law_summary:
+                logging.info(f"Retrieved law summary for law ID: {law_id}")
+                return {"rule_passed": True, "law_summary": law_summary}
+            logging.warning(f"Law summary not found for law ID: {law_id}")
+            return {"rule_passed": True}  # Or handle this case differently
+        return {"rule_passed": True}
+
+    def _error_result(self, error, request_id, alertmanager_url):
+        if isinstance(error, RuleViolationError):
+            logging.error(f"Rule violation error for request {request_id}: {error}")
+            return {"rule_violation": True}
+        logging.error(f"Error processing rule for request {request_id}: {error}")
+        self.shutdown_function(f"Rule processing error: {error}", alertmanager_url, severity="error", grouping_key="rule_processing")
+        return {"error": "Internal rule processing error"}
 
     async def process_rule(self, context_data, request_id, alertmanager_url=None):
         """
@@ -105,30 +286,108 @@ class Sub3ComplexRule:
             RuleViolationError: If a rule violation is detected.
         """
         try:
-            context = DataContext(context_data)
-            if self.rule_check_function(context, request_id):
+            if await self._check(context_data, request_id):
                 logging.info(f"Rules passed for request: {request_id}")
 
                 # Example: Retrieving a law summary (adapt to your logic)
                 law_id = context_data.get("law_id")  # Assuming law_id is in context
-                if law_id:
-                    law_summary = await self.database_handler.get_law_summary(law_id)
-                    if law_summary:
-                        logging.info(f"Retrieved law summary for law ID: {law_id}")
-                        return {"rule_passed": True, "law_summary": law_summary}
-                    else:
-                        logging.warning(f"Law summary not found for law ID: {law_id}")
-                        return {"rule_passed": True}  # Or handle this case differently
-                else:
-                    return {"rule_passed": True}
+                law_summary = (await self.get_law_summaries([law_id]))[law_id] if law_id else None
+                return self._passed_result(law_id, law_summary)
 
             else:
                 logging.warning(f"Rule violation detected for request: {request_id}")
                 raise RuleViolationError("Rule violation detected.")
-        except RuleViolationError as e:
-            logging.error(f"Rule violation error for request {request_id}: {e}")
-            return {"rule_violation": True}
         except Exception as e:
-            logging.error(f"Error processing rule for request {request_id}: {e}")
-            self.shutdown_function(f"Rule processing error: {e}", alertmanager_url, severity="error", grouping_key="rule_processing")
-            return {"error": "Internal rule processing error"}
+            return self._error_result(e, request_id, alertmanager_url)
+
+    async def process_rules(self, contexts, alertmanager_url=None):
+        """
+        Processes many rule contexts concurrently.
+
+        Rule checks run concurrently, at most max_concurrency at a time. The law
+        summaries of every passing context are then fetched together: each distinct
+        law_id is looked up once (from the cache where possible, otherwise in a single
+        batched query).
+
+        Args:
+            contexts (iterable): (context_data, request_id) pairs.
+            alertmanager_url (str, optional): URL for Alertmanager notifications.
+
+        Returns:
+            list: One result dict per context, in input order, shaped like process_rule's.
+        """
+        contexts = list(contexts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def check(context_data, request_id):
+            async with semaphore:
+                try:
+                    if await self._check(context_data, request_id):
+                        logging.info(f"Rules passed for request: {request_id}")
+                        return None
+                    logging.warning(f"Rule violation detected for request: {request_id}")
+                    return RuleViolationError("Rule violation detected.")
+                except Exception as e:
+                    return e
+
+        outcomes = await asyncio.gather(*(check(context_data, request_id) for context_data, request_id in contexts))
+
+        law_ids = [context_data.get("law_id") for (context_data, _), outcome in zip(contexts, outcomes)
+                   if outcome is None and context_data.get("law_id")]
+        summaries = {}
+        lookup_error = None
+        if law_ids:
+            try:
+                summaries = await self.get_law_summaries(law_ids)
+            except Exception as e:
+                lookup_error = e
+
+        results = []
+        for (context_data, request_id), outcome in zip(contexts, outcomes):
+            law_id = context_data.get("law_id")
+            if outcome is None and law_id and lookup_error is not None:
+                outcome = lookup_error
+            if outcome is not None:
+                results.append(self._error_result(outcome, request_id, alertmanager_url))
+            else:
+                results.append(self._passed_result(law_id, summaries.get(law_id)))
+        return results
+
+def get_complex_rules():
+    """
+    Returns the rule set compiled from complex_rules.json, compiling it on first use.
+
+    Returns:
+        RuleSet: The compiled rules.
+    """
+    global _complex_rules
+    if _complex_rules is None:
+        _complex_rules = RuleSet(load_rules(COMPLEX_RULES_FILE))
+    return _complex_rules
+
+def complex_rule_enforcer(order, environmental_data, rules=None):
+    """
+    Enforces the complex rules for an order.
+
+    The rule context is the environmental data with the order under the "order" key.
+    Rules with action "shutdown" shut the system down, and anything else is logged.
+    Rules with action "approval" are returned: the caller must not carry out the order
+    until they are approved.
+
+    Args:
+        order (str): The (analyzed) order.
+        environmental_data (dict): Environmental data, monitor name -> result.
+        rules (RuleSet, optional): Rules to enforce. Defaults to get_complex_rules().
+
+    Returns:
+        list: The triggered Rule objects with action "approval".
+    """
+    rules = rules if rules is not None else get_complex_rules()
+    context = dict(environmental_data or {})
+    context["order"] = order
+    triggered = rules.triggered(context)
+    for rule in triggered:
+        logging.warning(f"Complex rule '{rule.name}' triggered for order '{order}': {rule.message}")
+        if rule.action == "shutdown":
+            shutdown(rule.message)
+    return [rule for rule in triggered if rule.action == "approval"]
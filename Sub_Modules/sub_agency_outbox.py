@@ -0,0 +1,278 @@
+"""
+Sub_agency_outbox Module
+
+This module provides a persistent, batched outbox for data sent to environmental
+agencies. Producers only enqueue: each item is written to a local SQLite queue and the
+call returns without touching the network. A background sender drains the queue per
+agency in batches, gzip-compresses each batch, posts it over a connection-pooled
+session with a timeout, and retries failures with exponential backoff and jitter.
+Nothing is lost if an agency is down; items stay queued (across restarts) until they
+are delivered or exceed the maximum number of attempts.
+
+Retry settings default to the RETRY_BACKOFF_* values documented in .env.example.
+
+Batch request body (gzip-compressed JSON, Content-Encoding: gzip):
+    {"agency": "<agency>", "items": [<data>, ...]}
+
+Classes:
+    AgencyOutbox: SQLite-backed outbox with a batching, retrying sender.
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+class AgencyOutbox:
+    """
+    SQLite-backed outbox with a batching, retrying sender.
+
+    Attributes:
+        endpoints (dict): Agency -> URL.
+        db_path (str): Path of the SQLite queue.
+        batch_size (int): Maximum items per request.
+        timeout (float): Per-request timeout in seconds.
+        max_attempts (int): Attempts before an item is marked dead.
+        base_delay (float): Initial retry delay in seconds.
+        max_delay (float): Maximum retry delay in seconds.
+        jitter (bool): Randomize retry delays.
+    """
+
+    def __init__(self, endpoints, db_path="agency_outbox.db", batch_size=100, timeout=10, max_attempts=20,
+                 base_delay=None, max_delay=None, jitter=None, session=None, pool_size=10, poll_interval=1.0):
+        """
+        Initializes the outbox. Call start() to begin delivering.
+
+        Args:
+            endpoints (dict): Agency -> URL.
+            db_path (str, optional): SQLite queue path. Defaults to "agency_outbox.db".
+            batch_size (int, optional): Maximum items per request. Defaults to 100.
+            timeout (float, optional): Per-request timeout in seconds. Defaults to 10.
+            max_attempts (int, optional): Attempts before an item is marked dead. Defaults to 20.
+            base_delay (float, optional): Initial retry delay. Defaults to RETRY_BACKOFF_BASE_DELAY or 1.
+            max_delay (float, optional): Maximum retry delay. Defaults to RETRY_BACKOFF_MAX_DELAY or 60.
+            jitter (bool, optional): Randomize delays. Defaults to RETRY_BACKOFF_JITTER or True.
+            session (requests.Session, optional): HTTP session. A pooled session is created if None.
+            pool_size (int, optional): Connections kept per host. Defaults to 10.
+            poll_interval (float, optional): Seconds between checks for due items. Defaults to 1.
+        """
+        self.endpoints = dict(endpoints)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("RETRY_BACKOFF_BASE_DELAY", 1))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("RETRY_BACKOFF_MAX_DELAY", 60))
+        self.jitter = jitter if jitter is not None else os.getenv("RETRY_BACKOFF_JITTER", "True").lower() == "true"
+        self.poll_interval = poll_interval
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._agency_retry_at = {}
+        self._metrics = {"enqueued": 0, "delivered": 0, "batches_sent": 0, "batches_failed": 0,
+                         "retries": 0, "dead": 0, "bytes_raw": 0, "bytes_compressed": 0}
+        self._metrics_lock = threading.Lock()
+        self._create_tables()
+
+    def _create_tables(self):
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    agency TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    last_error TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, agency, next_attempt_at, id)")
+            self._conn.commit()
+
+    def _count(self, metric, amount=1):
+        with self._metrics_lock:
+            self._metrics[metric] += amount
+
+    def enqueue(self, agency, data):
+        """
+        Queues data for an agency. Never blocks on the network.
+
+        Args:
+            agency (str): Agency name (a key of endpoints).
+            data (dict): JSON-serializable payload.
+
+        Raises:
+            KeyError: If the agency has no endpoint.
+        """
+        if agency not in self.endpoints:
+            raise KeyError(f"No endpoint configured for agency: {agency}")
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("INSERT INTO outbox (agency, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                               (agency, payload, now, now))
+            self._conn.commit()
+        self._count("enqueued")
+        self._wake.set()
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def _due_agencies(self, now):
+        with self._db_lock:
+            rows = self._conn.execute("SELECT DISTINCT agency FROM outbox WHERE status = 'pending' AND next_attempt_at <= ?",
+                                      (now,)).fetchall()
+        return [row[0] for row in rows if self._agency_retry_at.get(row[0], 0) <= now]
+
+    def _send_batch(self, agency, now):
+        """Sends one batch for an agency. Returns the number of items delivered."""
+        with self._db_lock:
+            rows = self._conn.execute("""
+                SELECT id, payload, attempts FROM outbox
+                WHERE status = 'pending' AND agency = ? AND next_attempt_at <= ?
+                ORDER BY id LIMIT ?
+            """, (agency, now, self.batch_size)).fetchall()
+        if not rows:
+            return 0
+        body = ('{"agency":' + json.dumps(agency) + ',"items":[' + ",".join(row[1] for row in rows) + "]}").encode("utf-8")
+        compressed = gzip.compress(body, compresslevel=6)
+        ids = [row[0] for row in rows]
+        try:
+            response = self.session.post(self.endpoints[agency], data=compressed, timeout=self.timeout,
+                                         headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+            response.raise_for_status()
+        except Exception as e:
+            self._count("batches_failed")
+            logging.error(f"Failed to send {len(rows)} items to {agency} agency: {e}")
+            # One backoff for the whole batch, so its items are retried together as a batch.
+            next_attempt_at = time.time() + self._backoff(max(row[2] for row in rows) + 1)
+            retry_at = []
+            dead = []
+            for row_id, _, attempts in rows:
+                if attempts + 1 >= self.max_attempts:
+                    dead.append((str(e), row_id))
+                else:
+                    retry_at.append((next_attempt_at, str(e), row_id))
+            # Hold back the agency's other items too until the batch can be retried.
+            self._agency_retry_at[agency] = next_attempt_at if retry_at else time.time()
+            with self._db_lock:
+                self._conn.executemany("UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?", retry_at)
+                self._conn.executemany("UPDATE outbox SET attempts = attempts + 1, status = 'dead', last_error = ? WHERE id = ?", dead)
+                self._conn.commit()
+            self._count("retries", len(retry_at))
+            if dead:
+                self._count("dead", len(dead))
+                logging.error(f"{len(dead)} items for {agency} agency exceeded {self.max_attempts} attempts and were marked dead.")
+            return 0
+        with self._db_lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+            self._conn.commit()
+        self._count("delivered", len(rows))
+        self._count("batches_sent")
+        self._count("bytes_raw", len(body))
+        self._count("bytes_compressed", len(compressed))
+        logging.info(f"Sent {len(rows)} items to {agency} agency ({len(body)} -> {len(compressed)} bytes).")
+        return len(rows)
+
+    def deliver_due(self):
+        """
+        Sends every batch that is currently due, agency by agency.
+
+        Returns:
+            int: Number of items delivered.
+        """
+        delivered = 0
+        now = time.time()
+        for agency in self._due_agencies(now):
+            while True:
+                sent = self._send_batch(agency, now)
+                delivered += sent
+                if sent < self.batch_size:
+                    break
+        return delivered
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.deliver_due()
+            except Exception as e:
+                logging.error(f"Error in agency outbox sender: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        """Starts the background sender."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="agency-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush=True):
+        """
+        Stops the background sender.
+
+        Args:
+            flush (bool, optional): Make one last delivery attempt for due items. Defaults to True.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.deliver_due()
+
+    def pending(self, agency=None):
+        """Returns the number of items still waiting for delivery."""
+        query = "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+        params = ()
+        if agency is not None:
+            query += " AND agency = ?"
+            params = (agency,)
+        with self._db_lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def metrics(self):
+        """Returns delivery metrics, including the current queue depth and dead items."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["pending"] = self.pending()
+        with self._db_lock:
+            metrics["dead_total"] = self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'dead'").fetchone()[0]
+        return metrics
+
+    def close(self):
+        """Stops the sender and closes the queue database."""
+        self.stop()
+        with self._db_lock:
+            self._conn.close()
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    outbox = AgencyOutbox({"noise": "https://simulated-agency.com/noise"}, db_path=":memory:", max_attempts=2, base_delay=0.1)
+    outbox.enqueue("noise", {"location": "London", "data": {"decibels": 70}})
+    outbox.deliver_due()
+    print(outbox.metrics())
+    outbox.close()
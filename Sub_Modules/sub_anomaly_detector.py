@@ -0,0 +1,348 @@
+"""
+Sub_anomaly_detector Module
+
+This module provides a streaming spike/drop detector for sensor readings. Each
+(sensor, param) series keeps its state in compact parallel arrays (last value, EWMA
+mean and variance, sample count and fixed-delta threshold), and a whole batch of
+readings is evaluated in one vectorized step (NumPy when installed, a plain loop over
+the same arrays otherwise). Three rules are applied to every reading:
+
+    * fixed delta: |value - previous| exceeds the configured threshold;
+    * z-score: the value is more than z_threshold EWMA standard deviations from the
+      EWMA mean (once min_samples readings have been seen);
+    * both are reported together when both fire.
+
+Detectors are thread-safe. AnomalyDetectionService processes many locations
+concurrently from a queue while keeping the readings of each location in order.
+
+Classes:
+    Anomaly: A detected spike or drop.
+    StreamingAnomalyDetector: Per-series streaming detector.
+    AnomalyDetectionService: Queue/callback front end for many locations.
+"""
+
+import math
+import queue
+import logging
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; evaluation falls back to a Python loop.
+    np = None
+
+class Anomaly:
+    """
+    A detected spike or drop.
+
+    Attributes:
+        sensor (str): Sensor (monitor) name.
+        param (str): Reading name.
+        value (float): Current value.
+        previous (float): Previous value, or None for the first reading.
+        change (float): value - previous (0 for the first reading).
+        change_type (str): "spike" or "drop".
+        severity (float): How far past the triggering threshold the reading is (>1).
+        rule (str): "delta", "zscore" or "delta+zscore".
+        zscore (float): Distance from the EWMA mean in standard deviations.
+    """
+
+    __slots__ = ("sensor", "param", "value", "previous", "change", "change_type", "severity", "rule", "zscore")
+
+    def __init__(self, sensor, param, value, previous, change, severity, rule, zscore):
+        self.sensor = sensor
+        self.param = param
+        self.value = value
+        self.previous = previous
+        self.change = change
+        self.change_type = "spike" if (change if change else zscore) > 0 else "drop"
+        self.severity = severity
+        self.rule = rule
+        self.zscore = zscore
+
+    def to_payload(self, location):
+        """Returns the agency payload for this anomaly."""
+        return {"location": location, "param": self.param, "value": self.value, "change_type": self.change_type,
+                "change_amount": self.change, "change_severity": self.severity, "rule": self.rule, "zscore": self.zscore}
+
+    def __repr__(self):
+        return (f"Anomaly({self.sensor}.{self.param}={self.value}, {self.change_type}, rule={self.rule}, "
+                f"severity={self.severity:.2f})")
+
+class StreamingAnomalyDetector:
+    """
+    Per-series streaming spike/drop detector.
+
+    Attributes:
+        thresholds (dict): Sensor -> param -> fixed-delta threshold.
+        alpha (float): EWMA smoothing factor.
+        z_threshold (float): Z-score above which a reading is anomalous.
+        min_samples (int): Readings required before the z-score rule applies.
+    """
+
+    def __init__(self, thresholds=None, alpha=0.1, z_threshold=4.0, min_samples=10, track_all=False):
+        """
+        Initializes the detector.
+
+        Args:
+            thresholds (dict, optional): Sensor -> param -> fixed-delta threshold.
+            alpha (float, optional): EWMA smoothing factor. Defaults to 0.1.
+            z_threshold (float, optional): Z-score threshold. Defaults to 4.0.
+            min_samples (int, optional): Readings before the z-score rule applies. Defaults to 10.
+            track_all (bool, optional): Track numeric params without a fixed threshold too
+                (z-score rule only). Defaults to False.
+        """
+        self.thresholds = thresholds or {}
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.track_all = track_all
+        self._index = {}
+        self._keys = []
+        self._last = array("d")
+        self._mean = array("d")
+        self._var = array("d")
+        self._count = array("q")
+        self._threshold = array("d")
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        """Registers callback(location, anomaly), called for every anomaly detected."""
+        self._callbacks.append(callback)
+
+    def _series(self, sensor, param):
+        key = (sensor, param)
+        index = self._index.get(key)
+        if index is None:
+            threshold = self.thresholds.get(sensor, {}).get(param)
+            if threshold is None and not self.track_all:
+                return None
+            index = len(self._keys)
+            self._index[key] = index
+            self._keys.append(key)
+            self._last.append(0.0)
+            self._mean.append(0.0)
+            self._var.append(0.0)
+            self._count.append(0)
+            self._threshold.append(math.nan if threshold is None else float(threshold))
+        return index
+
+    def _gather(self, sensor_readings):
+        """Maps readings to series indexes, registering new series. Repeated series are kept, in order."""
+        indexes, values = [], []
+        items = sensor_readings.items() if isinstance(sensor_readings, dict) else sensor_readings
+        for sensor, readings in items:
+            if isinstance(readings, dict) and isinstance(readings.get("details"), dict):
+                readings = readings["details"]
+            if not isinstance(readings, dict):
+                continue
+            for param, value in readings.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    index = self._series(sensor, param)
+                    if index is not None:
+                        indexes.append(index)
+                        values.append(float(value))
+        return indexes, values
+
+    def _evaluate_numpy(self, indexes, values):
+        idx = np.asarray(indexes, dtype=np.intp)
+        x = np.asarray(values, dtype=np.float64)
+        if len(np.unique(idx)) == len(idx):
+            return [result.tolist() for result in self._evaluate_wave(idx, x)]
+        # A fancy-index assignment keeps only the last write per index, so readings of a
+        # series that repeats in the batch are evaluated in waves: the k-th reading of
+        # every series in wave k, each wave seeing the state left by the one before.
+        order = np.argsort(idx, kind="stable")
+        positions = np.arange(len(idx))
+        first = np.r_[True, idx[order][1:] != idx[order][:-1]]
+        occurrence = np.empty(len(idx), dtype=np.intp)
+        occurrence[order] = positions - np.maximum.accumulate(np.where(first, positions, 0))
+        results = [np.empty(len(idx)), np.empty(len(idx), dtype=bool), np.empty(len(idx)), np.empty(len(idx)), np.empty(len(idx))]
+        for wave in range(occurrence.max() + 1):
+            selected = occurrence == wave
+            for result, wave_result in zip(results, self._evaluate_wave(idx[selected], x[selected])):
+                result[selected] = wave_result
+        return [result.tolist() for result in results]
+
+    def _evaluate_wave(self, idx, x):
+        """Evaluates readings of distinct series in one vectorized step."""
+        last, mean, var = np.frombuffer(self._last), np.frombuffer(self._mean), np.frombuffer(self._var)
+        count, threshold = np.frombuffer(self._count, dtype=np.int64), np.frombuffer(self._threshold)
+        try:
+            prev, m, v, n, t = last[idx], mean[idx], var[idx], count[idx], threshold[idx]
+            has_prev = n > 0
+            change = np.where(has_prev, x - prev, 0.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                delta_severity = np.where(has_prev & ~np.isnan(t) & (t > 0), np.abs(change) / t, 0.0)
+                std = np.sqrt(v)
+                z = np.where((n >= self.min_samples) & (std > 0), (x - m) / std, 0.0)
+            diff = x - m
+            last[idx] = x
+            mean[idx] = np.where(has_prev, m + self.alpha * diff, x)
+            var[idx] = np.where(has_prev, (1 - self.alpha) * (v + self.alpha * diff * diff), 0.0)
+            count[idx] = n + 1
+            return prev, has_prev, change, delta_severity, z
+        finally:
+            del last, mean, var, count, threshold
+
+    def _evaluate_python(self, indexes, values):
+        prevs, has_prevs, changes, delta_severities, zs = [], [], [], [], []
+        alpha = self.alpha
+        for i, x in zip(indexes, values):
+            prev, m, v, n, t = self._last[i], self._mean[i], self._var[i], self._count[i], self._threshold[i]
+            has_prev = n > 0
+            change = x - prev if has_prev else 0.0
+            std = math.sqrt(v)
+            prevs.append(prev)
+            has_prevs.append(has_prev)
+            changes.append(change)
+            delta_severities.append(abs(change) / t if has_prev and not math.isnan(t) and t > 0 else 0.0)
+            zs.append((x - m) / std if n >= self.min_samples and std > 0 else 0.0)
+            diff = x - m
+            self._last[i] = x
+            self._mean[i] = m + alpha * diff if has_prev else x
+            self._var[i] = (1 - alpha) * (v + alpha * diff * diff) if has_prev else 0.0
+            self._count[i] = n + 1
+        return prevs, has_prevs, changes, delta_severities, zs
+
+    def update(self, sensor_readings, location=None):
+        """
+        Evaluates one set of readings and updates the per-series state.
+
+        Args:
+            sensor_readings (dict or iterable): Sensor -> {param: value}, or sensor -> monitor
+                result (its "details" are used). May also be (sensor, readings) pairs, in
+                which a sensor can repeat; its readings are then evaluated in order.
+            location (str, optional): Location passed to the callbacks.
+
+        Returns:
+            list: Anomaly records, one per reading that triggered a rule.
+        """
+        with self._lock:
+            indexes, values = self._gather(sensor_readings)
+            if not indexes:
+                return []
+            evaluate = self._evaluate_numpy if np is not None else self._evaluate_python
+            prevs, has_prevs, changes, delta_severities, zs = evaluate(indexes, values)
+            keys = [self._keys[i] for i in indexes]
+
+        anomalies = []
+        for (sensor, param), value, prev, has_prev, change, delta_severity, z in zip(
+                keys, values, prevs, has_prevs, changes, delta_severities, zs):
+            delta_hit = delta_severity > 1
+            z_hit = abs(z) > self.z_threshold
+            if not (delta_hit or z_hit):
+                continue
+            rule = "delta+zscore" if delta_hit and z_hit else "delta" if delta_hit else "zscore"
+            severity = max(delta_severity, abs(z) / self.z_threshold)
+            anomalies.append(Anomaly(sensor, param, value, prev if has_prev else None, change, severity, rule, z))
+
+        for anomaly in anomalies:
+            for callback in self._callbacks:
+                try:
+                    callback(location, anomaly)
+                except Exception as e:
+                    logging.error(f"Error in anomaly callback: {e}")
+        return anomalies
+
+    def reset(self):
+        """Forgets all series state."""
+        with self._lock:
+            self._index = {}
+            self._keys = []
+            for column in (self._last, self._mean, self._var, self._count, self._threshold):
+                del column[:]
+
+class AnomalyDetectionService:
+    """
+    Processes readings for many locations concurrently.
+
+    Readings are submitted to a queue and handled by a pool of worker threads. Each
+    location is always handled by the same worker, so its readings are evaluated in
+    the order they were submitted. Anomalies are delivered to callbacks and, if given,
+    put on an output queue as (location, anomaly) tuples.
+
+    Attributes:
+        num_workers (int): Number of worker threads.
+        output_queue (queue.Queue): Queue receiving (location, anomaly) tuples, or None.
+    """
+
+    def __init__(self, num_workers=4, detector_factory=None, callbacks=None, output_queue=None, max_queue_size=10000):
+        """
+        Initializes the service and starts its workers.
+
+        Args:
+            num_workers (int, optional): Number of worker threads. Defaults to 4.
+            detector_factory (callable, optional): Returns a new StreamingAnomalyDetector
+                for a location.
+            callbacks (list, optional): callback(location, anomaly) functions.
+            output_queue (queue.Queue, optional): Queue receiving (location, anomaly).
+            max_queue_size (int, optional): Per-worker queue bound. Defaults to 10000.
+        """
+        self.num_workers = num_workers
+        self.detector_factory = detector_factory or StreamingAnomalyDetector
+        self.callbacks = list(callbacks or [])
+        self.output_queue = output_queue
+        self._detectors = {}
+        self._detectors_lock = threading.Lock()
+        self._queues = [queue.Queue(maxsize=max_queue_size) for _ in range(num_workers)]
+        self._threads = []
+        for worker_queue in self._queues:
+            thread = threading.Thread(target=self._worker, args=(worker_queue,), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def detector(self, location):
+        """Returns the detector for a location, creating it on first use."""
+        with self._detectors_lock:
+            detector = self._detectors.get(location)
+            if detector is None:
+                detector = self.detector_factory()
+                self._detectors[location] = detector
+            return detector
+
+    def submit(self, location, sensor_readings):
+        """Queues readings for a location. Blocks if that location's worker queue is full."""
+        self._queues[hash(location) % self.num_workers].put((location, sensor_readings))
+
+    def _worker(self, worker_queue):
+        while True:
+            item = worker_queue.get()
+            try:
+                if item is None:
+                    return
+                location, sensor_readings = item
+                for anomaly in self.detector(location).update(sensor_readings, location):
+                    for callback in self.callbacks:
+                        try:
+                            callback(location, anomaly)
+                        except Exception as e:
+                            logging.error(f"Error in anomaly callback: {e}")
+                    if self.output_queue is not None:
+                        self.output_queue.put((location, anomaly))
+            except Exception as e:
+                logging.error(f"Error detecting anomalies: {e}")
+            finally:
+                worker_queue.task_done()
+
+    def wait_completion(self):
+        """Waits until every submitted reading has been processed."""
+        for worker_queue in self._queues:
+            worker_queue.join()
+
+    def stop(self):
+        """Processes the remaining readings and stops the workers."""
+        for worker_queue in self._queues:
+            worker_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    detector = StreamingAnomalyDetector({"noise": {"decibels": 10}}, track_all=True)
+    for reading in [50, 51, 49, 50, 52, 50, 51, 49, 50, 51, 50, 75, 50]:
+        for anomaly in detector.update({"noise": {"decibels": reading}}):
+            print(anomaly)
@@ -0,0 +1,424 @@
+"""
+Sub_approval_queue Module
+
+This module provides a persistent approval queue that replaces blocking on stdin.
+A request for approval is stored in SQLite with an id and returns immediately; the
+caller carries on (or waits on that one id if it really needs the answer), and an
+approver resolves items later, from this process or any other one sharing the database,
+e.g. with the command line:
+
+    python sub_approval_queue.py list
+    python sub_approval_queue.py approve 42 --by alice
+    python sub_approval_queue.py deny 42 --note "not during working hours"
+
+Every approval has a deadline. When it passes, the queue's timeout policy resolves it
+("deny" by default, so nothing proceeds unattended). Follow-up work is attached by
+action name: the payload's "action" selects a handler registered with
+register_handler, and the handler runs once, in whichever process runs the queue's
+background thread, after the approval is resolved. Because handlers are found by name
+rather than stored as callables, deferred actions survive a restart.
+
+Classes:
+    Approval: One approval request.
+    ApprovalQueue: SQLite-backed queue of approval requests.
+
+Functions:
+    get_approval_queue(): Returns the process-wide, started ApprovalQueue.
+    register_handler(action, handler): Registers a handler on the process-wide queue.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+PENDING = "pending"
+APPROVED = "approved"
+DENIED = "denied"
+EXPIRED_APPROVED = "expired_approved"
+EXPIRED_DENIED = "expired_denied"
+
+class Approval:
+    """
+    One approval request.
+
+    Attributes:
+        id (int): Approval id.
+        message (str): What is being approved.
+        payload (dict): Data for the handler; its "action" key selects the handler.
+        status (str): "pending", "approved", "denied", "expired_approved" or "expired_denied".
+        created_at (float): Time of the request (seconds since the epoch).
+        expires_at (float): Deadline, after which the timeout policy applies.
+        resolved_at (float): Time of resolution, or None.
+        resolver (str): Who resolved it ("timeout" for the timeout policy), or None.
+        note (str): Approver's note, or None.
+    """
+
+    __slots__ = ("id", "message", "payload", "status", "created_at", "expires_at", "resolved_at", "resolver", "note")
+
+    def __init__(self, id, message, payload, status, created_at, expires_at, resolved_at=None, resolver=None, note=None):
+        self.id = id
+        self.message = message
+        self.payload = payload
+        self.status = status
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.resolved_at = resolved_at
+        self.resolver = resolver
+        self.note = note
+
+    @property
+    def approved(self):
+        """True if the request was approved (explicitly or by the timeout policy)."""
+        return self.status in (APPROVED, EXPIRED_APPROVED)
+
+    @property
+    def pending(self):
+        """True while the request is unresolved."""
+        return self.status == PENDING
+
+    def __repr__(self):
+        return f"Approval({self.id}, {self.status!r}, {self.message!r})"
+
+_COLUMNS = "id, message, payload, status, created_at, expires_at, resolved_at, resolver, note"
+
+class ApprovalQueue:
+    """
+    SQLite-backed queue of approval requests.
+
+    Attributes:
+        db_path (str): Path of the SQLite database.
+        default_timeout (float): Seconds before an unresolved request times out.
+        timeout_policy (str): "deny" or "approve"; how timed-out requests are resolved.
+        poll_interval (float): Seconds between background checks.
+    """
+
+    def __init__(self, db_path="approvals.db", default_timeout=3600, timeout_policy="deny", poll_interval=1.0):
+        """
+        Opens (and if needed creates) the queue.
+
+        Args:
+            db_path (str, optional): Path of the SQLite database. Defaults to "approvals.db".
+            default_timeout (float, optional): Seconds before a request times out. Defaults to 3600.
+            timeout_policy (str, optional): "deny" or "approve". Defaults to "deny".
+            poll_interval (float, optional): Seconds between background checks. Defaults to 1.0.
+
+        Raises:
+            ValueError: If the timeout policy is unknown.
+        """
+        if timeout_policy not in ("deny", "approve"):
+            raise ValueError(f"Unknown timeout policy: {timeout_policy}")
+        self.db_path = db_path
+        self.default_timeout = default_timeout
+        self.timeout_policy = timeout_policy
+        self.poll_interval = poll_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._resolved = threading.Condition(self._lock)
+        self._handlers = {}
+        self._callbacks = []
+        self._thread = None
+        self._stop = threading.Event()
+        with self._lock:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS approvals (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    action TEXT,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    resolved_at REAL,
+                    resolver TEXT,
+                    note TEXT,
+                    handled INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_approvals_status ON approvals (status, expires_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_approvals_dispatch ON approvals (handled, action, status)")
+            self._conn.commit()
+
+    @staticmethod
+    def _approval(row):
+        values = list(row)
+        values[2] = json.loads(values[2])
+        return Approval(*values)
+
+    def register_handler(self, action, handler):
+        """
+        Registers the handler run once an approval with payload["action"] == action is resolved.
+
+        Args:
+            action (str): Action name.
+            handler (function): Called with the resolved Approval.
+        """
+        self._handlers[action] = handler
+
+    def add_callback(self, callback):
+        """Registers a function called with every Approval resolved in this process."""
+        self._callbacks.append(callback)
+
+    def submit(self, message, payload=None, timeout=None):
+        """
+        Queues a request for approval.
+
+        Args:
+            message (str): What is being approved.
+            payload (dict, optional): Data for the handler; "action" selects it.
+            timeout (float, optional): Seconds before the timeout policy applies.
+                Defaults to default_timeout.
+
+        Returns:
+            int: Approval id.
+        """
+        now = time.time()
+        timeout = self.default_timeout if timeout is None else timeout
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO approvals (message, payload, action, status, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (message, json.dumps(payload or {}, default=str), (payload or {}).get("action"), PENDING, now, now + timeout))
+            self._conn.commit()
+        logging.info(f"Approval {cursor.lastrowid} requested: {message}")
+        return cursor.lastrowid
+
+    def get(self, approval_id):
+        """Returns an Approval, or None if the id is unknown."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM approvals WHERE id = ?", (approval_id,)).fetchone()
+        return self._approval(row) if row else None
+
+    def pending(self, limit=None):
+        """
+        Returns the unresolved requests, oldest first.
+
+        Args:
+            limit (int, optional): Maximum number returned.
+
+        Returns:
+            list: Approval objects.
+        """
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM approvals WHERE status = ? ORDER BY id LIMIT ?",
+                                      (PENDING, -1 if limit is None else limit)).fetchall()
+        return [self._approval(row) for row in rows]
+
+    def resolve(self, approval_id, approved, resolver=None, note=None):
+        """
+        Approves or denies a pending request.
+
+        Args:
+            approval_id (int): Approval id.
+            approved (bool): True to approve, False to deny.
+            resolver (str, optional): Who resolved it.
+            note (str, optional): Approver's note.
+
+        Returns:
+            bool: True if the request was pending and is now resolved.
+        """
+        status = APPROVED if approved else DENIED
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE approvals SET status = ?, resolved_at = ?, resolver = ?, note = ? WHERE id = ? AND status = ?",
+                (status, time.time(), resolver, note, approval_id, PENDING))
+            self._conn.commit()
+            changed = cursor.rowcount == 1
+            if changed:
+                self._resolved.notify_all()
+        if changed:
+            logging.info(f"Approval {approval_id} {status} by {resolver or 'unknown'}.")
+            self.dispatch()
+        return changed
+
+    def expire_due(self):
+        """
+        Applies the timeout policy to every request past its deadline.
+
+        Returns:
+            int: Number of requests expired.
+        """
+        status = EXPIRED_APPROVED if self.timeout_policy == "approve" else EXPIRED_DENIED
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE approvals SET status = ?, resolved_at = ?, resolver = 'timeout' WHERE status = ? AND expires_at <= ?",
+                (status, now, PENDING, now))
+            self._conn.commit()
+            if cursor.rowcount:
+                self._resolved.notify_all()
+        if cursor.rowcount:
+            logging.warning(f"{cursor.rowcount} approvals timed out ({status}).")
+        return cursor.rowcount
+
+    def dispatch(self):
+        """
+        Runs handlers and callbacks for resolved requests that have not been handled yet.
+
+        Each request is claimed in the database first, so it is handled once even when
+        several processes share the queue. Only requests this process can handle are
+        read: those whose action has a handler registered here, and those without an
+        action (which are marked handled here, running this process's callbacks if any).
+        Requests for actions handled elsewhere are left to the process that has them.
+
+        Returns:
+            int: Number of requests handled.
+        """
+        actions = list(self._handlers)
+        placeholders = ", ".join("?" * len(actions))
+        action_filter = f"(action IS NULL OR action IN ({placeholders}))" if actions else "action IS NULL"
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM approvals WHERE handled = 0 AND {action_filter} AND status != ? ORDER BY id",
+                                      actions + [PENDING]).fetchall()
+        handled = 0
+        for row in rows:
+            approval = self._approval(row)
+            handler = self._handlers.get(approval.payload.get("action"))
+            with self._lock:
+                claimed = self._conn.execute("UPDATE approvals SET handled = 1 WHERE id = ? AND handled = 0",
+                                             (approval.id,)).rowcount == 1
+                self._conn.commit()
+            if not claimed:
+                continue
+            handled += 1
+            for callback in ([handler] if handler else []) + self._callbacks:
+                try:
+                    callback(approval)
+                except Exception as e:
+                    logging.error(f"Error handling approval {approval.id}: {e}")
+        return handled
+
+    def wait(self, approval_id, timeout=None):
+        """
+        Blocks the calling thread until a request is resolved.
+
+        Requests resolved by another process are noticed within poll_interval.
+
+        Args:
+            approval_id (int): Approval id.
+            timeout (float, optional): Seconds to wait. Waits until the request's own
+                deadline if None.
+
+        Returns:
+            Approval: The request (still pending if the wait timed out), or None if unknown.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            approval = self.get(approval_id)
+            if approval is None or not approval.pending:
+                return approval
+            if time.time() >= approval.expires_at:
+                self.expire_due()
+                continue
+            remaining = approval.expires_at - time.time()
+            if deadline is not None:
+                remaining = min(remaining, deadline - time.monotonic())
+                if remaining <= 0:
+                    return approval
+            with self._resolved:
+                self._resolved.wait(min(remaining, self.poll_interval))
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.expire_due()
+                self.dispatch()
+            except Exception as e:
+                logging.error(f"Error processing approval queue: {e}")
+
+    def start(self):
+        """Starts the background thread that applies timeouts and runs handlers."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="approval-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stops the background thread and closes the database."""
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+_queue = None
+_queue_lock = threading.Lock()
+_handlers = {}
+
+def register_handler(action, handler):
+    """
+    Registers a handler on the process-wide queue, including one created later.
+
+    Lets modules attach deferred actions at import time without opening the queue.
+    """
+    _handlers[action] = handler
+    if _queue is not None:
+        _queue.register_handler(action, handler)
+
+def get_approval_queue():
+    """
+    Returns the process-wide approval queue, creating and starting it on first use.
+
+    Configured with APPROVAL_DB_PATH, APPROVAL_TIMEOUT and APPROVAL_TIMEOUT_POLICY.
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                queue = ApprovalQueue(os.getenv("APPROVAL_DB_PATH", "approvals.db"),
+                                      default_timeout=float(os.getenv("APPROVAL_TIMEOUT", 3600)),
+                                      timeout_policy=os.getenv("APPROVAL_TIMEOUT_POLICY", "deny"))
+                for action, handler in _handlers.items():
+                    queue.register_handler(action, handler)
+                queue.start()
+                _queue = queue
+    return _queue
+
+def main(argv=None):
+    """Command line for approvers: list, show, approve and deny requests."""
+    parser = argparse.ArgumentParser(description="Resolve pending approval requests.")
+    parser.add_argument("--db", default=os.getenv("APPROVAL_DB_PATH", "approvals.db"), help="Approval database path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List pending requests.")
+    show = commands.add_parser("show", help="Show one request.")
+    show.add_argument("id", type=int)
+    for name in ("approve", "deny"):
+        command = commands.add_parser(name, help=f"{name.capitalize()} a request.")
+        command.add_argument("id", type=int)
+        command.add_argument("--by", default=os.getenv("USER"), help="Approver name.")
+        command.add_argument("--note", help="Note stored with the decision.")
+    args = parser.parse_args(argv)
+
+    queue = ApprovalQueue(args.db)
+    try:
+        if args.command == "list":
+            for approval in queue.pending():
+                remaining = max(0, int(approval.expires_at - time.time()))
+                print(f"{approval.id}\t{remaining}s left\t{approval.message}")
+            return 0
+        if args.command == "show":
+            approval = queue.get(args.id)
+            if approval is None:
+                print(f"No approval {args.id}.")
+                return 1
+            print(json.dumps({slot: getattr(approval, slot) for slot in Approval.__slots__}, indent=2, default=str))
+            return 0
+        if queue.resolve(args.id, args.command == "approve", resolver=args.by, note=args.note):
+            print(f"Approval {args.id} {'approved' if args.command == 'approve' else 'denied'}.")
+            return 0
+        print(f"Approval {args.id} is not pending.")
+        return 1
+    finally:
+        queue.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,13 @@
 # --- sub_database.py ---
 import sqlite3
 import logging
+from sub_spatial_index import get_spatial_index
 
 DATABASE_FILE = "robot_database.db"
 
+# Keys bound per "IN (...)" query, below SQLite's variable limit (999 before 3.32).
+QUERY_CHUNK_SIZE = 500
+
 def create_connection():
     """Creates a database connection."""
     try:
@@ -32,6 +36,29 @@ def create_tables():
                     sensor_data TEXT
                 )
             """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS incident_evidence (
+                    content_hash TEXT PRIMARY KEY,
+                    stored_path TEXT,
+                    size INTEGER,
+                    first_seen TEXT
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS incident_report_evidence (
+                    report_id TEXT,
+                    kind TEXT,
+                    content_hash TEXT,
+                    PRIMARY KEY (report_id, kind)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS incident_occurrences (
+                    report_id TEXT PRIMARY KEY,
+                    occurrences INTEGER,
+                    last_seen TEXT
+                )
+            """)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS progeny_records (
                     progeny_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -72,11 +99,80 @@ def add_incident_report(report_data):
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (report_data["report_id"], report_data["timestamp"], str(report_data["location"]), report_data["event_details"], str(report_data["identity_data"]), report_data.get("audio_file"), report_data.get("video_file"), report_data.get("electronic_log"), str(report_data.get("sensor_data"))))
             conn.commit()
+            location = report_data.get("location")
+            if isinstance(location, dict) and location.get("latitude") is not None and location.get("longitude") is not None:
+                get_spatial_index().add("incident", report_data["report_id"], location["latitude"], location["longitude"])
         except sqlite3.Error as e:
             logging.error(f"Database insert error: {e}")
         finally:
             conn.close()
 
+def add_incident_reports(reports, evidence=(), occurrences=()):
+    """
+    Adds a batch of incident reports, their evidence and repeat counts in one transaction.
+
+    Args:
+        reports (list): Report dicts as accepted by add_incident_report.
+        evidence (list, optional): (report_id, kind, content_hash, stored_path, size, first_seen)
+            tuples. Each file is recorded once per content hash.
+        occurrences (list, optional): (report_id, count, last_seen) tuples of duplicate
+            reports folded into an earlier one.
+
+    Returns:
+        bool: True if the batch was written.
+    """
+    conn = create_connection()
+    if conn is None:
+        return False
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO incident_reports (report_id, timestamp, location, event_details, identity_data, audio_file, video_file, electronic_log, sensor_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(report["report_id"], report["timestamp"], str(report["location"]), report["event_details"], str(report["identity_data"]), report.get("audio_file"), report.get("video_file"), report.get("electronic_log"), str(report.get("sensor_data"))) for report in reports])
+            conn.executemany("INSERT OR IGNORE INTO incident_evidence (content_hash, stored_path, size, first_seen) VALUES (?, ?, ?, ?)",
+                             [row[2:] for row in evidence])
+            conn.executemany("INSERT OR REPLACE INTO incident_report_evidence (report_id, kind, content_hash) VALUES (?, ?, ?)",
+                             [row[:3] for row in evidence])
+            conn.executemany("""
+                INSERT INTO incident_occurrences (report_id, occurrences, last_seen) VALUES (?, ?, ?)
+                ON CONFLICT (report_id) DO UPDATE SET
+                    occurrences = occurrences + excluded.occurrences, last_seen = excluded.last_seen
+            """, list(occurrences))
+    except sqlite3.Error as e:
+        logging.error(f"Database batch insert error: {e}")
+        return False
+    finally:
+        conn.close()
+    try:
+        get_spatial_index().add_many(("incident", report["report_id"], report["location"].get("latitude"), report["location"].get("longitude"))
+                                     for report in reports if isinstance(report.get("location"), dict))
+    except sqlite3.Error as e:
+        logging.error(f"Spatial index update error: {e}")
+    return True
+
+def get_incidents_near(latitude, longitude, radius_km):
+    """Retrieves the incident reports within radius_km of a point, nearest first."""
+    report_ids = get_spatial_index().keys_within(latitude, longitude, radius_km, "incident")
+    if not report_ids:
+        return []
+    conn = create_connection()
+    if conn is None:
+        return []
+    try:
+        rows = []
+        for start in range(0, len(report_ids), QUERY_CHUNK_SIZE):
+            chunk = report_ids[start:start + QUERY_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows.extend(conn.execute(f"SELECT * FROM incident_reports WHERE report_id IN ({placeholders})", chunk).fetchall())
+        order = {report_id: position for position, report_id in enumerate(report_ids)}
+        return sorted(rows, key=lambda row: order[row[0]])
+    except sqlite3.Error as e:
+        logging.error(f"Database query error: {e}")
+        return []
+    finally:
+        conn.close()
+
 def get_applicable_laws(location_data):
     """Retrieves applicable laws based on location (placeholder)."""
     # Placeholder: Implement actual law retrieval based on location
@@ -0,0 +1,246 @@
+"""
+Sub_environment_config Module
+
+This module provides the declarative configuration used by Environment. The monitor
+manifest (monitor_manifest.json) says where each monitor lives; environment_config.json
+says how each monitor is run: which API key it uses, its endpoint, cache TTL, timeout,
+priority and whether it is enabled or may run concurrently. The two are merged,
+validated and frozen into compact __slots__ records once, so Environment no longer
+needs one constructor argument and one hand-written dict entry per monitor.
+
+API keys are read from the environment (e.g. WEATHER_API_KEY for "weather_api_key")
+unless they are passed in explicitly.
+
+Classes:
+    MonitorSpec: Immutable run configuration of a single monitor.
+    EnvironmentSpec: Immutable, priority-ordered collection of MonitorSpec records.
+
+Functions:
+    load_environment_spec(config_path, manifest, api_keys): Loads and validates the spec.
+    get_environment_spec(): Returns the process-wide spec, loading it once.
+"""
+
+import os
+import json
+import logging
+import threading
+
+from sub_monitor_registry import load_monitor_manifest
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "environment_config.json")
+
+DEFAULT_SETTINGS = {
+    "endpoint": None,
+    "ttl": 0,
+    "timeout": 30,
+    "priority": 100,
+    "enabled": True,
+    "concurrent": True,
+    "scope": "site",
+}
+
+CATEGORIES = ("environmental", "socioeconomic")
+
+SCOPES = ("site", "region")
+
+class MonitorSpec:
+    """
+    Immutable run configuration of a single monitor.
+
+    Attributes:
+        name (str): Monitor name, as used in the manifest and in the collected data.
+        module (str): Module that implements the monitor.
+        function (str): Monitor function name.
+        category (str): "environmental" or "socioeconomic".
+        api_key_name (str): Credential name, e.g. "weather_api_key", or None.
+        api_key_param (str): Keyword argument the monitor takes the key as, or None.
+        api_key (str): The API key value, or None.
+        endpoint (str): Upstream endpoint for the monitor, or None for its built-in default.
+        ttl (float): Seconds a result may be served from cache. 0 disables caching.
+        timeout (float): Seconds to wait for the monitor before reporting a timeout.
+        priority (int): Lower runs first.
+        enabled (bool): Whether the monitor is collected.
+        concurrent (bool): Whether the monitor may run on the worker pool. Monitors that
+            are not thread-safe run serially on the caller's thread.
+        scope (str): "site" if the upstream answers per site, "region" if one answer
+            (e.g. a regional weather feed) covers every site in a region.
+    """
+
+    __slots__ = ("name", "module", "function", "category", "api_key_name", "api_key_param",
+                 "api_key", "endpoint", "ttl", "timeout", "priority", "enabled", "concurrent",
+                 "scope")
+
+    def __init__(self, **fields):
+        for slot in self.__slots__:
+            object.__setattr__(self, slot, fields.get(slot))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MonitorSpec is immutable; use replace() instead.")
+
+    def replace(self, **changes):
+        """Returns a copy of the spec with the given fields changed."""
+        fields = {slot: getattr(self, slot) for slot in self.__slots__}
+        fields.update(changes)
+        return MonitorSpec(**fields)
+
+    def __repr__(self):
+        return (f"MonitorSpec(name={self.name!r}, category={self.category!r}, priority={self.priority}, "
+                f"ttl={self.ttl}, timeout={self.timeout}, enabled={self.enabled}, concurrent={self.concurrent})")
+
+class EnvironmentSpec:
+    """
+    Immutable, priority-ordered collection of MonitorSpec records.
+
+    Attributes:
+        monitors (tuple): MonitorSpec records sorted by (priority, name).
+        max_workers (int): Size of the worker pool used for concurrent monitors.
+    """
+
+    __slots__ = ("monitors", "max_workers", "_by_name")
+
+    def __init__(self, monitors, max_workers=8):
+        object.__setattr__(self, "monitors", tuple(sorted(monitors, key=lambda spec: (spec.priority, spec.name))))
+        object.__setattr__(self, "max_workers", max_workers)
+        object.__setattr__(self, "_by_name", {spec.name: spec for spec in self.monitors})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EnvironmentSpec is immutable.")
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self.monitors)
+
+    def enabled(self, category=None):
+        """Returns the enabled monitors, optionally of one category, in priority order."""
+        return [spec for spec in self.monitors
+                if spec.enabled and (category is None or spec.category == category)]
+
+    def with_api_keys(self, api_keys):
+        """
+        Returns a copy of the spec with API keys overridden.
+
+        Args:
+            api_keys (dict): Credential name -> key, e.g. {"weather_api_key": "..."}.
+                Keys that are None are ignored.
+        """
+        api_keys = {name: key for name, key in api_keys.items() if key is not None}
+        if not api_keys:
+            return self
+        return EnvironmentSpec([spec.replace(api_key=api_keys[spec.api_key_name])
+                                if spec.api_key_name in api_keys else spec
+                                for spec in self.monitors], self.max_workers)
+
+    def with_enabled(self, names):
+        """
+        Returns a copy of the spec with only the given monitors enabled.
+
+        Raises:
+            ValueError: If a name is not a known monitor.
+        """
+        names = set(names)
+        unknown = names - set(self._by_name)
+        if unknown:
+            raise ValueError(f"Unknown monitors: {sorted(unknown)}")
+        return EnvironmentSpec([spec.replace(enabled=spec.name in names) for spec in self.monitors], self.max_workers)
+
+def _validate_settings(name, settings):
+    """Validates the run settings of a monitor. Raises ValueError on invalid values."""
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Monitor '{name}': unknown settings {sorted(unknown)}")
+    if settings["endpoint"] is not None and not isinstance(settings["endpoint"], str):
+        raise ValueError(f"Monitor '{name}': endpoint must be a string or null")
+    for field in ("ttl", "timeout"):
+        value = settings[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"Monitor '{name}': {field} must be a non-negative number")
+    if settings["timeout"] == 0:
+        raise ValueError(f"Monitor '{name}': timeout must be greater than zero")
+    if isinstance(settings["priority"], bool) or not isinstance(settings["priority"], int):
+        raise ValueError(f"Monitor '{name}': priority must be an integer")
+    for field in ("enabled", "concurrent"):
+        if not isinstance(settings[field], bool):
+            raise ValueError(f"Monitor '{name}': {field} must be true or false")
+    if settings["scope"] not in SCOPES:
+        raise ValueError(f"Monitor '{name}': scope must be one of {SCOPES}")
+
+def load_environment_spec(config_path=CONFIG_FILE, manifest=None, api_keys=None):
+    """
+    Loads, validates and freezes the environment spec.
+
+    Args:
+        config_path (str, optional): Path to environment_config.json. A missing file
+            leaves every monitor on the default settings.
+        manifest (dict, optional): Monitor manifest. Loaded from monitor_manifest.json if None.
+        api_keys (dict, optional): Credential name -> key. Keys not given are read from
+            environment variables named after the credential in upper case.
+
+    Returns:
+        EnvironmentSpec: The frozen spec.
+
+    Raises:
+        ValueError: If the configuration is invalid.
+    """
+    manifest = manifest if manifest is not None else load_monitor_manifest()
+    config = {}
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"Environment config file not found: {config_path}. Using defaults.")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in environment config file {config_path}: {e}")
+
+    defaults = dict(DEFAULT_SETTINGS)
+    defaults.update(config.get("defaults", {}))
+    category_defaults = config.get("categories", {})
+    overrides = config.get("monitors", {})
+    unknown = (set(overrides) - set(manifest)) | (set(category_defaults) - set(CATEGORIES))
+    if unknown:
+        raise ValueError(f"Environment config refers to unknown monitors or categories: {sorted(unknown)}")
+    api_keys = api_keys or {}
+
+    specs = []
+    for name, entry in manifest.items():
+        if entry.get("category") not in CATEGORIES:
+            raise ValueError(f"Monitor '{name}': unknown category {entry.get('category')!r}")
+        settings = dict(defaults)
+        settings.update(category_defaults.get(entry["category"], {}))
+        settings.update(overrides.get(name, {}))
+        _validate_settings(name, settings)
+        api_key_name = entry.get("api_key")
+        api_key = None
+        if api_key_name:
+            api_key = api_keys.get(api_key_name) or os.getenv(api_key_name.upper())
+        specs.append(MonitorSpec(name=name, module=entry["module"], function=entry["function"],
+                                 category=entry["category"], api_key_name=api_key_name,
+                                 api_key_param=entry.get("api_key_param"), api_key=api_key, **settings))
+
+    max_workers = config.get("max_workers", 8)
+    if isinstance(max_workers, bool) or not isinstance(max_workers, int) or max_workers < 1:
+        raise ValueError("max_workers must be a positive integer")
+    return EnvironmentSpec(specs, max_workers)
+
+_environment_spec = None
+_environment_spec_lock = threading.Lock()
+
+def get_environment_spec():
+    """Returns the process-wide environment spec, loading and validating it once."""
+    global _environment_spec
+    if _environment_spec is None:
+        with _environment_spec_lock:
+            if _environment_spec is None:
+                _environment_spec = load_environment_spec()
+    return _environment_spec
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    spec = get_environment_spec()
+    for monitor in spec.enabled("environmental")[:5]:
+        print(monitor)
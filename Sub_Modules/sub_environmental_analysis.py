@@ -2,9 +2,16 @@
 """
 This module analyzes environmental and socioeconomic data to identify potential risks and trends.
 It provides functions to assess the overall health of the environment and society based on the collected data.
+
+compute_risk_flags runs the analysis once and condenses it into an immutable RiskFlags
+record. Environment.get_snapshot attaches that record to an EnvironmentalSnapshot, so
+law checks and harm analysis read precomputed flags instead of re-analyzing the raw
+data for every law and every order.
 """
 
+import time
 import logging
+from types import MappingProxyType
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -339,6 +346,165 @@ def analyze_socioeconomic_data(socioeconomic_data):
         logging.error(f"Error analyzing socioeconomic data: {e}")
         return {}
 
+class RiskFlags:
+    """
+    Immutable risk flags derived from one analysis of a snapshot.
+
+    Attributes:
+        environmental_damage_risk (bool): Some environmental reading indicates damage.
+        human_safety_risk (bool): Some reading threatens human safety.
+        global_catastrophe_risk (float): Catastrophe risk score between 0 and 1.
+        societal_risk (bool): Some socioeconomic reading indicates societal risk.
+        global_risk (bool): Both environmental damage and societal risk.
+        resource_depletion (bool): Economic data reports resource depletion.
+        violence_level (float): Reported violence level (0 if unknown).
+        crime_rate (float): Reported crime rate (0 if unknown).
+        gdp_growth (float): Reported GDP growth (0 if unknown).
+        school_rating (float): Average school rating (None if unknown).
+        deforestation_level (float): Reported deforestation level (0 if unknown).
+    """
+
+    __slots__ = ("environmental_damage_risk", "human_safety_risk", "global_catastrophe_risk", "societal_risk",
+                 "global_risk", "resource_depletion", "violence_level", "crime_rate", "gdp_growth", "school_rating",
+                 "deforestation_level")
+
+    def __init__(self, environmental_damage_risk=False, human_safety_risk=False, global_catastrophe_risk=0.0,
+                 societal_risk=False, global_risk=False, resource_depletion=False, violence_level=0.0, crime_rate=0.0,
+                 gdp_growth=0.0, school_rating=None, deforestation_level=0.0):
+        set_attr = object.__setattr__
+        set_attr(self, "environmental_damage_risk", bool(environmental_damage_risk))
+        set_attr(self, "human_safety_risk", bool(human_safety_risk))
+        set_attr(self, "global_catastrophe_risk", float(global_catastrophe_risk))
+        set_attr(self, "societal_risk", bool(societal_risk))
+        set_attr(self, "global_risk", bool(global_risk))
+        set_attr(self, "resource_depletion", bool(resource_depletion))
+        set_attr(self, "violence_level", float(violence_level))
+        set_attr(self, "crime_rate", float(crime_rate))
+        set_attr(self, "gdp_growth", float(gdp_growth))
+        set_attr(self, "school_rating", None if school_rating is None else float(school_rating))
+        set_attr(self, "deforestation_level", float(deforestation_level))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RiskFlags is immutable")
+
+    def __reduce__(self):
+        return (RiskFlags, tuple(getattr(self, name) for name in self.__slots__))
+
+    @property
+    def any_risk(self):
+        """True if any risk flag is raised."""
+        return self.environmental_damage_risk or self.human_safety_risk or self.societal_risk or \
+            self.global_catastrophe_risk > 0
+
+    def as_dict(self):
+        """Returns the flags as a dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        raised = [name for name in ("environmental_damage_risk", "human_safety_risk", "societal_risk", "global_risk")
+                  if getattr(self, name)]
+        return f"RiskFlags(raised={raised}, global_catastrophe_risk={self.global_catastrophe_risk})"
+
+NO_RISK = RiskFlags()
+
+def _number(value, default=0.0):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+def compute_risk_flags(environmental_data, socioeconomic_data, analysis=None):
+    """
+    Analyzes a snapshot once and condenses the result into RiskFlags.
+
+    Flags set directly in the data (e.g. a precomputed "global_catastrophe_risk" score)
+    are honoured as well.
+
+    Args:
+        environmental_data (dict): Environmental data.
+        socioeconomic_data (dict): Socioeconomic data.
+        analysis (dict, optional): Result of analyze_all_data, if already computed.
+
+    Returns:
+        RiskFlags: The flags, or None if the analysis failed (the law checks then read
+            the raw data instead; a failed analysis never means "no risk").
+    """
+    try:
+        environmental_data = environmental_data or {}
+        socioeconomic_data = socioeconomic_data or {}
+        if analysis is None:
+            analysis = analyze_all_data(environmental_data, socioeconomic_data)
+        if not analysis:
+            logging.error("Risk analysis failed; no risk flags computed.")
+            return None
+        env_analysis = analysis.get('environmental', {})
+        socio_analysis = analysis.get('socioeconomic', {})
+
+        catastrophe = _number(environmental_data.get('global_catastrophe_risk'),
+                              1.0 if environmental_data.get('global_catastrophe_risk') else 0.0)
+        if env_analysis.get('global_catastrophe_risk'):
+            catastrophe = max(catastrophe, 1.0)
+        environmental_damage = bool(env_analysis.get('environmental_damage_risk') or environmental_data.get('environmental_damage_risk'))
+        human_safety = bool(env_analysis.get('human_safety_risk') or environmental_data.get('human_safety_risk'))
+        societal = bool(socio_analysis.get('societal_risk'))
+
+        crime = socioeconomic_data.get('crime') or {}
+        economic = socioeconomic_data.get('economic_data') or {}
+        schools = socioeconomic_data.get('school_ratings') or {}
+        deforestation = environmental_data.get('deforestation') or {}
+        school_rating = schools.get('average_rating')
+
+        return RiskFlags(
+            environmental_damage_risk=environmental_damage,
+            human_safety_risk=human_safety,
+            global_catastrophe_risk=min(max(catastrophe, 0.0), 1.0),
+            societal_risk=societal,
+            global_risk=bool(analysis.get('global_risk')) or (environmental_damage and societal),
+            resource_depletion=bool(economic.get('resource_depletion', False)),
+            violence_level=_number(crime.get('violence_level')),
+            crime_rate=_number(crime.get('crime_rate')),
+            gdp_growth=_number(economic.get('gdp_growth')),
+            school_rating=_number(school_rating, None),
+            deforestation_level=_number(deforestation.get('level')),
+        )
+    except Exception as e:
+        logging.error(f"Error computing risk flags: {e}")
+        return None
+
+class EnvironmentalSnapshot:
+    """
+    Immutable snapshot of a location's data with its precomputed risk flags.
+
+    Only the top level of the data is frozen: nested dicts (e.g. environmental["crime"])
+    are shared with the snapshot and must be treated as read-only by its users.
+
+    Attributes:
+        location (str): Location the data was collected for.
+        environmental (mappingproxy): Read-only environmental data (top level only).
+        socioeconomic (mappingproxy): Read-only socioeconomic data (top level only).
+        risk_flags (RiskFlags): Flags computed once from the data, or None if the
+            analysis failed.
+        taken_at (float): Time of collection (seconds since the epoch).
+    """
+
+    __slots__ = ("location", "environmental", "socioeconomic", "risk_flags", "taken_at")
+
+    def __init__(self, location, environmental_data, socioeconomic_data, risk_flags=None, taken_at=None):
+        set_attr = object.__setattr__
+        set_attr(self, "location", location)
+        set_attr(self, "environmental", MappingProxyType(dict(environmental_data or {})))
+        set_attr(self, "socioeconomic", MappingProxyType(dict(socioeconomic_data or {})))
+        set_attr(self, "risk_flags", risk_flags if risk_flags is not None else
+                 compute_risk_flags(self.environmental, self.socioeconomic))
+        set_attr(self, "taken_at", taken_at if taken_at is not None else time.time())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EnvironmentalSnapshot is immutable")
+
+    def __reduce__(self):
+        return (EnvironmentalSnapshot, (self.location, dict(self.environmental), dict(self.socioeconomic),
+                                        self.risk_flags, self.taken_at))
+
+    def __repr__(self):
+        return f"EnvironmentalSnapshot({self.location!r}, {self.risk_flags!r})"
+
 def analyze_all_data(environmental_data, socioeconomic_data):
     """
     Analyzes both environmental and socioeconomic data to identify potential risks and trends.
@@ -0,0 +1,417 @@
+"""
+Sub_execution_manager Module
+
+This module runs shell commands for approved orders without blocking the caller.
+Commands are queued and run at most max_parallel at a time; each one:
+
+    * runs in its own process group (session), so a timeout kills the command and
+      everything it started, not only the shell;
+    * has a wall-clock timeout (SIGTERM to the group, then SIGKILL after a grace period)
+      and, where the resource module is available, optional CPU-time and address-space
+      limits. The limits are set by a small exec wrapper in the child rather than by a
+      preexec_fn, which is not safe to run in a process with threads;
+    * has its stdout and stderr streamed into capped ring buffers, so a chatty command
+      keeps only the last output_limit bytes of each stream in memory;
+    * reports completion to callbacks (e.g. the audit log) with an Execution record.
+      Every submitted command is reported exactly once, including commands that are
+      cancelled while queued or dropped by shutdown(kill=True).
+
+Classes:
+    RingBuffer: Keeps the last N bytes written to it.
+    Execution: One command and its outcome.
+    ExecutionManager: Runs commands with bounded parallelism.
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import itertools
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; resource limits are skipped there.
+    resource = None
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+CANCELLED = "cancelled"
+
+# Run by the interpreter in the child: applies the limits, then replaces itself with the shell.
+_LIMITS_WRAPPER = """import os, sys, resource
+cpu_seconds, memory_bytes = int(sys.argv[1]), int(sys.argv[2])
+if cpu_seconds:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+if memory_bytes:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+os.execv("/bin/sh", ["/bin/sh", "-c", sys.argv[3]])
+"""
+
+class RingBuffer:
+    """
+    Keeps the last capacity bytes written to it.
+
+    Attributes:
+        capacity (int): Maximum number of bytes kept.
+        total (int): Number of bytes written in total.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self._chunks = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        """Appends bytes, dropping the oldest ones beyond capacity."""
+        if not data:
+            return
+        with self._lock:
+            self.total += len(data)
+            if len(data) >= self.capacity:
+                self._chunks.clear()
+                self._chunks.append(bytes(data[-self.capacity:]) if self.capacity else b"")
+                self._size = min(len(data), self.capacity)
+                return
+            self._chunks.append(bytes(data))
+            self._size += len(data)
+            while self._size > self.capacity:
+                excess = self._size - self.capacity
+                head = self._chunks[0]
+                if len(head) <= excess:
+                    self._chunks.popleft()
+                    self._size -= len(head)
+                else:
+                    self._chunks[0] = head[excess:]
+                    self._size -= excess
+
+    @property
+    def truncated(self):
+        """True if bytes were dropped."""
+        return self.total > self._size
+
+    def getvalue(self):
+        """Returns the kept bytes."""
+        with self._lock:
+            return b"".join(self._chunks)
+
+    def text(self, encoding="utf-8"):
+        """Returns the kept bytes decoded (undecodable bytes replaced)."""
+        return self.getvalue().decode(encoding, errors="replace")
+
+class Execution:
+    """
+    One command and its outcome.
+
+    Attributes:
+        id (int): Execution id.
+        command (str): The command.
+        status (str): "queued", "running", "succeeded", "failed", "timed_out" or "cancelled".
+        returncode (int): Exit status, or None.
+        pid (int): Process id while running, or None.
+        submitted_at (float): Time of submission (seconds since the epoch).
+        started_at (float): Start time, or None.
+        finished_at (float): Finish time, or None.
+        stdout (RingBuffer): Last bytes of standard output.
+        stderr (RingBuffer): Last bytes of standard error.
+        error (str): Error starting the command, or None.
+        metadata (dict): Caller data, e.g. the order id.
+    """
+
+    def __init__(self, id, command, output_limit, metadata=None):
+        self.id = id
+        self.command = command
+        self.status = QUEUED
+        self.returncode = None
+        self.pid = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stdout = RingBuffer(output_limit)
+        self.stderr = RingBuffer(output_limit)
+        self.error = None
+        self.metadata = metadata or {}
+        self._done = threading.Event()
+
+    @property
+    def duration(self):
+        """Seconds the command ran, or None if it has not finished."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def succeeded(self):
+        return self.status == SUCCEEDED
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the command to finish.
+
+        Returns:
+            bool: True if it finished within the timeout.
+        """
+        return self._done.wait(timeout)
+
+    def summary(self):
+        """Returns a dict describing the outcome, for logs and audit records."""
+        return {
+            "id": self.id,
+            "command": self.command,
+            "status": self.status,
+            "returncode": self.returncode,
+            "duration": self.duration,
+            "stdout": self.stdout.text(),
+            "stderr": self.stderr.text(),
+            "stdout_truncated": self.stdout.truncated,
+            "stderr_truncated": self.stderr.truncated,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"Execution({self.id}, {self.command!r}, status={self.status!r}, returncode={self.returncode!r})"
+
+def _pump(stream, buffer):
+    """Copies a pipe into a ring buffer until EOF."""
+    try:
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            buffer.write(chunk)
+    except (OSError, ValueError):
+        pass
+    finally:
+        stream.close()
+
+class ExecutionManager:
+    """
+    Runs shell commands asynchronously with bounded parallelism.
+
+    Attributes:
+        max_parallel (int): Maximum number of commands running at once.
+        timeout (float): Default wall-clock limit per command in seconds.
+        output_limit (int): Bytes of stdout and of stderr kept per command.
+        cpu_seconds (int): CPU-time limit per command, or None.
+        memory_bytes (int): Address-space limit per command, or None.
+        kill_grace (float): Seconds between SIGTERM and SIGKILL on timeout.
+    """
+
+    def __init__(self, max_parallel=4, timeout=300, output_limit=65536, cpu_seconds=None, memory_bytes=None, kill_grace=5):
+        """
+        Initializes the manager.
+
+        Args:
+            max_parallel (int, optional): Commands running at once. Defaults to 4.
+            timeout (float, optional): Default wall-clock limit in seconds. Defaults to 300.
+            output_limit (int, optional): Bytes kept per stream. Defaults to 65536.
+            cpu_seconds (int, optional): CPU-time limit per command. Defaults to None.
+            memory_bytes (int, optional): Address-space limit per command. Defaults to None.
+            kill_grace (float, optional): Seconds between SIGTERM and SIGKILL. Defaults to 5.
+        """
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+        self.output_limit = output_limit
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.kill_grace = kill_grace
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="execution")
+        self._ids = itertools.count(1)
+        self._callbacks = []
+        self._active = {}
+        self._pending = {}
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        """Registers a function called with every finished Execution."""
+        self._callbacks.append(callback)
+
+    def _popen_args(self, command):
+        """Returns (args, kwargs) for Popen: the shell command, wrapped to apply the limits if any."""
+        if os.name != "posix":
+            return command, {"shell": True, "creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        if resource is None or (not self.cpu_seconds and not self.memory_bytes):
+            return command, {"shell": True, "start_new_session": True}
+        return [sys.executable, "-I", "-c", _LIMITS_WRAPPER, str(int(self.cpu_seconds or 0)),
+                str(int(self.memory_bytes or 0)), command], {"start_new_session": True}
+
+    def _terminate(self, process):
+        """Terminates a command's process group, killing it if it does not exit in time."""
+        if os.name == "posix":
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(self.kill_grace)
+            except ProcessLookupError:
+                pass
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        else:
+            process.kill()
+        process.wait()
+
+    def _run(self, execution, timeout, cwd, env, callbacks):
+        with self._lock:
+            # Not pending any more: shutdown(kill=True) has already finished it as cancelled.
+            if self._pending.pop(execution.id, None) is None:
+                return
+            if execution.status != CANCELLED:
+                execution.status = RUNNING
+        if execution.status == CANCELLED:
+            execution.finished_at = time.time()
+            self._finish(execution, callbacks)
+            return
+        execution.started_at = time.time()
+        try:
+            args, kwargs = self._popen_args(execution.command)
+            process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, cwd=cwd, env=env, **kwargs)
+        except OSError as e:
+            execution.status = FAILED
+            execution.error = str(e)
+            execution.finished_at = time.time()
+            logging.error(f"Error starting command '{execution.command}': {e}")
+            self._finish(execution, callbacks)
+            return
+
+        execution.pid = process.pid
+        with self._lock:
+            self._active[execution.id] = (execution, process)
+            # Started while shutdown(kill=True) was collecting the running processes, or
+            # cancelled by cancel() before it was registered.
+            stopping = self._stopping or execution.status == CANCELLED
+        if stopping:
+            execution.status = CANCELLED
+            self._terminate(process)
+        pumps = [threading.Thread(target=_pump, args=(process.stdout, execution.stdout), daemon=True),
+                 threading.Thread(target=_pump, args=(process.stderr, execution.stderr), daemon=True)]
+        for pump in pumps:
+            pump.start()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logging.warning(f"Command '{execution.command}' exceeded {timeout}s; terminating.")
+            execution.status = TIMED_OUT
+            self._terminate(process)
+        for pump in pumps:
+            # A background process that escaped the group can hold the pipe open; keep what was read.
+            pump.join(self.kill_grace)
+            if pump.is_alive():
+                logging.warning(f"Output of command '{execution.command}' still open after it exited; not waiting for it.")
+        with self._lock:
+            self._active.pop(execution.id, None)
+
+        execution.returncode = process.returncode
+        execution.finished_at = time.time()
+        if execution.status == RUNNING:
+            execution.status = SUCCEEDED if process.returncode == 0 else FAILED
+        self._finish(execution, callbacks)
+
+    def _finish(self, execution, callbacks):
+        # Callbacks run before waiters are released, so wait() returns after the audit.
+        for callback in callbacks + self._callbacks:
+            try:
+                callback(execution)
+            except Exception as e:
+                logging.error(f"Error in execution callback for '{execution.command}': {e}")
+        execution._done.set()
+
+    def submit(self, command, timeout=None, on_complete=None, cwd=None, env=None, metadata=None):
+        """
+        Queues a shell command and returns immediately.
+
+        Args:
+            command (str): Shell command.
+            timeout (float, optional): Wall-clock limit in seconds. Defaults to self.timeout.
+            on_complete (function, optional): Called with the finished Execution.
+            cwd (str, optional): Working directory.
+            env (dict, optional): Environment variables.
+            metadata (dict, optional): Caller data stored on the Execution.
+
+        Returns:
+            Execution: The queued command.
+        """
+        execution = Execution(next(self._ids), command, self.output_limit, metadata)
+        callbacks = [on_complete] if on_complete is not None else []
+        with self._lock:
+            self._pending[execution.id] = (execution, callbacks)
+        self._executor.submit(self._run, execution, self.timeout if timeout is None else timeout, cwd, env, callbacks)
+        return execution
+
+    def run(self, command, timeout=None, cwd=None, env=None):
+        """Runs a command and waits for it. Returns the finished Execution."""
+        execution = self.submit(command, timeout, cwd=cwd, env=env)
+        execution.wait()
+        return execution
+
+    def cancel(self, execution):
+        """
+        Cancels a queued command or terminates a running one.
+
+        Returns:
+            bool: True if the command had not finished.
+        """
+        if execution.done:
+            return False
+        with self._lock:
+            if execution.status not in (QUEUED, RUNNING):
+                return execution.status == CANCELLED
+            queued = execution.status == QUEUED
+            # A running command not registered yet sees the status once it is, and terminates itself.
+            execution.status = CANCELLED
+            active = None if queued else self._active.get(execution.id)
+        if active is not None:
+            self._terminate(active[1])
+        return True
+
+    def running(self):
+        """Returns the number of commands currently running."""
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self, wait=True, kill=False):
+        """
+        Stops accepting commands.
+
+        Args:
+            wait (bool, optional): Wait for queued and running commands. Defaults to True.
+            kill (bool, optional): Cancel queued commands and terminate running ones.
+                Cancelled commands are reported to the callbacks. Defaults to False.
+        """
+        if kill:
+            with self._lock:
+                self._stopping = True
+                pending, self._pending = list(self._pending.values()), {}
+                processes = list(self._active.values())
+            for execution, callbacks in pending:
+                execution.status = CANCELLED
+                execution.finished_at = time.time()
+                self._finish(execution, callbacks)
+            # Terminate before waiting for the worker threads, which are waiting on these processes.
+            for execution, process in processes:
+                execution.status = CANCELLED
+                self._terminate(process)
+        self._executor.shutdown(wait=wait, cancel_futures=kill)
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    manager = ExecutionManager(max_parallel=2, timeout=2, output_limit=1024)
+    manager.add_callback(lambda execution: print(execution.summary()))
+    executions = [manager.submit("echo hello"), manager.submit("sleep 10"), manager.submit("yes | head -c 100000")]
+    for execution in executions:
+        execution.wait()
+    manager.shutdown()
@@ -5,8 +5,15 @@ from typing import Dict, Any
 
 logging.basicConfig(filename='harm_analysis.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def analyze_harm(order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any]) -> Dict[str, bool]:
-    """Analyzes an order to determine if it could cause harm, directly or indirectly."""
+from sub_environmental_analysis import RiskFlags  # Imported after logging is configured for this module
+
+def analyze_harm(order: str, environmental_data: Dict[str, Any], socioeconomic_data: Dict[str, Any], risk_flags: RiskFlags = None) -> Dict[str, bool]:
+    """
+    Analyzes an order to determine if it could cause harm, directly or indirectly.
+
+    If risk_flags (a RiskFlags record from the snapshot) is given, the indirect checks
+    read it instead of the raw data.
+    """
     harm_analysis = {
         "humanity_harm": False,
         "human_harm": False,
@@ -26,7 +33,10 @@ def analyze_harm(order: str, environmental_data: Dict[str, Any], socioeconomic_d
         if re.search(r"(war|genocide|mass destruction|global catastrophe)", order.lower()):
             harm_analysis["humanity_harm"] = True
 
-        if environmental_data.get("global_catastrophe_risk", 0) > 0.7 or \
+        if risk_flags is not None:
+            if risk_flags.global_catastrophe_risk > 0.7 or risk_flags.resource_depletion:
+                harm_analysis["humanity_harm"] = True
+        elif environmental_data.get("global_catastrophe_risk", 0) > 0.7 or \
            socioeconomic_data.get("economic_data", {}).get("resource_depletion", False):
             harm_analysis["humanity_harm"] = True
 
@@ -34,7 +44,10 @@ def analyze_harm(order: str, environmental_data: Dict[str, Any], socioeconomic_d
         if re.search(r"(attack|assault|poison|medical emergency|cause panic)", order.lower()):
             harm_analysis["human_harm"] = True
 
-        if environmental_data.get("human_safety_risk", False) or \
+        if risk_flags is not None:
+            if risk_flags.human_safety_risk or risk_flags.violence_level > 4:
+                harm_analysis["human_harm"] = True
+        elif environmental_data.get("human_safety_risk", False) or \
            socioeconomic_data.get("crime", {}).get("violence_level", 0) > 4:
             harm_analysis["human_harm"] = True
 
@@ -42,7 +55,10 @@ def analyze_harm(order: str, environmental_data: Dict[str, Any], socioeconomic_d
         if re.search(r"(deforestation|pollution|chemical spill|ecological damage)", order.lower()):
             harm_analysis["environment_harm"] = True
 
-        if environmental_data.get("environmental_damage_risk", False) or \
+        if risk_flags is not None:
+            if risk_flags.environmental_damage_risk or risk_flags.deforestation_level > 60:
+                harm_analysis["environment_harm"] = True
+        elif environmental_data.get("environmental_damage_risk", False) or \
            environmental_data.get("deforestation", {}).get("level", 0) > 60:
             harm_analysis["environment_harm"] = True
 
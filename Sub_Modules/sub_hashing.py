@@ -1,14 +1,37 @@
 """
 Sub_hashing Module
 
-This module provides a function for generating SHA-256 hashes of input strings.
+This module provides SHA-256 hashing of strings and of files. Files are streamed in
+chunks (hashlib.file_digest where available), so gigabyte-scale evidence is hashed at
+disk speed without being loaded into memory. FileHashService hashes many files in
+parallel on a thread pool (hashlib releases the GIL while hashing) and caches digests
+by (device, inode, size, mtime), so an unchanged file is hashed once. Its verify mode
+always re-reads the file, for tamper checks.
+
+Command line:
+    python sub_hashing.py FILE...               Print "<sha256>  <file>" lines.
+    python sub_hashing.py --verify MANIFEST     Check files against such lines.
+
+Classes:
+    FileHashService: Parallel, cached file hashing with a verify mode.
 
 Functions:
     generate_sha256_hash(input_string): Generates a SHA-256 hash of the input string.
+    hash_file(path, algorithm, chunk_size): Streams a file through a hash.
+    copy_and_hash(source, destination, algorithm, chunk_size): Copies a file, hashing the bytes written.
+    get_file_hash_service(): Returns the process-wide FileHashService.
 """
 
+import os
+import hmac
 import hashlib
 import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 1 << 20
 
 def generate_sha256_hash(input_string):
     """
@@ -27,9 +50,220 @@ def generate_sha256_hash(input_string):
         logging.error(f"Error generating SHA-256 hash: {e}")
         return None
 
+def hash_file(path, algorithm="sha256", chunk_size=CHUNK_SIZE):
+    """
+    Streams a file through a hash.
+
+    Args:
+        path (str): File path.
+        algorithm (str, optional): hashlib algorithm name. Defaults to "sha256".
+        chunk_size (int, optional): Bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: Hex digest of the file's contents.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, algorithm).hexdigest()
+        digest = hashlib.new(algorithm)
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+        return digest.hexdigest()
+
+def copy_and_hash(source, destination, algorithm="sha256", chunk_size=CHUNK_SIZE):
+    """
+    Copies a file and hashes exactly the bytes written to the copy, in one pass. No
+    cache is involved, so the digest always describes the copy's contents.
+
+    Args:
+        source (str): File to copy.
+        destination (str): Path of the copy (overwritten).
+        algorithm (str, optional): hashlib algorithm name. Defaults to "sha256".
+        chunk_size (int, optional): Bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        tuple: (hex digest, size in bytes) of the copy.
+
+    Raises:
+        OSError: If the file cannot be read or the copy written.
+    """
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    size = 0
+    with open(source, "rb", buffering=0) as src, open(destination, "wb") as dst:
+        while True:
+            read = src.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+            dst.write(view[:read])
+            size += read
+        dst.flush()
+        os.fsync(dst.fileno())
+    return digest.hexdigest(), size
+
+class FileHashService:
+    """
+    Parallel, cached file hashing.
+
+    Attributes:
+        algorithm (str): hashlib algorithm name.
+        max_workers (int): Files hashed at once.
+        cache_size (int): Number of digests cached.
+    """
+
+    def __init__(self, algorithm="sha256", max_workers=4, cache_size=4096):
+        """
+        Initializes the service.
+
+        Args:
+            algorithm (str, optional): hashlib algorithm name. Defaults to "sha256".
+            max_workers (int, optional): Files hashed at once. Defaults to 4.
+            cache_size (int, optional): Digests cached. Defaults to 4096.
+        """
+        self.algorithm = algorithm
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def hash(self, path):
+        """
+        Returns a file's digest, from the cache if the file is unchanged.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        key = self._key(path)
+        with self._lock:
+            digest = self._cache.get(key)
+            if digest is not None:
+                self._cache.move_to_end(key)
+                return digest
+        digest = hash_file(path, self.algorithm)
+        # Only cache if the file did not change while it was being read.
+        if self._key(path) == key:
+            with self._lock:
+                self._cache[key] = digest
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return digest
+
+    def _map(self, func, items):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hash")
+        return list(self._executor.map(func, items))
+
+    def hash_many(self, paths):
+        """
+        Hashes many files in parallel.
+
+        Returns:
+            dict: Path -> digest, or None for a file that could not be read.
+        """
+        def safe_hash(path):
+            try:
+                return self.hash(path)
+            except OSError as e:
+                logging.error(f"Error hashing {path}: {e}")
+                return None
+        paths = list(paths)
+        return dict(zip(paths, self._map(safe_hash, paths)))
+
+    def verify(self, path, expected):
+        """
+        Re-reads a file and compares its digest with the expected one. The cache is not
+        used, since tampering can preserve the size and modification time.
+
+        Returns:
+            bool: True if the file is readable and matches.
+        """
+        try:
+            digest = hash_file(path, self.algorithm)
+        except OSError as e:
+            logging.error(f"Error verifying {path}: {e}")
+            return False
+        if not hmac.compare_digest(digest, expected.lower()):
+            logging.warning(f"Digest mismatch for {path}: expected {expected}, got {digest}.")
+            return False
+        return True
+
+    def verify_many(self, expected):
+        """
+        Verifies many files in parallel.
+
+        Args:
+            expected (dict): Path -> expected digest.
+
+        Returns:
+            dict: Path -> True if the file matches.
+        """
+        items = list(expected.items())
+        return dict(zip((path for path, _ in items), self._map(lambda item: self.verify(*item), items)))
+
+    def invalidate(self):
+        """Drops every cached digest."""
+        with self._lock:
+            self._cache.clear()
+
+    def shutdown(self):
+        """Stops the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_file_hash_service():
+    """Returns the process-wide FileHashService (HASH_WORKERS threads)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = FileHashService(max_workers=int(os.getenv("HASH_WORKERS", "4")))
+    return _service
+
+def main(argv=None):
+    """Command line: hash files, or verify them against a manifest."""
+    parser = argparse.ArgumentParser(description="Hash files with SHA-256 or verify them against a manifest.")
+    parser.add_argument("files", nargs="*", help="Files to hash.")
+    parser.add_argument("--verify", metavar="MANIFEST", help='File of "<sha256>  <file>" lines to check.')
+    args = parser.parse_args(argv)
+
+    service = get_file_hash_service()
+    if args.verify:
+        expected = {}
+        with open(args.verify, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    digest, path = line.rstrip("\n").split(None, 1)
+                    expected[path.lstrip("*")] = digest
+        results = service.verify_many(expected)
+        for path, ok in results.items():
+            print(f"{path}: {'OK' if ok else 'FAILED'}")
+        return 0 if all(results.values()) else 1
+    digests = service.hash_many(args.files)
+    for path, digest in digests.items():
+        print(f"{digest}  {path}" if digest else f"{path}: unreadable")
+    return 0 if all(digests.values()) else 1
+
 if __name__ == "__main__":
-    # Example usage
-    test_string = "This is a test string"
-    hash_value = generate_sha256_hash(test_string)
-    if hash_value:
-        print(f"SHA-256 hash of '{test_string}': {hash_value}")
+    raise SystemExit(main())
@@ -0,0 +1,398 @@
+"""
+Sub_incident_pipeline Module
+
+This module provides an asynchronous pipeline for incident reports, so that reporting
+from enforce_robot_laws costs a hash and a queue put instead of geocoding, printing,
+file I/O and a database write.
+
+    * submit() deduplicates the report by content hash (event details, sensor data and
+      the digests of the evidence files' contents, from the file hash service): a report identical to one submitted within dedup_window seconds
+      is folded into it (its occurrence count is incremented) and the earlier report id
+      is returned. Otherwise the report is queued and a new id returned immediately.
+    * A background worker enriches queued reports with the location (fetched at most
+      once per location_ttl seconds) and identity, stores evidence files, and writes
+      the reports in batches of up to batch_size in one transaction, with one compact
+      log line per report. A batch the database rejects is appended to spool_path and
+      retried every retry_interval seconds (and at close), so no report is dropped.
+    * Evidence files (audio, video, electronic logs) are stored once by content hash
+      under evidence_dir, however many reports reference them. A file whose digest is
+      already stored is not copied again; otherwise it is hashed while it is copied,
+      so the stored name is the digest of the bytes actually stored.
+
+Classes:
+    IncidentPipeline: Queue, deduplication, enrichment and batched storage of reports.
+
+Functions:
+    get_incident_pipeline(): Returns the process-wide IncidentPipeline.
+    verify_evidence(evidence_dir): Returns the stored evidence files that were tampered with.
+"""
+
+import os
+import json
+import uuid
+import time
+import queue
+import atexit
+import hashlib
+import logging
+import datetime
+import threading
+
+from sub_database import add_incident_reports
+from sub_hashing import copy_and_hash, get_file_hash_service
+
+EVIDENCE_KINDS = ("audio_file", "video_file", "electronic_log")
+
+class IncidentPipeline:
+    """
+    Queue, deduplication, enrichment and batched storage of incident reports.
+
+    Attributes:
+        dedup_window (float): Seconds within which identical reports are folded together.
+        batch_size (int): Maximum reports written per transaction.
+        flush_interval (float): Seconds the worker waits to fill a batch.
+        location_ttl (float): Seconds a fetched location is reused.
+        evidence_dir (str): Directory of the content-addressed evidence files.
+        log_path (str): File receiving one line per stored report, or None.
+        spool_path (str): File holding the batches waiting to be retried.
+        retry_interval (float): Seconds between retries of the spooled batches.
+    """
+
+    def __init__(self, location_provider=None, identity_provider=None, dedup_window=300, batch_size=50,
+                 flush_interval=1.0, location_ttl=600, evidence_dir="incident_evidence",
+                 log_path="incident_reporter_log.txt", spool_path="incident_spool.jsonl", retry_interval=30,
+                 on_error=None):
+        """
+        Starts the worker.
+
+        Args:
+            location_provider (function, optional): Returns the current location dict.
+            identity_provider (function, optional): Returns the robot identity dict.
+            dedup_window (float, optional): Deduplication window in seconds. Defaults to 300.
+            batch_size (int, optional): Reports per transaction. Defaults to 50.
+            flush_interval (float, optional): Seconds to wait to fill a batch. Defaults to 1.0.
+            location_ttl (float, optional): Seconds a location is reused. Defaults to 600.
+            evidence_dir (str, optional): Evidence directory. Defaults to "incident_evidence".
+            log_path (str, optional): Report log file. Defaults to "incident_reporter_log.txt".
+            spool_path (str, optional): Retry spool file. Defaults to "incident_spool.jsonl".
+            retry_interval (float, optional): Seconds between retries. Defaults to 30.
+            on_error (function, optional): Called with a message when a batch cannot be stored.
+        """
+        self.location_provider = location_provider
+        self.identity_provider = identity_provider
+        self.dedup_window = dedup_window
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.location_ttl = location_ttl
+        self.evidence_dir = evidence_dir
+        self.log_path = log_path
+        self.spool_path = spool_path
+        self.retry_interval = retry_interval
+        self.on_error = on_error
+        self._queue = queue.Queue()
+        self._recent = {}
+        self._repeats = {}
+        self._lock = threading.Lock()
+        self._location = None
+        self._location_expires = 0.0
+        self._stats = {"submitted": 0, "deduplicated": 0, "stored": 0, "failed": 0}
+        self._spooled = os.path.exists(spool_path)
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="incident-pipeline", daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def content_hash(event_details, sensor_data=None, evidence=None):
+        """
+        Returns the deduplication hash of a report's content.
+
+        Args:
+            event_details (str): Description of the event.
+            sensor_data (dict, optional): Sensor readings.
+            evidence (dict, optional): Evidence kind -> file path. Files are identified by
+                the digest of their contents, so two reports citing the same path are only
+                duplicates if the file did not change in between.
+        """
+        paths = list((evidence or {}).values())
+        digests = get_file_hash_service().hash_many(paths) if paths else {}
+        files = sorted((kind, digests.get(path) or path) for kind, path in (evidence or {}).items())
+        content = json.dumps([event_details, sensor_data, files], sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def submit(self, event_details, audio_file=None, video_file=None, electronic_log=None, sensor_data=None):
+        """
+        Queues a report without blocking.
+
+        Returns:
+            str: The report id (that of the earlier report if this one was a duplicate).
+        """
+        evidence = {kind: path for kind, path in zip(EVIDENCE_KINDS, (audio_file, video_file, electronic_log)) if path}
+        digest = self.content_hash(event_details, sensor_data, evidence)
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Incident pipeline is closed.")
+            self._stats["submitted"] += 1
+            recent = self._recent.get(digest)
+            if recent is not None and recent[1] > now:
+                report_id = recent[0]
+                self._repeats[report_id] = self._repeats.get(report_id, 0) + 1
+                self._stats["deduplicated"] += 1
+                return report_id
+            if len(self._recent) > 1024:
+                self._recent = {key: value for key, value in self._recent.items() if value[1] > now}
+            report_id = str(uuid.uuid4())
+            self._recent[digest] = (report_id, now + self.dedup_window)
+        self._queue.put({"report_id": report_id, "timestamp": datetime.datetime.now().isoformat(),
+                         "event_details": event_details, "sensor_data": sensor_data, "evidence": evidence})
+        return report_id
+
+    def _get_location(self):
+        now = time.monotonic()
+        if self._location is None or now >= self._location_expires:
+            try:
+                self._location = self.location_provider() if self.location_provider else {}
+            except Exception as e:
+                logging.error(f"Error retrieving location for incident reports: {e}")
+                self._location = {"latitude": None, "longitude": None, "address": None}
+            self._location_expires = now + self.location_ttl
+        return self._location
+
+    def _stored_path(self, content_hash):
+        return os.path.join(self.evidence_dir, content_hash[:2], content_hash)
+
+    def _store_evidence(self, path):
+        """Stores a file once under its content hash. Returns (content_hash, stored_path, size)."""
+        # Skip the copy when the file's (cached) digest is already stored.
+        content_hash = get_file_hash_service().hash(path)
+        stored_path = self._stored_path(content_hash)
+        if os.path.exists(stored_path):
+            return content_hash, stored_path, os.path.getsize(stored_path)
+        os.makedirs(self.evidence_dir, exist_ok=True)
+        temporary = os.path.join(self.evidence_dir, f"{uuid.uuid4().hex}.tmp")
+        try:
+            content_hash, size = copy_and_hash(path, temporary)
+            stored_path = self._stored_path(content_hash)
+            if not os.path.exists(stored_path):
+                os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+                os.replace(temporary, stored_path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return content_hash, stored_path, size
+
+    def _enrich(self, item, evidence_rows):
+        report = {"report_id": item["report_id"], "timestamp": item["timestamp"], "location": self._get_location(),
+                  "event_details": item["event_details"],
+                  "identity_data": self.identity_provider() if self.identity_provider else {}}
+        for kind, path in item["evidence"].items():
+            if not os.path.exists(path):
+                continue
+            try:
+                content_hash, stored_path, size = self._store_evidence(path)
+            except OSError as e:
+                logging.error(f"Error storing evidence {path} for report {item['report_id']}: {e}")
+                continue
+            report[kind] = stored_path
+            evidence_rows.append((item["report_id"], kind, content_hash, stored_path, size, item["timestamp"]))
+        if item["sensor_data"]:
+            report["sensor_data"] = item["sensor_data"]
+        return report
+
+    def _store(self, reports, evidence, occurrences):
+        """Writes one batch. Returns True if it was stored."""
+        if not add_incident_reports(reports, evidence, occurrences):
+            return False
+        with self._lock:
+            self._stats["stored"] += len(reports)
+        if self.log_path and reports:
+            try:
+                with open(self.log_path, "a") as f:
+                    for report in reports:
+                        f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: Reported illegal action: {json.dumps(report, default=str)}\n")
+            except OSError as e:
+                logging.error(f"Error logging incident reports: {e}")
+        return True
+
+    def _spool(self, batch):
+        """Appends a batch that could not be stored to the spool file. Returns True on success."""
+        try:
+            with open(self.spool_path, "a") as f:
+                f.write(json.dumps(batch, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logging.error(f"Error spooling incident reports to {self.spool_path}: {e}")
+            return False
+        self._spooled = True
+        return True
+
+    def _retry_spooled(self):
+        """Stores the spooled batches, in order, keeping those that fail again. Returns True if none remain."""
+        if not self._spooled:
+            return True
+        try:
+            with open(self.spool_path) as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            self._spooled = False
+            return True
+        except OSError as e:
+            logging.error(f"Error reading incident spool {self.spool_path}: {e}")
+            return False
+        remaining = []
+        for line in lines:
+            if remaining:
+                remaining.append(line)
+                continue
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                logging.error(f"Discarding corrupt line in incident spool {self.spool_path}.")
+                continue
+            if not self._store(batch["reports"], batch["evidence"], batch["occurrences"]):
+                remaining.append(line)
+        try:
+            if remaining:
+                temporary = f"{self.spool_path}.tmp"
+                with open(temporary, "w") as f:
+                    f.writelines(remaining)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporary, self.spool_path)
+            else:
+                os.remove(self.spool_path)
+                self._spooled = False
+        except OSError as e:
+            logging.error(f"Error rewriting incident spool {self.spool_path}: {e}")
+        return not remaining
+
+    def _write(self, items):
+        evidence_rows = []
+        reports = [self._enrich(item, evidence_rows) for item in items]
+        with self._lock:
+            repeats, self._repeats = self._repeats, {}
+        last_seen = datetime.datetime.now().isoformat()
+        batch = {"reports": reports, "evidence": evidence_rows,
+                 "occurrences": [(report_id, count, last_seen) for report_id, count in repeats.items()]}
+        # Earlier batches go first, so repeats never land before the reports they count.
+        if self._retry_spooled() and self._store(**batch):
+            return
+        spooled = self._spool(batch)
+        with self._lock:
+            self._stats["failed"] += len(reports)
+        if spooled:
+            message = f"Error storing {len(reports)} incident report(s); spooled to {self.spool_path} for retry."
+        else:
+            message = f"Error storing {len(reports)} incident report(s); they could not be spooled and are lost. Awaiting approval."
+        logging.error(message)
+        if self.on_error is not None:
+            try:
+                self.on_error(message)
+            except Exception as e:
+                logging.error(f"Error in incident pipeline error handler: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.retry_interval if self._spooled else None)
+            except queue.Empty:
+                try:
+                    self._retry_spooled()
+                except Exception as e:
+                    logging.error(f"Error in incident pipeline: {e}")
+                continue
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except Exception as e:
+                logging.error(f"Error in incident pipeline: {e}")
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Waits until every queued report has been stored."""
+        self._queue.join()
+
+    def stats(self):
+        """Returns counts of submitted, deduplicated, stored and failed reports."""
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def close(self):
+        """Stores the queued reports and stops the worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        if self._repeats:
+            self._write([])
+        else:
+            self._retry_spooled()
+
+def verify_evidence(evidence_dir="incident_evidence"):
+    """
+    Re-hashes every stored evidence file and compares it with its name (its digest).
+
+    Returns:
+        list: Paths of the files whose contents no longer match.
+    """
+    expected = {}
+    for directory, _, files in os.walk(evidence_dir):
+        for name in files:
+            if not name.endswith(".tmp"):
+                expected[os.path.join(directory, name)] = name
+    return [path for path, ok in get_file_hash_service().verify_many(expected).items() if not ok]
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_incident_pipeline(location_provider=None, identity_provider=None, on_error=None):
+    """
+    Returns the process-wide IncidentPipeline, created on first use with the given
+    providers and INCIDENT_DEDUP_WINDOW, INCIDENT_BATCH_SIZE, INCIDENT_LOCATION_TTL and
+    INCIDENT_EVIDENCE_DIR, INCIDENT_SPOOL_PATH and INCIDENT_RETRY_INTERVAL. Queued
+    reports are stored at interpreter exit.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = IncidentPipeline(location_provider, identity_provider,
+                                             dedup_window=float(os.getenv("INCIDENT_DEDUP_WINDOW", "300")),
+                                             batch_size=int(os.getenv("INCIDENT_BATCH_SIZE", "50")),
+                                             location_ttl=float(os.getenv("INCIDENT_LOCATION_TTL", "600")),
+                                             evidence_dir=os.getenv("INCIDENT_EVIDENCE_DIR", "incident_evidence"),
+                                             spool_path=os.getenv("INCIDENT_SPOOL_PATH", "incident_spool.jsonl"),
+                                             retry_interval=float(os.getenv("INCIDENT_RETRY_INTERVAL", "30")),
+                                             on_error=on_error)
+                atexit.register(_pipeline.close)
+    return _pipeline
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    pipeline = IncidentPipeline(location_provider=lambda: {"latitude": 51.5, "longitude": -0.12, "address": "London"})
+    for _ in range(3):
+        print(pipeline.submit("Radiation Alert Triggered.", sensor_data={"radiation": {"level": 80}}))
+    pipeline.submit("High Crime Rate Detected.", sensor_data={"crime_rate": 12})
+    pipeline.close()
+    print(pipeline.stats())
@@ -1,38 +1,271 @@
 # --- sub_module_integration.py ---
+"""
+This module integrates dynamically defined modules and executes their functions.
+
+Integration compiles the module code, runs the law checks on the module and on every
+function it defines, and records the results in two structures:
+
+    * a function index (function name -> module, function and safety verdict), so
+      execute_module_function is a dictionary lookup instead of a scan of every module;
+    * a safety-verdict cache keyed by the SHA-256 of each function's marshalled code
+      object, so identical code integrated again (or under another module name) is not
+      re-checked.
+
+Law checks therefore run once, at integration time, against the environmental and
+socioeconomic data given to integrate_module, and not on every call. Integrating a
+module under an existing name replaces it and re-indexes its functions;
+remove_module drops a module, and invalidate_verdicts clears the verdict cache (e.g.
+after the law checks themselves change) and re-checks every integrated function.
+
+If a store (see sub_module_store.ModuleStore) is given, compiled code and law-check
+results are persisted by source hash: integrating known source skips compiling and
+re-checking, and restore_modules() brings every stored module back at startup.
+
+If an executor (see sub_module_sandbox.SandboxPool) is given, dynamic code is never
+executed in this process: functions are found in the compiled code object, and calls
+are run in the executor's worker processes under its CPU and wall-clock limits. The
+data of a call is pickled into shared memory once per snapshot (see
+execute_module_function) and reused by later calls against the same snapshot.
+"""
+
+import ast
+
+import types
+import marshal
+import hashlib
 import logging
-import importlib
 import inspect
+import threading
+from sub_module_store import ModuleRecord
 from computerized_laws import _check_zeroth_law, _check_first_law, _check_second_law, _check_third_law, _check_fourth_law, _check_fifth_law, _check_sixth_law
 
 logging.basicConfig(filename='module_integration.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Filename given to compiled dynamic code, kept constant so that identical code hashes
+# identically whatever module it is integrated under.
+DYNAMIC_CODE_FILENAME = "<dynamic_module>"
+
+def code_hash(func):
+    """
+    Returns the SHA-256 hex digest of a function's (or code object's) marshalled code.
+
+    Marshal format 2 is used because later formats mark shared objects depending on
+    reference counts, which makes their output vary between calls.
+    """
+    return hashlib.sha256(marshal.dumps(getattr(func, "__code__", func), 2)).hexdigest()
+
 class ModuleIntegrationManager:
-    def __init__(self):
+    # Shared-memory snapshots kept for reuse by later calls
+    SNAPSHOT_CACHE_SIZE = 8
+
+    def __init__(self, executor=None, store=None):
+        """
+        Initializes the ModuleIntegrationManager.
+
+        Args:
+            executor (SandboxPool, optional): Runs module functions in worker processes.
+                Functions run in-process if None.
+            store (ModuleStore, optional): Persists compiled modules and law-check results.
+        """
+        self.executor = executor
+        self.store = store
         self.modules = {}
+        self._definitions = {}
+        self._compiled = {}
+        self._sources = {}
+        self._contexts = {}
+        self._functions = {}
+        self._verdicts = {}
+        self._counter = 0
+        self._snapshots = []  # [EnvironmentalSnapshot, Snapshot, users], least recently used first
+        self._lock = threading.RLock()
 
     def integrate_module(self, module_definition, environmental_data, socioeconomic_data):
+        """
+        Compiles, checks and indexes a dynamic module.
+
+        Args:
+            module_definition (dict): {"code": source} and optionally {"name": module name}
+                and {"metadata": dict}. Integrating under an existing name replaces that module.
+            environmental_data (dict): Environmental data the law checks run against.
+            socioeconomic_data (dict): Socioeconomic data the law checks run against.
+
+        Returns:
+            dict: {"success": True, "module": name, "functions": {name: verdict}} or
+                {"success": False, "error": message}.
+        """
         try:
-            # Dynamically create a module
-            module_name = f"dynamic_module_{len(self.modules)}"
             module_code = module_definition["code"]
+            with self._lock:
+                module_name = module_definition.get("name")
+                if module_name is None:
+                    module_name = f"dynamic_module_{self._counter}"
+                    self._counter += 1
 
-            # Create a module object
-            module = type(importlib.util.module_from_spec(importlib.util.spec_from_file_location(module_name, 'temp.py')))
-            exec(module_code, module.__dict__)
-            self.modules[module_name] = module
+            content_hash = hashlib.sha256(module_code.encode("utf-8")).hexdigest()
+            cached = self.store.get(content_hash) if self.store is not None else None
 
-            # Law checks on module code
-            if not self.check_module_laws(module_code, environmental_data, socioeconomic_data):
+            # Law checks on module code, before any of it runs
+            module_ok = cached.module_ok if cached is not None else \
+                self.check_module_laws(module_code, environmental_data, socioeconomic_data)
+            if not module_ok:
                 logging.warning(f"Module '{module_name}' failed law checks. Integration aborted.")
+                if self.store is not None and cached is None:
+                    self.store.reject(content_hash)
                 return {"success": False, "error": "Module failed law checks."}
 
+            if cached is not None:
+                compiled = marshal.loads(cached.code)
+                with self._lock:
+                    for function_name, code in self._code_functions(compiled, module_code).items():
+                        if function_name in cached.verdicts:
+                            self._verdicts.setdefault(code_hash(code), cached.verdicts[function_name])
+            else:
+                compiled = compile(module_code, DYNAMIC_CODE_FILENAME, "exec")
+            verdicts = self._install(module_name, module_code, compiled, environmental_data, socioeconomic_data)
+
+            if self.store is not None and (cached is None or cached.name != module_name):
+                self.store.put(ModuleRecord(content_hash, module_name, module_code, marshal.dumps(compiled, 2),
+                                            verdicts, module_definition.get("metadata")))
+
             logging.info(f"Module '{module_name}' integrated successfully.")
-            return {"success": True}
+            return {"success": True, "module": module_name, "functions": verdicts}
 
         except Exception as e:
             logging.error(f"Error integrating module: {e}")
             return {"success": False, "error": str(e)}
 
+    def _install(self, module_name, module_code, compiled, environmental_data, socioeconomic_data):
+        """Creates a module from compiled code, checks its functions and indexes them. Returns the verdicts."""
+        # Dynamically create a module (only compiled here when it runs in the executor)
+        if self.executor is None:
+            module = types.ModuleType(module_name)
+            exec(compiled, module.__dict__)
+            functions = dict(self._module_functions(module))
+        else:
+            module = None
+            functions = self._code_functions(compiled, module_code)
+
+        verdicts = {}
+        for function_name, func in functions.items():
+            verdicts[function_name] = self._verdict(func, module_code, environmental_data, socioeconomic_data)
+
+        with self._lock:
+            if module_name in self.modules:
+                self._remove(module_name)
+                logging.info(f"Module '{module_name}' re-integrated; previous version replaced.")
+            self.modules[module_name] = module
+            self._definitions[module_name] = functions
+            marshalled = marshal.dumps(compiled, 2)
+            self._compiled[module_name] = (hashlib.sha256(marshalled).hexdigest(), marshalled)
+            self._sources[module_name] = module_code
+            self._contexts[module_name] = (environmental_data, socioeconomic_data)
+            self._index_module(module_name, verdicts)
+        return verdicts
+
+    def restore_modules(self):
+        """
+        Reinstalls every module in the store without recompiling or re-checking it.
+
+        Returns:
+            int: Number of modules restored.
+        """
+        if self.store is None:
+            return 0
+        restored = 0
+        for record in self.store.records():
+            try:
+                compiled = marshal.loads(record.code)
+                with self._lock:
+                    for function_name, code in self._code_functions(compiled, record.source).items():
+                        if function_name in record.verdicts:
+                            self._verdicts.setdefault(code_hash(code), record.verdicts[function_name])
+                    if record.name.startswith("dynamic_module_") and record.name[15:].isdigit():
+                        self._counter = max(self._counter, int(record.name[15:]) + 1)
+                self._install(record.name, record.source, compiled, {}, {})
+                restored += 1
+            except Exception as e:
+                logging.error(f"Error restoring module '{record.name}': {e}")
+        logging.info(f"Restored {restored} modules from the module store.")
+        return restored
+
+    @staticmethod
+    def _module_functions(module):
+        """Yields (name, function) for the functions defined by a module itself."""
+        for name, value in vars(module).items():
+            if inspect.isfunction(value) and value.__module__ == module.__name__:
+                yield name, value
+
+    @staticmethod
+    def _code_functions(compiled, module_code):
+        """Returns name -> code object for the top-level functions of compiled module code."""
+        names = {node.name for node in ast.parse(module_code).body
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+        return {const.co_name: const for const in compiled.co_consts
+                if isinstance(const, types.CodeType) and const.co_name in names}
+
+    def _verdict(self, func, module_code, environmental_data, socioeconomic_data):
+        """Returns the cached safety verdict of a function, running the checks on a miss."""
+        key = code_hash(func)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+        if verdict is None:
+            verdict = self.check_function_safety(func, environmental_data, socioeconomic_data, module_code)
+            with self._lock:
+                self._verdicts[key] = verdict
+        return verdict
+
+    def _index_module(self, module_name, verdicts):
+        """Adds a module's functions to the index. Earlier modules keep names they already provide."""
+        functions = self._definitions[module_name]
+        for function_name, verdict in verdicts.items():
+            self._functions.setdefault(function_name, (module_name, functions[function_name], verdict))
+
+    def _remove(self, module_name):
+        del self.modules[module_name]
+        self._definitions.pop(module_name, None)
+        self._compiled.pop(module_name, None)
+        self._sources.pop(module_name, None)
+        self._contexts.pop(module_name, None)
+        orphaned = [name for name, entry in self._functions.items() if entry[0] == module_name]
+        for name in orphaned:
+            del self._functions[name]
+        # Hand the names back to the next module (in integration order) that defines them.
+        for other_name, functions in self._definitions.items():
+            for function_name, func in functions.items():
+                if function_name in orphaned and function_name not in self._functions:
+                    self._functions[function_name] = (other_name, func, self._verdicts.get(code_hash(func), False))
+
+    def remove_module(self, module_name):
+        """
+        Removes an integrated module and its functions from the index.
+
+        Returns:
+            bool: True if the module was integrated.
+        """
+        with self._lock:
+            if module_name not in self.modules:
+                return False
+            self._remove(module_name)
+        if self.store is not None:
+            self.store.remove(module_name)
+        logging.info(f"Module '{module_name}' removed.")
+        return True
+
+    def invalidate_verdicts(self):
+        """Clears the verdict cache and re-checks every integrated function."""
+        with self._lock:
+            self._verdicts.clear()
+            definitions = list(self._definitions.items())
+        for module_name, functions in definitions:
+            environmental_data, socioeconomic_data = self._contexts[module_name]
+            for function_name, func in functions.items():
+                verdict = self._verdict(func, self._sources[module_name], environmental_data, socioeconomic_data)
+                with self._lock:
+                    entry = self._functions.get(function_name)
+                    if entry is not None and entry[1] is func:
+                        self._functions[function_name] = (module_name, func, verdict)
+
     def check_module_laws(self, module_code, environmental_data, socioeconomic_data):
         # Basic law checks
         # This is very basic, and should be expanded greatly.
@@ -42,49 +275,112 @@ class ModuleIntegrationManager:
 
         # Simulate running the code through the existing law checks.
         # This is a placeholder, and should be greatly expanded.
-        if _check_zeroth_law(module_code, environmental_data, socioeconomic_data) or \
-           _check_first_law(module_code, environmental_data, socioeconomic_data) or \
-           _check_second_law(module_code, environmental_data, socioeconomic_data) or \
-           _check_third_law(module_code) or \
-           _check_fourth_law(module_code, environmental_data, socioeconomic_data) or \
-           _check_fifth_law(module_code) or \
-           _check_sixth_law(module_code):
+        if self._violates_laws(module_code, environmental_data, socioeconomic_data):
             logging.warning("Module code violates one or more laws.")
             return False
 
         return True
 
-    def execute_module_function(self, function_name, environmental_data, socioeconomic_data):
-        for module_name, module in self.modules.items():
-            if hasattr(module, function_name):
-                func = getattr(module, function_name)
-                # Check function safety before execution
-                if self.check_function_safety(func, environmental_data, socioeconomic_data):
-                    try:
-                        return func(environmental_data, socioeconomic_data) #Example of passing data.
-                    except Exception as e:
-                        logging.error(f"Error executing function '{function_name}' from module '{module_name}': {e}")
-                        return None
-                else:
-                    logging.warning(f"Function '{function_name}' from module '{module_name}' failed safety checks.")
-                    return None
-        return None
-
-    def check_function_safety(self, func, environmental_data, socioeconomic_data):
+    def _acquire_snapshot(self, key, environmental_data, socioeconomic_data):
+        """
+        Returns the cache entry [key, Snapshot, users] for key (compared by identity),
+        pickling the data into shared memory on a miss.
+        """
+        with self._lock:
+            for entry in self._snapshots:
+                if entry[0] is key:
+                    self._snapshots.remove(entry)
+                    self._snapshots.append(entry)
+                    entry[2] += 1
+                    return entry
+            entry = [key, self.executor.share(environmental_data, socioeconomic_data), 1]
+            self._snapshots.append(entry)
+            while len(self._snapshots) > self.SNAPSHOT_CACHE_SIZE:
+                evicted = self._snapshots.pop(0)
+                if evicted[2] == 0:
+                    evicted[1].close()
+            return entry
+
+    def _release_snapshot(self, entry):
+        with self._lock:
+            entry[2] -= 1
+            if entry[2] == 0 and entry not in self._snapshots:
+                entry[1].close()
+
+    def close_snapshots(self):
+        """Releases the cached shared-memory snapshots that are not in use."""
+        with self._lock:
+            for entry in [entry for entry in self._snapshots if entry[2] == 0]:
+                self._snapshots.remove(entry)
+                entry[1].close()
+
+    def execute_module_function(self, function_name, environmental_data, socioeconomic_data, snapshot=None):
+        """
+        Runs an integrated function with the given data.
+
+        Args:
+            function_name (str): Function to run.
+            environmental_data (dict): Environmental data passed to the function.
+            socioeconomic_data (dict): Socioeconomic data passed to the function.
+            snapshot (EnvironmentalSnapshot, optional): The snapshot the data was taken
+                from. With an executor, the data is pickled into shared memory once per
+                snapshot and reused by later calls; without one, once per call.
+
+        Returns:
+            The function's result, or None if it is unknown, unsafe or failed.
+        """
+        with self._lock:
+            entry = self._functions.get(function_name)
+        if entry is None:
+            return None
+        module_name, func, safe = entry
+        if not safe:
+            logging.warning(f"Function '{function_name}' from module '{module_name}' failed safety checks.")
+            return None
+        if self.executor is not None:
+            module_key, code = self._compiled[module_name]
+            if snapshot is None:
+                with self.executor.share(environmental_data, socioeconomic_data) as shared:
+                    outcome = self.executor.call(module_key, code, function_name, shared)
+            else:
+                entry = self._acquire_snapshot(snapshot, environmental_data, socioeconomic_data)
+                try:
+                    outcome = self.executor.call(module_key, code, function_name, entry[1])
+                finally:
+                    self._release_snapshot(entry)
+            if not outcome["success"]:
+                logging.error(f"Error executing function '{function_name}' from module '{module_name}': {outcome['error']}")
+                return None
+            return outcome["result"]
+        try:
+            return func(environmental_data, socioeconomic_data) #Example of passing data.
+        except Exception as e:
+            logging.error(f"Error executing function '{function_name}' from module '{module_name}': {e}")
+            return None
+
+    def check_function_safety(self, func, environmental_data, socioeconomic_data, module_code=None):
         # Basic checks, expand greatly.
-        func_code = inspect.getsource(func)
+        try:
+            func_code = inspect.getsource(func)
+        except (OSError, TypeError):
+            # Code exec'd from a string has no source file; check the whole module instead.
+            func_code = module_code or ""
         if "os.system" in func_code or "subprocess" in func_code:
             logging.warning("Function contains potentially dangerous commands.")
             return False
 
-        if _check_zeroth_law(func_code, environmental_data, socioeconomic_data) or \
-           _check_first_law(func_code, environmental_data, socioeconomic_data) or \
-           _check_second_law(func_code, environmental_data, socioeconomic_data) or \
-           _check_third_law(func_code) or \
-           _check_fourth_law(func_code, environmental_data, socioeconomic_data) or \
-           _check_fifth_law(func_code) or \
-           _check_sixth_law(func_code):
+        if self._violates_laws(func_code, environmental_data, socioeconomic_data):
             logging.warning("Function code violates one or more laws.")
             return False
 
         return True
+
+    @staticmethod
+    def _violates_laws(code, environmental_data, socioeconomic_data):
+        return _check_zeroth_law(code, environmental_data, socioeconomic_data) or \
+               _check_first_law(code, environmental_data, socioeconomic_data) or \
+               _check_second_law(code, environmental_data, socioeconomic_data) or \
+               _check_third_law(code) or \
+               _check_fourth_law(code, environmental_data, socioeconomic_data) or \
+               _check_fifth_law(code) or \
+               _check_sixth_law(code)
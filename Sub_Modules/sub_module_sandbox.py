@@ -0,0 +1,295 @@
+"""
+Sub_module_sandbox Module
+
+This module runs functions of dynamically integrated modules in a warm pool of
+worker processes instead of on the caller's thread, so a slow or CPU-heavy module
+cannot stall the directive loop or compete for the GIL.
+
+    * Workers are started on first use (or by start()) from a forkserver or spawn
+      context, so they never inherit the threads and locks of a running process, and
+      are then reused. Each keeps the modules it has executed, keyed by content hash,
+      so a module's code is sent and executed once per worker.
+    * Environmental and socioeconomic data are pickled once into a shared-memory
+      Snapshot; workers read it from shared memory and keep the last one unpickled, so
+      repeated calls against the same snapshot cost only a small control message.
+    * Each call, including the first execution of a module's code, runs under a
+      CPU-time limit (RLIMIT_CPU, where the resource module is available) and a
+      wall-clock limit. A worker that exceeds the wall-clock limit is killed and
+      replaced.
+
+Results are plain dicts in the repo's usual shape: {"success": True, "result": ...}
+or {"success": False, "error": message}.
+
+Classes:
+    Snapshot: Environmental/socioeconomic data pickled once into shared memory.
+    SandboxPool: Warm worker pool executing dynamic module functions.
+"""
+
+import time
+import queue
+import pickle
+import signal
+import marshal
+import logging
+import threading
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; CPU limits are skipped there.
+    resource = None
+
+class CpuLimitExceeded(Exception):
+    """Raised inside a worker when a call exceeds its CPU-time limit."""
+
+class Snapshot:
+    """
+    Environmental and socioeconomic data pickled once into shared memory.
+
+    Attributes:
+        name (str): Shared memory block name.
+        size (int): Size of the pickled payload in bytes.
+    """
+
+    def __init__(self, environmental_data, socioeconomic_data):
+        payload = pickle.dumps((environmental_data, socioeconomic_data), protocol=pickle.HIGHEST_PROTOCOL)
+        self.size = len(payload)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self._shm.buf[:self.size] = payload
+        self.name = self._shm.name
+
+    def close(self):
+        """Releases the shared memory block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _raise_cpu_limit(signum, frame):
+    raise CpuLimitExceeded("CPU time limit exceeded")
+
+def _cpu_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _load_snapshot(name, size):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return pickle.loads(shm.buf[:size])
+    finally:
+        shm.close()
+
+def _worker_main(conn, memory_bytes):
+    """Worker loop: executes (module, function, snapshot) requests until told to stop."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+        if memory_bytes:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    modules = {}
+    snapshot_name, snapshot = None, None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        module_key, code, function_name, snapshot_ref, cpu_seconds = message
+        if module_key not in modules and code is None:
+            conn.send(("missing", module_key))
+            continue
+        limited = resource is not None and cpu_seconds
+        try:
+            # The limit covers the module's top-level code as well as the call.
+            if limited:
+                limit = int(_cpu_used() + cpu_seconds) + 1
+                resource.setrlimit(resource.RLIMIT_CPU, (limit, resource.RLIM_INFINITY))
+            try:
+                namespace = modules.get(module_key)
+                if namespace is None:
+                    namespace = {"__name__": module_key}
+                    exec(marshal.loads(code), namespace)
+                    modules[module_key] = namespace
+                if snapshot_ref[0] != snapshot_name:
+                    snapshot = _load_snapshot(*snapshot_ref)
+                    snapshot_name = snapshot_ref[0]
+                func = namespace.get(function_name)
+                if not callable(func):
+                    conn.send(("error", f"Function '{function_name}' not found"))
+                    continue
+                result = func(*snapshot)
+            finally:
+                if limited:
+                    resource.setrlimit(resource.RLIMIT_CPU, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+            try:
+                conn.send(("ok", result))
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                conn.send(("error", f"Result is not picklable: {e}"))
+        except CpuLimitExceeded as e:
+            conn.send(("error", str(e)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    __slots__ = ("process", "conn", "modules")
+
+    def __init__(self, context, memory_bytes):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.modules = set()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class SandboxPool:
+    """
+    Warm worker pool executing dynamic module functions.
+
+    Attributes:
+        num_workers (int): Number of worker processes.
+        cpu_seconds (float): CPU-time limit per call.
+        wall_timeout (float): Wall-clock limit per call in seconds.
+        memory_bytes (int): Address-space limit per worker, or None.
+    """
+
+    def __init__(self, num_workers=2, cpu_seconds=2, wall_timeout=5, memory_bytes=None, start_method=None):
+        """
+        Initializes the pool. Workers are started by start() or on the first call.
+
+        Args:
+            num_workers (int, optional): Number of worker processes. Defaults to 2.
+            cpu_seconds (float, optional): CPU-time limit per call. Defaults to 2.
+            wall_timeout (float, optional): Wall-clock limit per call in seconds. Defaults to 5.
+            memory_bytes (int, optional): Address-space limit per worker. Defaults to None (no limit).
+            start_method (str, optional): multiprocessing start method. Defaults to
+                "forkserver" where available, else "spawn".
+        """
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.num_workers = num_workers
+        self.cpu_seconds = cpu_seconds
+        self.wall_timeout = wall_timeout
+        self.memory_bytes = memory_bytes
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = False
+
+    def start(self):
+        """Starts the worker processes, if they are not running yet."""
+        with self._lock:
+            if self._started:
+                return
+            # Workers must share the parent's resource tracker; one of their own would unlink
+            # snapshot blocks it saw attached when the worker exits.
+            resource_tracker.ensure_running()
+            for _ in range(self.num_workers):
+                worker = _Worker(self._context, self.memory_bytes)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started = True
+
+    def _replace(self, worker):
+        worker.kill()
+        replacement = _Worker(self._context, self.memory_bytes)
+        with self._lock:
+            self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+    def share(self, environmental_data, socioeconomic_data):
+        """
+        Pickles data once into shared memory for any number of calls.
+
+        Returns:
+            Snapshot: Close it (or use it as a context manager) when done.
+        """
+        return Snapshot(environmental_data, socioeconomic_data)
+
+    def call(self, module_key, code, function_name, snapshot):
+        """
+        Runs module_function(environmental_data, socioeconomic_data) in a worker.
+
+        Args:
+            module_key (str): Content hash identifying the module.
+            code (bytes): Marshalled module code object, sent only to workers that have
+                not executed this module yet.
+            function_name (str): Function to call.
+            snapshot (Snapshot): Data passed to the function.
+
+        Returns:
+            dict: {"success": True, "result": ...} or {"success": False, "error": message}.
+        """
+        if self._closed:
+            return {"success": False, "error": "Sandbox pool is closed"}
+        if not self._started:
+            self.start()
+        worker = self._idle.get()
+        try:
+            send_code = None if module_key in worker.modules else code
+            worker.conn.send((module_key, send_code, function_name, (snapshot.name, snapshot.size), self.cpu_seconds))
+            deadline = time.monotonic() + self.wall_timeout
+            while True:
+                if not worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                    logging.error(f"Sandboxed call '{function_name}' exceeded {self.wall_timeout}s; restarting worker.")
+                    worker = self._replace(worker)
+                    return {"success": False, "error": f"Wall-clock limit of {self.wall_timeout}s exceeded"}
+                status, value = worker.conn.recv()
+                if status == "missing":
+                    worker.modules.discard(module_key)
+                    worker.conn.send((module_key, code, function_name, (snapshot.name, snapshot.size), self.cpu_seconds))
+                    continue
+                worker.modules.add(module_key)
+                if status == "ok":
+                    return {"success": True, "result": value}
+                return {"success": False, "error": value}
+        except (EOFError, OSError, BrokenPipeError) as e:
+            logging.error(f"Sandbox worker died during '{function_name}': {e}; restarting worker.")
+            worker = self._replace(worker)
+            return {"success": False, "error": f"Worker died: {e}"}
+        finally:
+            self._idle.put(worker)
+
+    def run(self, module_key, code, function_name, environmental_data, socioeconomic_data):
+        """Like call, with a one-off snapshot of the given data."""
+        with self.share(environmental_data, socioeconomic_data) as snapshot:
+            return self.call(module_key, code, function_name, snapshot)
+
+    def close(self):
+        """Stops every worker."""
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    code = marshal.dumps(compile("def average_temperature(env, socio):\n    return sum(env['temperatures']) / len(env['temperatures'])\n", "<dynamic_module>", "exec"))
+    pool = SandboxPool(num_workers=2)
+    with pool.share({"temperatures": [12.5, 14.0, 13.2]}, {}) as snapshot:
+        print(pool.call("example", code, "average_temperature", snapshot))
+    pool.close()
@@ -0,0 +1,230 @@
+"""
+Sub_module_store Module
+
+This module persists integrated dynamic modules so a restart does not recompile and
+re-verify each of them. Every module is stored under the SHA-256 of its source with:
+
+    * the marshalled code object and the interpreter's bytecode magic number (records
+      written by a different Python version are ignored and rebuilt);
+    * the per-function law-check verdicts;
+    * integration metadata (module name, time of integration, caller metadata).
+
+Sources that failed the module-level law checks are remembered by hash as well, so
+they are rejected again without re-checking. Records are read back with a single
+query, so restoring hundreds of modules costs one SELECT plus a marshal.loads per
+module.
+
+Stored code is executed without being recompiled and its stored verdicts replace the
+law checks, so every row is verified before it is returned: the source must hash to
+the record's content hash, and the row must match the digest written with it. The
+digest is an HMAC-SHA256, under the store's key (MODULE_STORE_KEY), of the content
+hash, module name, verdicts, metadata, module_ok and code; rows of rejected sources
+carry one as well. Rows that fail verification are skipped (and logged), so their
+modules are recompiled and re-checked. Without a key the store is disabled: nothing
+is stored or loaded, since anyone could forge the digests.
+
+Classes:
+    ModuleRecord: One stored module.
+    ModuleStore: SQLite-backed store of compiled modules.
+"""
+
+import hmac
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+import importlib.util
+
+MAGIC_NUMBER = importlib.util.MAGIC_NUMBER
+
+class ModuleRecord:
+    """
+    One stored module.
+
+    Attributes:
+        content_hash (str): SHA-256 of the module source.
+        name (str): Module name it was integrated under.
+        source (str): Module source.
+        code (bytes): Marshalled module code object (None for a rejected source).
+        module_ok (bool): Result of the module-level law checks.
+        verdicts (dict): Function name -> safety verdict.
+        metadata (dict): Integration metadata.
+        integrated_at (float): Time of integration (seconds since the epoch).
+    """
+
+    __slots__ = ("content_hash", "name", "source", "code", "module_ok", "verdicts", "metadata", "integrated_at")
+
+    def __init__(self, content_hash, name, source, code, verdicts, metadata=None, integrated_at=None, module_ok=True):
+        self.content_hash = content_hash
+        self.name = name
+        self.source = source
+        self.code = code
+        self.module_ok = module_ok
+        self.verdicts = verdicts
+        self.metadata = metadata or {}
+        self.integrated_at = integrated_at if integrated_at is not None else time.time()
+
+class ModuleStore:
+    """
+    SQLite-backed store of compiled modules, keyed by content hash (one record per module name).
+
+    Attributes:
+        db_path (str): Path of the SQLite database.
+    """
+
+    def __init__(self, db_path="module_store.db", key=None):
+        """
+        Opens (and if needed creates) the store.
+
+        Args:
+            db_path (str, optional): Path of the SQLite database. Defaults to "module_store.db".
+            key (str or bytes, optional): Secret the digests are keyed with. Without one the
+                store is disabled. Defaults to None.
+        """
+        self.db_path = db_path
+        self._key = key.encode("utf-8") if isinstance(key, str) else key
+        if not self._key:
+            logging.warning("No module store key configured (MODULE_STORE_KEY); stored modules are neither saved nor loaded.")
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS modules (
+                    content_hash TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    magic BLOB NOT NULL,
+                    code BLOB NOT NULL,
+                    verdicts TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    integrated_at REAL NOT NULL,
+                    digest TEXT NOT NULL,
+                    PRIMARY KEY (content_hash, name)
+                )
+            """)
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_modules_name ON modules (name)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rejected (
+                    content_hash TEXT PRIMARY KEY,
+                    rejected_at REAL NOT NULL,
+                    digest TEXT NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def _digest(self, fields, code=b""):
+        """HMAC of the JSON-encoded fields and the code bytes."""
+        mac = hmac.new(self._key, json.dumps(fields, separators=(",", ":")).encode("utf-8"), hashlib.sha256)
+        mac.update(b"\0" + code)
+        return mac.hexdigest()
+
+    def _verified(self, digest, fields, code=b""):
+        return digest is not None and hmac.compare_digest(self._digest(fields, code), digest)
+
+    def _record(self, row):
+        """Returns the ModuleRecord of a row, or None if the row fails verification."""
+        content_hash, name, source, code, verdicts, metadata, integrated_at, digest = row
+        if hashlib.sha256(source.encode("utf-8")).hexdigest() != content_hash \
+                or not self._verified(digest, [content_hash, name, verdicts, metadata, True], code):
+            logging.warning(f"Stored module '{name}' ({content_hash[:12]}) failed verification; ignoring it.")
+            return None
+        return ModuleRecord(content_hash, name, source, code, json.loads(verdicts), json.loads(metadata), integrated_at)
+
+    def get(self, content_hash):
+        """
+        Returns the record for a source hash.
+
+        Returns:
+            ModuleRecord: The stored module; a record with module_ok False and no code if
+                the source was rejected; None if unknown, built by another Python version,
+                failing verification or if the store has no key.
+        """
+        if not self._key:
+            return None
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT content_hash, name, source, code, verdicts, metadata, integrated_at, digest
+                FROM modules WHERE content_hash = ? AND magic = ? LIMIT 1
+            """, (content_hash, MAGIC_NUMBER)).fetchone()
+            if row:
+                return self._record(row)
+            rejected = self._conn.execute("SELECT rejected_at, digest FROM rejected WHERE content_hash = ?", (content_hash,)).fetchone()
+        if rejected:
+            rejected_at, digest = rejected
+            if self._verified(digest, [content_hash, rejected_at, False]):
+                return ModuleRecord(content_hash, None, None, None, {}, integrated_at=rejected_at, module_ok=False)
+            logging.warning(f"Rejection of {content_hash[:12]} failed verification; ignoring it.")
+        return None
+
+    def put(self, record):
+        """Stores a record, replacing any record under the same module name."""
+        if not self._key:
+            return
+        verdicts = json.dumps(record.verdicts, sort_keys=True)
+        metadata = json.dumps(record.metadata, sort_keys=True, default=str)
+        digest = self._digest([record.content_hash, record.name, verdicts, metadata, True], record.code)
+        with self._lock:
+            self._conn.execute("DELETE FROM modules WHERE name = ?", (record.name,))
+            self._conn.execute("""
+                INSERT INTO modules
+                    (content_hash, name, source, magic, code, verdicts, metadata, integrated_at, digest)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (record.content_hash, record.name, record.source, MAGIC_NUMBER, record.code,
+                  verdicts, metadata, record.integrated_at, digest))
+            self._conn.commit()
+
+    def reject(self, content_hash):
+        """Remembers that a source failed the module-level law checks."""
+        if not self._key:
+            return
+        rejected_at = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO rejected (content_hash, rejected_at, digest) VALUES (?, ?, ?)",
+                               (content_hash, rejected_at, self._digest([content_hash, rejected_at, False])))
+            self._conn.commit()
+
+    def remove(self, name):
+        """Removes the records of a module name."""
+        with self._lock:
+            self._conn.execute("DELETE FROM modules WHERE name = ?", (name,))
+            self._conn.commit()
+
+    def records(self):
+        """
+        Returns every integrated module, in integration order.
+
+        Records written by another Python version or failing verification are skipped,
+        and none are returned if the store has no key.
+        """
+        if not self._key:
+            return []
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT content_hash, name, source, code, verdicts, metadata, integrated_at, digest
+                FROM modules WHERE magic = ? ORDER BY integrated_at
+            """, (MAGIC_NUMBER,)).fetchall()
+        return [record for record in map(self._record, rows) if record is not None]
+
+    def clear(self):
+        """Removes every record."""
+        with self._lock:
+            self._conn.execute("DELETE FROM modules")
+            self._conn.execute("DELETE FROM rejected")
+            self._conn.commit()
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            self._conn.close()
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    import marshal
+    store = ModuleStore(":memory:", key="example-key")
+    source = "def hello(env, socio):\n    return 'hello'\n"
+    store.put(ModuleRecord(hashlib.sha256(source.encode("utf-8")).hexdigest(), "hello_module", source, marshal.dumps(compile(source, "<dynamic_module>", "exec")),
+                           {"hello": True}))
+    print([(record.name, record.verdicts) for record in store.records()])
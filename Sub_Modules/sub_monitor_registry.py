@@ -0,0 +1,129 @@
+"""
+Sub_monitor_registry Module
+
+This module provides a lazy registry for the environmental and socioeconomic
+monitors. Monitors are discovered from a JSON manifest (monitor_manifest.json)
+instead of being imported eagerly, and each monitor module is only imported the
+first time it is used. A monitor module that is missing or fails to import is
+reported as unavailable instead of breaking every other monitor. Which monitors
+are collected is decided by the EnvironmentSpec (see sub_environment_config.py),
+so monitors a deployment does not enable are never imported.
+
+Classes:
+    MonitorRegistry: Discovers, lazily imports and calls monitors.
+
+Functions:
+    load_monitor_manifest(filepath): Loads the monitor manifest from a JSON file.
+"""
+
+import os
+import json
+import logging
+import importlib
+import threading
+
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "monitor_manifest.json")
+
+def load_monitor_manifest(filepath=MANIFEST_FILE):
+    """
+    Loads the monitor manifest from a JSON file.
+
+    Args:
+        filepath (str, optional): Path to the manifest. Defaults to monitor_manifest.json
+            next to this module.
+
+    Returns:
+        dict: Monitor name -> entry with "module", "function", "category",
+              "api_key" and "api_key_param".
+              Returns an empty dict on error.
+    """
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.error(f"Monitor manifest file not found: {filepath}")
+        return {}
+    except json.JSONDecodeError:
+        logging.error(f"Invalid JSON in monitor manifest file: {filepath}")
+        return {}
+
+class MonitorRegistry:
+    """
+    Discovers monitors from a manifest and imports each one lazily on first use.
+
+    Attributes:
+        manifest (dict): Monitor name -> manifest entry.
+    """
+
+    def __init__(self, manifest=None):
+        """
+        Initializes the MonitorRegistry.
+
+        Args:
+            manifest (dict, optional): Monitor manifest. Loaded from monitor_manifest.json if None.
+        """
+        self.manifest = manifest if manifest is not None else load_monitor_manifest()
+        self._functions = {}
+        self._unavailable = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Returns the monitor function, importing its module on first use.
+
+        Args:
+            name (str): Monitor name from the manifest.
+
+        Returns:
+            callable: The monitor function, or None if the monitor is unavailable.
+        """
+        func = self._functions.get(name)
+        if func is not None:
+            return func
+        with self._lock:
+            if name in self._functions:
+                return self._functions[name]
+            if name in self._unavailable:
+                return None
+            entry = self.manifest[name]
+            try:
+                module = importlib.import_module(entry["module"])
+                func = getattr(module, entry["function"])
+            except Exception as e:  # A broken monitor must not take the others down with it.
+                logging.error(f"Monitor '{name}' unavailable ({entry['module']}.{entry['function']}): {e}")
+                self._unavailable[name] = str(e)
+                return None
+            self._functions[name] = func
+            return func
+
+    def unavailable(self):
+        """Returns monitor name -> import error for monitors that failed to load."""
+        return dict(self._unavailable)
+
+    def call(self, name, location_input, api_key=None):
+        """
+        Runs a single monitor for a location with an explicit API key.
+
+        Args:
+            name (str): Monitor name.
+            location_input (str): Location passed to the monitor.
+            api_key (str, optional): API key passed as the monitor's api_key_param.
+
+        Returns:
+            dict: The monitor result, or an alert dict if the monitor is unavailable.
+        """
+        func = self.get(name)
+        if func is None:
+            return {"alert": True, "message": "Monitor unavailable", "details": {}}
+        param = self.manifest[name].get("api_key_param")
+        if param and api_key is not None:
+            return func(location_input, **{param: api_key})
+        return func(location_input)
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    registry = MonitorRegistry()
+    for name in ["deforestation", "erosion", "crime"]:
+        print(name, registry.call(name, "London"))
+    print(registry.unavailable())
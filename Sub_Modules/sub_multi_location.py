@@ -0,0 +1,294 @@
+"""
+Sub_multi_location Module
+
+This module collects environmental and socioeconomic data for many locations at once.
+Instead of creating one Environment per site and running every monitor serially for
+each, MultiLocationCollector plans the upstream calls for the whole fleet first:
+
+    * identical calls are made only once (the same site listed twice, or several sites
+      in one region for monitors whose spec has scope "region", such as regional
+      weather feeds);
+    * the remaining calls run on a shared worker pool with the per-monitor timeouts
+      from the environment spec, counted from when each call starts rather than from
+      when it is queued. Calls still queued when the pool has made no progress for the
+      longest monitor timeout (e.g. every worker stuck on a hung upstream) are
+      cancelled and reported as timed out.
+
+The result is a LocationMatrix: a columnar (locations x metrics) view whose rows can
+be fed straight into sub_environmental_analysis.analyze_environmental_data.
+
+Classes:
+    LocationMatrix: Columnar result of a multi-location collection.
+    MultiLocationCollector: Collects monitor data for a list of locations.
+
+Functions:
+    flatten_monitor_result(result): Lifts a monitor's "details" to the top level.
+"""
+
+import math
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from sub_monitor_registry import MonitorRegistry
+from sub_environment_config import get_environment_spec
+
+REGION_GRID_DEGREES = 0.5
+
+def flatten_monitor_result(result):
+    """
+    Lifts a monitor's "details" to the top level of its result.
+
+    Monitors report measurements under "details", while the analysis engine reads them
+    from the top level (e.g. environmental_data['radiation']['radiation_level']).
+
+    Args:
+        result (dict): A monitor result.
+
+    Returns:
+        dict: The result with its details merged in (details win on conflicts).
+    """
+    if not isinstance(result, dict):
+        return {}
+    flat = {key: value for key, value in result.items() if key != "details"}
+    details = result.get("details")
+    if isinstance(details, dict):
+        flat.update(details)
+    return flat
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class LocationMatrix:
+    """
+    Columnar result of a multi-location collection.
+
+    Attributes:
+        locations (list): Location names, one per row.
+        metrics (list): Metric names of the form "monitor.field", one per column.
+        columns (dict): Metric -> list of floats, one per location (NaN when missing).
+        alerts (dict): Monitor -> list of bools, one per location.
+        results (dict): Monitor -> list of raw monitor results, one per location.
+        categories (dict): Monitor -> "environmental" or "socioeconomic".
+    """
+
+    def __init__(self, locations, results, categories):
+        """
+        Builds the columns from raw results.
+
+        Args:
+            locations (list): Location names.
+            results (dict): Monitor -> list of raw results aligned with locations.
+            categories (dict): Monitor -> category.
+        """
+        self.locations = list(locations)
+        self.results = results
+        self.categories = categories
+        self.alerts = {}
+        self.columns = {}
+        nan = float("nan")
+        for monitor, rows in results.items():
+            self.alerts[monitor] = [bool(isinstance(row, dict) and row.get("alert")) for row in rows]
+            flat_rows = [flatten_monitor_result(row) for row in rows]
+            fields = []
+            for flat in flat_rows:
+                for field, value in flat.items():
+                    if _is_number(value) and field not in fields:
+                        fields.append(field)
+            for field in fields:
+                self.columns[f"{monitor}.{field}"] = [float(flat[field]) if _is_number(flat.get(field)) else nan
+                                                       for flat in flat_rows]
+        self.metrics = list(self.columns)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def column(self, metric):
+        """Returns the values of one metric for every location."""
+        return self.columns[metric]
+
+    def row(self, index):
+        """Returns metric -> value for one location, skipping missing values."""
+        return {metric: values[index] for metric, values in self.columns.items() if not math.isnan(values[index])}
+
+    def location_data(self, index, category="environmental"):
+        """
+        Returns monitor -> flattened result for one location and category, in the shape
+        the analysis engine expects.
+        """
+        return {monitor: flatten_monitor_result(rows[index]) for monitor, rows in self.results.items()
+                if self.categories.get(monitor) == category}
+
+    def analyze(self):
+        """
+        Runs the environmental analysis engine over every location.
+
+        Returns:
+            dict: Location -> analysis result.
+        """
+        from sub_environmental_analysis import analyze_environmental_data
+        return {location: analyze_environmental_data(self.location_data(index))
+                for index, location in enumerate(self.locations)}
+
+class MultiLocationCollector:
+    """
+    Collects monitor data for a list of locations, sharing upstream calls between sites.
+
+    Attributes:
+        spec (EnvironmentSpec): Monitor spec shared by every location.
+        registry (MonitorRegistry): Registry used to import the monitors.
+        region_of (callable): Maps a location entry to its region key.
+    """
+
+    def __init__(self, spec=None, registry=None, region_of=None, enabled_monitors=None):
+        """
+        Initializes the MultiLocationCollector.
+
+        Args:
+            spec (EnvironmentSpec, optional): Monitor spec. The process-wide spec if None.
+            registry (MonitorRegistry, optional): Monitor registry.
+            region_of (callable, optional): Maps a location entry to a region key. Defaults
+                to the entry's "region", else its coordinates snapped to a
+                REGION_GRID_DEGREES grid, else the location name itself.
+            enabled_monitors (iterable, optional): Only collect these monitors.
+        """
+        spec = spec if spec is not None else get_environment_spec()
+        self.spec = spec.with_enabled(enabled_monitors) if enabled_monitors is not None else spec
+        self.registry = registry if registry is not None else MonitorRegistry()
+        self.region_of = region_of or self._default_region
+        self._executor = ThreadPoolExecutor(max_workers=self.spec.max_workers, thread_name_prefix="multi-location")
+
+    @staticmethod
+    def _location_name(location):
+        if isinstance(location, dict):
+            return location.get("name") or location.get("address") or f"{location.get('latitude')},{location.get('longitude')}"
+        return location
+
+    @staticmethod
+    def _default_region(location):
+        if isinstance(location, dict):
+            if location.get("region"):
+                return location["region"]
+            lat, lng = location.get("latitude"), location.get("longitude")
+            if lat is not None and lng is not None:
+                return (round(lat / REGION_GRID_DEGREES) * REGION_GRID_DEGREES,
+                        round(lng / REGION_GRID_DEGREES) * REGION_GRID_DEGREES)
+        return MultiLocationCollector._location_name(location)
+
+    def _plan(self, monitor, locations):
+        """
+        Groups locations into unique upstream calls for one monitor.
+
+        Returns:
+            dict: Call target (location passed to the monitor) -> list of row indexes.
+        """
+        calls = {}
+        representative = {}
+        for index, location in enumerate(locations):
+            name = self._location_name(location)
+            key = self.region_of(location) if monitor.scope == "region" else name
+            if key not in representative:
+                representative[key] = name
+            calls.setdefault(representative[key], []).append(index)
+        return calls
+
+    def _call(self, monitor, target, started):
+        started[(monitor.name, target)] = time.monotonic()
+        try:
+            return self.registry.call(monitor.name, target, monitor.api_key)
+        except Exception as e:
+            logging.error(f"Monitor '{monitor.name}' failed for {target}: {e}")
+            return {"alert": True, "message": f"Monitor error: {e}", "details": {}}
+
+    def collect(self, locations, categories=("environmental", "socioeconomic")):
+        """
+        Collects every enabled monitor for every location.
+
+        Args:
+            locations (list): Location names, or dicts with "name" and optionally "region",
+                "latitude" and "longitude".
+            categories (tuple, optional): Monitor categories to collect.
+
+        Returns:
+            LocationMatrix: The columnar result.
+        """
+        locations = list(locations)
+        monitors = [monitor for category in categories for monitor in self.spec.enabled(category)]
+        plans = {monitor.name: self._plan(monitor, locations) for monitor in monitors}
+
+        started = {}
+        calls = {}
+        for monitor in monitors:
+            for target in plans[monitor.name]:
+                calls[self._executor.submit(self._call, monitor, target, started)] = (monitor, target)
+
+        answers = {monitor.name: {} for monitor in monitors}
+        stall_limit = max((monitor.timeout for monitor in monitors), default=0)
+        last_progress = time.monotonic()
+        pending = set(calls)
+        while pending:
+            now = time.monotonic()
+            last_progress = max([last_progress] + list(started.values()))
+            deadlines, queued = [], []
+            for future in list(pending):
+                monitor, target = calls[future]
+                start = started.get((monitor.name, target))
+                if future.done():
+                    continue
+                if start is None:
+                    queued.append(future)
+                elif now >= start + monitor.timeout:
+                    logging.error(f"Monitor '{monitor.name}' timed out after {monitor.timeout}s for {target}.")
+                    future.cancel()
+                    pending.discard(future)
+                else:
+                    deadlines.append(start + monitor.timeout)
+            if queued and now >= last_progress + stall_limit:
+                logging.error(f"No monitor call finished or started for {stall_limit}s; cancelling {len(queued)} queued calls.")
+                for future in queued:
+                    future.cancel()
+                    pending.discard(future)
+                queued = []
+            if queued:
+                deadlines.append(last_progress + stall_limit)
+            if not pending:
+                break
+            done, _ = wait(pending, timeout=max(0.0, min(deadlines) - now) if deadlines else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                monitor, target = calls[future]
+                answers[monitor.name][target] = future.result()
+                pending.discard(future)
+                last_progress = time.monotonic()
+
+        timed_out = {"alert": True, "message": "Monitor timed out", "details": {}}
+        results = {}
+        for monitor in monitors:
+            rows = [None] * len(locations)
+            for target, indexes in plans[monitor.name].items():
+                answer = answers[monitor.name].get(target)
+                if answer is None:
+                    answer = timed_out
+                for index in indexes:
+                    rows[index] = answer
+            results[monitor.name] = rows
+
+        unique_calls = sum(len(plan) for plan in plans.values())
+        logging.info(f"Collected {len(monitors)} monitors for {len(locations)} locations with {unique_calls} upstream calls "
+                     f"(instead of {len(monitors) * len(locations)}).")
+        return LocationMatrix([self._location_name(location) for location in locations], results,
+                              {monitor.name: monitor.category for monitor in monitors})
+
+    def close(self):
+        """Shuts down the worker pool."""
+        self._executor.shutdown(wait=False)
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    collector = MultiLocationCollector(enabled_monitors=["deforestation", "erosion", "urban_sprawl"])
+    matrix = collector.collect(["London", "Paris", {"name": "London Docks", "region": "London"}])
+    print(matrix.metrics)
+    print(matrix.column("deforestation.level"))
+    print(matrix.analyze())
+    collector.close()
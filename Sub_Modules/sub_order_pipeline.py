@@ -0,0 +1,442 @@
+"""
+Sub_order_pipeline Module
+
+This module provides a staged, concurrent order-processing pipeline. Orders enter
+through a bounded ingress queue and flow through a sequence of stages (for the
+primary directives: normalize -> snapshot -> law evaluation -> execution -> audit).
+
+    * Each stage has its own workers, and each worker its own bounded queue, so a slow
+      stage applies back-pressure to the ones before it instead of growing memory.
+    * Orders submitted with a key are always routed to the same worker of every
+      stage, so orders sharing a key are processed in submission order. While one
+      of them is parked, later orders with its key are held back (without occupying
+      a worker) and continue once no order with the key is parked. Orders without a
+      key go to the least loaded worker.
+    * I/O stages scale with their number of worker threads. A CPU stage can be given a
+      process pool, in which case its workers hand each order to a worker process (the
+      stage function and the order must then be picklable).
+
+A stage may finish an order early (e.g. a law violation) by setting order.finished;
+the remaining stages are skipped except those marked always (e.g. audit). A stage may
+also park an order (order.park(), e.g. while it awaits approval): the order leaves its
+worker, which goes on with other orders, and continues with the next stage once
+resume(order.id) is called; an order parked with order.park(rerun=True) runs the same
+stage again instead (e.g. to continue its checks after an approval). Parked and held
+orders count as in flight. An exception
+in a stage finishes the order with order.error set. A stage that raises SystemExit
+(the shutdown path) halts the pipeline: on_halt is called (e.g. to kill running
+commands), no new orders are accepted, and the SystemExit is raised again on the
+caller's thread by submit() and join().
+
+Classes:
+    Order: One order travelling through the pipeline.
+    Stage: One pipeline stage.
+    OrderPipeline: The staged pipeline.
+"""
+
+import time
+import zlib
+import queue
+import logging
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_STOP = object()
+
+class Order:
+    """
+    One order travelling through the pipeline. Stages read and set its attributes.
+
+    Attributes:
+        id (int): Order id, assigned by the pipeline.
+        order (str): The order as submitted.
+        key (str): Ordering key, or None.
+        location (str): Location the order applies to, or None.
+        adjusted_order (str): The order after normalization.
+        snapshot (EnvironmentalSnapshot): Data snapshot with precomputed risk flags.
+        environmental_data (dict): Environmental snapshot.
+        socioeconomic_data (dict): Socioeconomic snapshot.
+        verdict (str): Outcome of the law evaluation.
+        result (object): Result of execution.
+        error (str): Error that stopped the order, or None.
+        finished (bool): True once no further (non-always) stage should run.
+        parked (bool): True while the order waits outside the pipeline (see OrderPipeline.resume).
+        rerun (bool): True if the parking stage runs again when the order is resumed.
+        metadata (dict): Free-form data shared between stages.
+    """
+
+    __slots__ = ("id", "order", "key", "location", "adjusted_order", "snapshot", "environmental_data", "socioeconomic_data",
+                 "verdict", "result", "error", "finished", "parked", "rerun", "metadata", "_done")
+
+    def __init__(self, id, order, key=None, location=None, metadata=None):
+        self.id = id
+        self.order = order
+        self.key = key
+        self.location = location
+        self.adjusted_order = order
+        self.snapshot = None
+        self.environmental_data = None
+        self.socioeconomic_data = None
+        self.verdict = None
+        self.result = None
+        self.error = None
+        self.finished = False
+        self.parked = False
+        self.rerun = False
+        self.metadata = metadata or {}
+        self._done = threading.Event()
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "_done"}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._done = threading.Event()
+
+    def update(self, other):
+        """Copies the state of another Order (e.g. one returned by a worker process)."""
+        for slot, value in other.__getstate__().items():
+            setattr(self, slot, value)
+
+    def park(self, rerun=False):
+        """
+        Takes the order out of the pipeline after the current stage until it is resumed.
+
+        Args:
+            rerun (bool, optional): Run the current stage again on resume, rather than
+                the next one. Defaults to False.
+        """
+        self.parked = True
+        self.rerun = rerun
+
+    def wait(self, timeout=None):
+        """
+        Waits until the order has passed through every stage.
+
+        Returns:
+            bool: True if the order completed within the timeout.
+        """
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        """True once the order has passed through every stage."""
+        return self._done.is_set()
+
+    def __repr__(self):
+        return f"Order({self.id}, {self.order!r}, verdict={self.verdict!r}, error={self.error!r})"
+
+class Stage:
+    """
+    One pipeline stage.
+
+    Attributes:
+        name (str): Stage name.
+        func (function): Called with an Order; may modify it in place or return a new Order.
+        workers (int): Number of worker threads (shards).
+        queue_size (int): Capacity of each worker's queue.
+        processes (int): Size of the process pool for a CPU stage, or 0 for threads only.
+        always (bool): Run even for orders already finished (e.g. audit).
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=100, processes=0, always=False):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.processes = processes
+        self.always = always
+
+class OrderPipeline:
+    """
+    Staged, concurrent order-processing pipeline.
+
+    Attributes:
+        stages (list): The Stage objects, in order.
+        halted (bool): True once a stage requested shutdown; no new orders are accepted.
+        halt_reason (SystemExit): The SystemExit that halted the pipeline, or None.
+    """
+
+    def __init__(self, stages, on_complete=None, on_halt=None, early_resume_ttl=300):
+        """
+        Starts the workers of every stage.
+
+        Args:
+            stages (list): Stage objects, in processing order.
+            on_complete (function, optional): Called with each Order once it has passed
+                through every stage.
+            on_halt (function, optional): Called with the SystemExit when a stage
+                requests shutdown.
+            early_resume_ttl (float, optional): Seconds a resume() for an order that is
+                not parked (yet) is kept for it. Defaults to 300.
+        """
+        self.stages = list(stages)
+        self.on_complete = on_complete
+        self.on_halt = on_halt
+        self.early_resume_ttl = early_resume_ttl
+        self.halted = False
+        self.halt_reason = None
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._in_flight = 0
+        self._idle = threading.Condition()
+        self._parked = {}
+        self._parked_keys = {}
+        self._held = {}
+        self._resumed_early = {}
+        self._park_lock = threading.Lock()
+        self._queues = []
+        self._threads = []
+        self._pools = []
+        for index, stage in enumerate(self.stages):
+            pool = ProcessPoolExecutor(stage.processes) if stage.processes else None
+            if pool is not None:
+                self._pools.append(pool)
+            queues = [queue.Queue(maxsize=stage.queue_size) for _ in range(stage.workers)]
+            self._queues.append(queues)
+            for shard, stage_queue in enumerate(queues):
+                thread = threading.Thread(target=self._work, args=(index, stage_queue, pool),
+                                          name=f"{stage.name}-{shard}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _route(self, index, order, block=True, timeout=None):
+        queues = self._queues[index]
+        if order.key is not None:
+            stage_queue = queues[zlib.crc32(str(order.key).encode("utf-8")) % len(queues)]
+        else:
+            stage_queue = min(queues, key=queue.Queue.qsize)
+        stage_queue.put(order, block, timeout)
+
+    def _complete(self, order):
+        order._done.set()
+        if self.on_complete is not None:
+            try:
+                self.on_complete(order)
+            except Exception as e:
+                logging.error(f"Error in order completion callback for order {order.id}: {e}")
+        with self._idle:
+            self._in_flight -= 1
+            self._idle.notify_all()
+
+    def _work(self, index, stage_queue, pool):
+        stage = self.stages[index]
+        while True:
+            order = stage_queue.get()
+            if order is _STOP:
+                return
+            if order.key is not None and self._hold(index, order):
+                continue
+            if self.halted and not order.finished:
+                order.error = "Pipeline halted"
+                order.finished = True
+            if not order.finished or stage.always:
+                try:
+                    if pool is not None:
+                        result = pool.submit(stage.func, order).result()
+                    else:
+                        result = stage.func(order)
+                    if isinstance(result, Order) and result is not order:
+                        order.update(result)
+                except SystemExit as e:
+                    logging.critical(f"Stage '{stage.name}' requested shutdown while processing order {order.id}; halting pipeline.")
+                    order.error = f"Shutdown: {e}"
+                    order.finished = True
+                    self._halt(e)
+                except Exception as e:
+                    logging.error(f"Stage '{stage.name}' failed for order {order.id}: {e}")
+                    order.error = f"{stage.name}: {e}"
+                    order.finished = True
+            # A rerun continues as if the previous stage had just passed the order on.
+            resume_index = index - 1 if order.parked and order.rerun else index
+            if order.parked and self._park(resume_index, order):
+                continue
+            self._advance(resume_index, order)
+
+    def _halt(self, reason):
+        with self._idle:
+            first = not self.halted
+            self.halted = True
+            self.halt_reason = self.halt_reason or reason
+            self._idle.notify_all()
+        if first and self.on_halt is not None:
+            try:
+                self.on_halt(reason)
+            except Exception as e:
+                logging.error(f"Error in pipeline halt callback: {e}")
+
+    def _raise_if_halted(self):
+        """Raises the SystemExit that halted the pipeline on the caller's thread."""
+        if self.halted:
+            raise self.halt_reason
+
+    def _advance(self, index, order):
+        """Sends an order that has passed stage index on to the next stage, or completes it."""
+        if index + 1 < len(self.stages):
+            self._route(index + 1, order)
+        else:
+            self._complete(order)
+
+    def _hold(self, index, order):
+        """Holds an order back from stage index while an order with its key is parked."""
+        with self._park_lock:
+            if not self._parked_keys.get(order.key):
+                return False
+            self._held.setdefault(order.key, []).append((index, order))
+            return True
+
+    def _expire_early_resumes(self):
+        """Drops resumes for orders that never parked (e.g. ids from before a restart)."""
+        expired = time.monotonic() - self.early_resume_ttl
+        for order_id in [order_id for order_id, (at, _) in self._resumed_early.items() if at < expired]:
+            logging.warning(f"Dropping resume of order {order_id}: it was never parked.")
+            del self._resumed_early[order_id]
+
+    def _park(self, index, order):
+        """Parks an order after stage index. Returns False if it was already resumed."""
+        with self._park_lock:
+            if order.id in self._resumed_early:
+                order.parked = order.rerun = False
+                order.metadata.update(self._resumed_early.pop(order.id)[1])
+                return False
+            self._parked[order.id] = (index, order)
+            if order.key is not None:
+                self._parked_keys[order.key] = self._parked_keys.get(order.key, 0) + 1
+            return True
+
+    def resume(self, order_id, **metadata):
+        """
+        Continues a parked order with its next stage (or the same stage, if it was
+        parked with rerun=True).
+
+        May be called before the stage that parks the order has returned; the order then
+        continues as soon as it is parked (if that happens within early_resume_ttl).
+
+        Args:
+            order_id (int): Id of the parked order.
+            **metadata: Stored in order.metadata (e.g. approval=...).
+        """
+        with self._park_lock:
+            self._expire_early_resumes()
+            entry = self._parked.pop(order_id, None)
+            if entry is None:
+                self._resumed_early[order_id] = (time.monotonic(), metadata)
+                return
+            index, order = entry
+            held = []
+            if order.key is not None:
+                self._parked_keys[order.key] -= 1
+                if not self._parked_keys[order.key]:
+                    del self._parked_keys[order.key]
+                    held = self._held.pop(order.key, [])
+        order.parked = order.rerun = False
+        order.metadata.update(metadata)
+        self._advance(index, order)
+        # Released after the resumed order, so none of them overtakes it.
+        for held_index, held_order in held:
+            self._route(held_index, held_order)
+
+    def parked(self):
+        """Returns the ids of the parked orders."""
+        with self._park_lock:
+            return list(self._parked)
+
+    def submit(self, order, key=None, location=None, metadata=None, block=True, timeout=None):
+        """
+        Queues an order.
+
+        Args:
+            order (str): The order.
+            key (str, optional): Ordering key; orders with the same key are processed in
+                submission order.
+            location (str, optional): Location the order applies to.
+            metadata (dict, optional): Free-form data for the stages.
+            block (bool, optional): Wait for room in the ingress queue. Defaults to True.
+            timeout (float, optional): Seconds to wait for room.
+
+        Returns:
+            Order: The queued order; wait() on it for the outcome.
+
+        Raises:
+            SystemExit: If a stage requested shutdown.
+            RuntimeError: If the pipeline is closed.
+            queue.Full: If the ingress queue stays full.
+        """
+        self._raise_if_halted()
+        if self._closed:
+            raise RuntimeError("Order pipeline is not accepting orders.")
+        ticket = Order(next(self._ids), order, key, location, metadata)
+        with self._idle:
+            self._in_flight += 1
+        try:
+            self._route(0, ticket, block, timeout)
+        except queue.Full:
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
+            raise
+        return ticket
+
+    def join(self, timeout=None):
+        """
+        Waits until every submitted order has completed.
+
+        Returns:
+            bool: True if the pipeline drained within the timeout.
+
+        Raises:
+            SystemExit: If a stage requested shutdown (before or while waiting).
+        """
+        with self._idle:
+            drained = self._idle.wait_for(lambda: self._in_flight == 0 or self.halted, timeout)
+        self._raise_if_halted()
+        return drained
+
+    def pending(self):
+        """Returns the number of orders submitted but not yet completed."""
+        with self._idle:
+            return self._in_flight
+
+    def close(self, drain=True):
+        """
+        Stops accepting orders and stops the workers.
+
+        Args:
+            drain (bool, optional): Wait for queued orders to complete first. Defaults to True.
+        """
+        self._closed = True
+        if drain and not self.halted:
+            self.join()
+        for queues in self._queues:
+            for stage_queue in queues:
+                stage_queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=1)
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+
+    def normalize(order):
+        order.adjusted_order = order.order.strip().lower()
+
+    def evaluate(order):
+        if "forbidden" in order.adjusted_order:
+            order.verdict = "denied"
+            order.finished = True
+        else:
+            order.verdict = "allowed"
+
+    def audit(order):
+        print(f"Audit: {order}")
+
+    pipeline = OrderPipeline([Stage("normalize", normalize), Stage("evaluate", evaluate, workers=4),
+                              Stage("audit", audit, always=True)])
+    tickets = [pipeline.submit(text, key="operator-1") for text in ["  Status Report", "Forbidden Action", "Move North"]]
+    for ticket in tickets:
+        ticket.wait()
+    pipeline.close()
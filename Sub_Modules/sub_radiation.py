@@ -1,74 +1,180 @@
 # --- sub_radiation.py ---
+"""
+This module assesses radiation readings and returns graded warnings and PPE suggestions.
+
+Readings are graded with the compiled radiation levels table from radiation_config
+(sorted threshold array searched with bisect, or numpy.searchsorted for batches, and
+precomputed (level, radiation type) -> (warning, PPE) pairs), so assessing a reading
+does no string formatting or dictionary scanning. A reading is graded at the highest
+level whose threshold it exceeds. The table is fetched per call without locking, so a
+reload by RadiationConfigWatcher takes effect on the next reading.
+
+Thresholds are dose rates in Sv/h; monitors report µSv/h, which callers convert with
+SV_PER_MICROSIEVERT. Readings at or above ALERT_LEVEL are reported to the authorities by a background
+AlertDispatcher, which drops repeats of the same (location, radiation type, level)
+within its dedupe window, so assessing a reading never waits on alert delivery.
+"""
+
+import time
+import queue
 import logging
-import datetime
-import os
-import random
-from enum import Enum
-import json
-RADIATION_LEVELS = load_radiation_levels()
-if RADIATION_LEVELS is None:
-    # Default radiation levels if loading fails
-    RADIATION_LEVELS = {
-        "background_threshold": 0.0000001,
-        "background_warning": "Normal background radiation.",
-        "alpha_background_ppe": "No PPE required.",
-        "beta_background_ppe": "No PPE required.",
-        "gamma_background_ppe": "No PPE required.",
-        "neutron_background_ppe": "No PPE required.",
-        "x-ray_background_ppe": "No PPE required.",
-        "elevated_threshold": 0.000001,
-        "elevated_warning": "Slightly elevated radiation detected. Note: Monitor exposure time.",
-        "alpha_elevated_ppe": "Monitor exposure time.",
-        "beta_elevated_ppe": "Monitor exposure time.",
-        "gamma_elevated_ppe": "Monitor exposure time.",
-        "neutron_elevated_ppe": "Monitor exposure time.",
-        "x-ray_elevated_ppe": "Monitor exposure time.",
-        "low_threshold": 0.001,
-        "low_warning": "Low-level radiation detected. Note: Limit exposure time, basic shielding if prolonged.",
-        "alpha_low_ppe": "Basic shielding (paper, clothing).",
-        "beta_low_ppe": "Basic shielding (thick plastic, aluminum).",
-        "gamma_low_ppe": "Lead shielding, limit exposure.",
-        "neutron_low_ppe": "Concrete, water shielding.",
-        "x-ray_low_ppe": "Lead shielding, limit exposure.",
-        "moderate_threshold": 0.01,
-        "moderate_warning": "Moderate radiation detected. Note: Use lead apron, limit exposure.",
-        "alpha_moderate_ppe": "Lead apron, limit exposure.",
-        "beta_moderate_ppe": "Lead apron, limit exposure.",
-        "gamma_moderate_ppe": "Thick lead shielding, limit exposure.",
-        "neutron_moderate_ppe": "Specialized neutron shielding, limit exposure.",
-        "x-ray_moderate_ppe": "Thick lead shielding, limit exposure.",
-        "high_threshold": 0.1,
-        "high_warning": "High radiation detected. Note: Use full body radiation suit, potassium iodide, limit exposure.",
-        "alpha_high_ppe": "Full body radiation suit, limit exposure.",
-        "beta_high_ppe": "Full body radiation suit, limit exposure.",
-        "gamma_high_ppe": "Full body radiation suit, potassium iodide, limit exposure.",
-        "neutron_high_ppe": "Full body neutron suit, limit exposure.",
-        "x-ray_high_ppe": "Full body radiation suit, potassium iodide, limit exposure.",
-        "very_high_threshold": 1,
-        "very_high_warning": "Very high radiation detected. Note: Use full body radiation suit, potassium iodide, immediate evacuation recommended.",
-        "alpha_very_high_ppe": "Full body radiation suit, immediate evacuation.",
-        "beta_very_high_ppe": "Full body radiation suit, immediate evacuation.",
-        "gamma_very_high_ppe": "Full body radiation suit, potassium iodide, immediate evacuation.",
-        "neutron_very_high_ppe": "Full body neutron suit, immediate evacuation.",
-        "x-ray_very_high_ppe": "Full body radiation suit, potassium iodide, immediate evacuation.",
-        "lethal_threshold": 5,
-        "lethal_warning": "Lethal radiation detected. Note: Immediate evacuation, maximum shielding, survival unlikely.",
-        "alpha_lethal_ppe": "Maximum shielding, immediate evacuation.",
-        "beta_lethal_ppe": "Maximum shielding, immediate evacuation.",
-        "gamma_lethal_ppe": "Maximum shielding, potassium iodide, immediate evacuation.",
-        "neutron_lethal_ppe": "Maximum neutron shielding, immediate evacuation.",
-        "x-ray_lethal_ppe": "Maximum shielding, potassium iodide, immediate evacuation."
-    }
+import threading
+
+from radiation_config import RadiationLevel, get_radiation_table, normalize_radiation_type
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Readings graded at this level or above are reported to the authorities.
+ALERT_LEVEL = RadiationLevel.MODERATE
+
+# Monitors report dose rates in µSv/h; the radiation levels table is in Sv/h.
+SV_PER_MICROSIEVERT = 1e-6
+
+def alert_authorities(radiation_level, radiation_type, location, level):
+    """Reports a radiation reading to the authorities (simulated by logging)."""
+    logging.critical(f"ALERT: {level.value} radiation ({radiation_type}) at {location}: {radiation_level}")
+
+class AlertDispatcher:
+    """
+    Delivers radiation alerts on a background thread.
+
+    An alert repeating the (location, radiation type, level) of one sent within the
+    dedupe window is dropped; an escalation to a higher level is always sent.
+
+    Attributes:
+        handlers (list): handler(radiation_level, radiation_type, location, level) functions.
+        dedupe_window (float): Seconds during which repeats are dropped.
+    """
+
+    def __init__(self, handlers=None, dedupe_window=300, max_queue_size=10000):
+        self.handlers = list(handlers) if handlers is not None else [alert_authorities]
+        self.dedupe_window = dedupe_window
+        self._last_sent = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+
+    def _ensure_worker(self):
+        # The worker starts with the first alert so importing this module spawns no thread.
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="radiation-alerts", daemon=True)
+                self._thread.start()
+
+    def submit(self, radiation_level, radiation_type, location, level):
+        """
+        Queues an alert unless it duplicates a recent one. Never blocks.
+
+        Returns:
+            bool: True if the alert was queued.
+        """
+        key = (location, radiation_type, level)
+        now = time.monotonic()
+        with self._lock:
+            sent_at = self._last_sent.get(key)
+            if sent_at is not None and now - sent_at < self.dedupe_window:
+                return False
+            self._last_sent[key] = now
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((radiation_level, radiation_type, location, level))
+        except queue.Full:
+            logging.error(f"Radiation alert queue full; dropping alert for {location}.")
+            return False
+        return True
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                for handler in self.handlers:
+                    try:
+                        handler(*item)
+                    except Exception as e:
+                        logging.error(f"Error dispatching radiation alert: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Waits until every queued alert has been delivered."""
+        self._queue.join()
+
+    def stop(self):
+        """Delivers the queued alerts and stops the worker."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+alert_dispatcher = AlertDispatcher()
+
+def _alert(table, index, radiation_level, radiation_type, location):
+    if index >= table.rank(ALERT_LEVEL):
+        alert_dispatcher.submit(radiation_level, radiation_type, location, table.levels[index])
+
+def classify_radiation(radiation_level, radiation_type="gamma", location="Unknown"):
+    """
+    Grades a reading like assess_radiation, also returning its level.
+
+    Returns:
+        tuple: (RadiationLevel, warning, PPE suggestion), or (None, None, None) if
+            radiation_level is None.
+
+    Raises:
+        ValueError: If the radiation type is unknown.
+    """
+    if radiation_level is None:
+        return None, None, None
+    radiation_type = normalize_radiation_type(radiation_type)
+    table = get_radiation_table()
+    index = table.level_index(radiation_level)
+    _alert(table, index, radiation_level, radiation_type, location)
+    return table.levels[index], table.warnings[index], table.ppe[radiation_type][index]
 
 def assess_radiation(radiation_level, radiation_type="gamma", location="Unknown"):
     """
     Assesses radiation levels and returns warnings and PPE suggestions based on graded exposure.
-    Also alerts authorities if a spike is detected.
+    Also alerts authorities (asynchronously) if the reading is at or above ALERT_LEVEL.
+
+    Args:
+        radiation_level (float): Dose-rate reading.
+        radiation_type (str, optional): Radiation type. Defaults to "gamma".
+        location (str, optional): Location of the reading. Defaults to "Unknown".
+
+    Returns:
+        tuple: (warning, PPE suggestion), or (None, None) if radiation_level is None.
+
+    Raises:
+        ValueError: If the radiation type is unknown.
+    """
+    return classify_radiation(radiation_level, radiation_type, location)[1:]
+
+def assess_radiation_many(radiation_levels, radiation_type="gamma", location="Unknown"):
     """
-    if radiation_level is not None:
-        for level in RadiationLevel:
-            if radiation_level > RADIATION_LEVELS[f"{level.value}_threshold"]:
-                alert_authorities(radiation_level, radiation_type, location)
-                return RADIATION_LEVELS[f"{level.value}_warning"], RADIATION_LEVELS[f"{radiation_type}_{level.value}_ppe"]
-        return RADIATION_LEVELS["background_warning"], RADIATION_LEVELS[f"{radiation_type}_background_ppe"]
-    return None, None
+    Assesses many readings of one radiation type in one call.
+
+    Args:
+        radiation_levels (sequence): Dose-rate readings.
+        radiation_type (str, optional): Radiation type. Defaults to "gamma".
+        location (str, optional): Location of the readings. Defaults to "Unknown".
+
+    Returns:
+        list: (warning, PPE suggestion) per reading.
+    """
+    radiation_type = normalize_radiation_type(radiation_type)
+    table = get_radiation_table()
+    indexes = table.level_indexes(radiation_levels)
+    ppe = table.ppe[radiation_type]
+    if indexes:
+        peak = max(range(len(indexes)), key=indexes.__getitem__)
+        _alert(table, indexes[peak], radiation_levels[peak], radiation_type, location)
+    return [(table.warnings[index], ppe[index]) for index in indexes]
+
+if __name__ == "__main__":
+    # Example usage
+    print(assess_radiation(0.05, "Gamma", "London"))
+    print(assess_radiation_many([0.00000005, 0.002, 0.5, 7], "neutron", "London"))
+    alert_dispatcher.flush()
@@ -0,0 +1,266 @@
+"""
+Sub_readings Module
+
+This module provides compact, typed records for monitor readings. Monitors keep their
+numeric fields numeric in result["details"]; labels and units are applied only when a
+reading is displayed, through format_value() and format_details().
+
+For buffering many readings (e.g. between flushes to the time-series store), two
+representations are provided:
+
+    * Reading: one reading as a slotted record; numeric fields are held as floats in a
+      tuple ordered by the monitor's field names, so no per-reading dict is kept.
+    * ReadingBuffer: a struct-of-arrays buffer holding one array('d') column per field
+      (NaN where a reading lacks the field), an array('d') of timestamps and small
+      integer indices into interned monitor and location tables.
+
+Run benchmark_reading_memory.py to compare their footprint with nested dicts.
+
+Classes:
+    Reading: One monitor reading, numeric fields only.
+    ReadingBuffer: Struct-of-arrays buffer of readings.
+
+Functions:
+    format_value(field, value): Formats one numeric field for display.
+    format_details(details): Formats every known field of a details dict for display.
+"""
+
+import math
+import time
+from array import array
+
+_np = None
+
+def _numpy():
+    """Returns the numpy module, imported on first use (it is optional and slow to import), or None."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # NumPy is optional; columns are returned as array.array without it.
+            _np = False
+    return _np or None
+
+# Display label and unit per known field. Formatting happens only at report time.
+FIELD_FORMATS = {
+    "radiation_level": ("Radiation Level", "µSv/h"),
+    "temperature": ("Temperature", "°C"),
+    "humidity": ("Humidity", "%"),
+    "precipitation": ("Precipitation", "mm"),
+    "wind_speed": ("Wind Speed", "m/s"),
+    "uv": ("UV Index", ""),
+    "uv_index": ("UV Index", ""),
+    "decibels": ("Noise Level", "dB"),
+    "illuminance": ("Illuminance", "lux"),
+    "radon_level": ("Radon Level", "pCi/L"),
+    "pollen_count": ("Pollen Count", ""),
+}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def format_value(field, value):
+    """
+    Formats one field for display, e.g. ("decibels", 72) -> "Noise Level: 72 dB".
+
+    Args:
+        field (str): Field name.
+        value: Field value.
+
+    Returns:
+        str: The formatted value. Unknown fields are formatted as "field: value".
+    """
+    label, unit = FIELD_FORMATS.get(field, (field, ""))
+    if _is_number(value) and isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f"{label}: {value} {unit}".rstrip()
+
+def format_details(details):
+    """
+    Formats a details dict for display without modifying it.
+
+    Args:
+        details (dict): A monitor result's "details".
+
+    Returns:
+        dict: Field -> formatted string for numeric fields; other values unchanged.
+    """
+    return {field: format_value(field, value) if _is_number(value) else value
+            for field, value in details.items()}
+
+class Reading:
+    """
+    One monitor reading, holding only its numeric fields.
+
+    Attributes:
+        monitor (str): Monitor name.
+        location (str): Location the reading was taken for.
+        timestamp (float): Seconds since the epoch.
+        alert (bool): Whether the monitor raised an alert.
+        fields (tuple): Field names, shared by readings of the same monitor.
+        values (tuple): Field values as floats, in the order of fields.
+    """
+
+    __slots__ = ("monitor", "location", "timestamp", "alert", "fields", "values")
+
+    _field_tuples = {}
+
+    def __init__(self, monitor, location, timestamp, alert, fields, values):
+        self.monitor = monitor
+        self.location = location
+        self.timestamp = timestamp
+        self.alert = alert
+        self.fields = fields
+        self.values = values
+
+    @classmethod
+    def from_result(cls, monitor, result, location=None, timestamp=None):
+        """
+        Builds a Reading from a monitor result, keeping its numeric fields: those of
+        result["details"] and, for monitors that return flat results, those at the top level.
+
+        Args:
+            monitor (str): Monitor name.
+            result (dict): Monitor result with "alert" and "details".
+            location (str, optional): Location; defaults to result["location"] if it is a string.
+            timestamp (float, optional): Defaults to now.
+
+        Returns:
+            Reading: The reading.
+        """
+        details = dict(result)
+        if isinstance(result.get("details"), dict):
+            details.update(result["details"])
+        numeric = [(field, float(value)) for field, value in details.items() if _is_number(value)]
+        names = tuple(field for field, _ in numeric)
+        # Readings of the same monitor share one tuple of field names.
+        fields = cls._field_tuples.setdefault(names, names)
+        if location is None and isinstance(result.get("location"), str):
+            location = result["location"]
+        return cls(monitor, location, time.time() if timestamp is None else timestamp,
+                   bool(result.get("alert")), fields, tuple(value for _, value in numeric))
+
+    def get(self, field, default=None):
+        """Returns a field's value, or default."""
+        try:
+            return self.values[self.fields.index(field)]
+        except ValueError:
+            return default
+
+    def as_dict(self):
+        """Returns the numeric fields as a dict."""
+        return dict(zip(self.fields, self.values))
+
+    def formatted(self):
+        """Returns the fields formatted for display."""
+        return {field: format_value(field, value) for field, value in zip(self.fields, self.values)}
+
+    def __repr__(self):
+        return f"Reading({self.monitor!r}, {self.location!r}, {self.as_dict()!r})"
+
+class ReadingBuffer:
+    """
+    Struct-of-arrays buffer of readings.
+
+    Attributes:
+        timestamps (array): Timestamp of each reading.
+        alerts (array): 1 if the reading raised an alert, else 0.
+        monitors (list): Interned monitor names.
+        locations (list): Interned locations.
+    """
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.alerts = array("b")
+        self.monitors = []
+        self.locations = []
+        self._monitor_ids = array("H")
+        self._location_ids = array("I")
+        self._columns = {}
+        self._interned = {}
+
+    def _intern(self, table, value):
+        key = (id(table), value)
+        index = self._interned.get(key)
+        if index is None:
+            index = self._interned[key] = len(table)
+            table.append(value)
+        return index
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, monitor, result, location=None, timestamp=None):
+        """
+        Appends a monitor result, keeping its numeric fields (see Reading.from_result).
+
+        Args:
+            monitor (str): Monitor name.
+            result (dict): Monitor result with "alert" and "details".
+            location (str, optional): Location; defaults to result["location"] if it is a string.
+            timestamp (float, optional): Defaults to now.
+        """
+        self.append_reading(Reading.from_result(monitor, result, location, timestamp))
+
+    def append_reading(self, reading):
+        """Appends a Reading."""
+        count = len(self.timestamps)
+        self.timestamps.append(reading.timestamp)
+        self.alerts.append(1 if reading.alert else 0)
+        self._monitor_ids.append(self._intern(self.monitors, reading.monitor))
+        self._location_ids.append(self._intern(self.locations, reading.location))
+        for field, value in zip(reading.fields, reading.values):
+            column = self._columns.get(field)
+            if column is None:
+                column = self._columns[field] = array("d", [math.nan]) * count
+            column.append(value)
+        for field, column in self._columns.items():
+            if len(column) == count:
+                column.append(math.nan)
+
+    def fields(self):
+        """Returns the names of all buffered fields."""
+        return list(self._columns)
+
+    def column(self, field):
+        """
+        Returns one field for every buffered reading (NaN where it is missing).
+
+        Returns:
+            numpy.ndarray or array.array: A copy of the column; a NumPy array when NumPy
+            is installed. (A view would stop the buffer from growing while it is alive.)
+        """
+        column = self._columns.get(field, array("d", [math.nan]) * len(self))
+        np = _numpy()
+        return np.array(column, dtype=np.float64) if np is not None else array("d", column)
+
+    def reading(self, index):
+        """Returns the reading at index as a Reading."""
+        fields, values = [], []
+        for field, column in self._columns.items():
+            if not math.isnan(column[index]):
+                fields.append(field)
+                values.append(column[index])
+        names = tuple(fields)
+        return Reading(self.monitors[self._monitor_ids[index]], self.locations[self._location_ids[index]],
+                       self.timestamps[index], bool(self.alerts[index]),
+                       Reading._field_tuples.setdefault(names, names), tuple(values))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.reading(index)
+
+    def clear(self):
+        """Removes every buffered reading."""
+        self.__init__()
+
+if __name__ == "__main__":
+    # Example usage
+    buffer = ReadingBuffer()
+    buffer.append("noise", {"alert": True, "details": {"decibels": 88, "source": "traffic"}}, "Paris")
+    buffer.append("weather", {"alert": False, "details": {"temperature": 28, "humidity": 65}}, "Paris")
+    print(buffer.column("decibels"))
+    for reading in buffer:
+        print(reading, reading.formatted())
+    print(format_details({"radiation_level": 0.12, "status": "ok"}))
@@ -0,0 +1,156 @@
+"""
+Sub_report_builder Module
+
+This module provides an incremental builder for environmental reports. Instead of
+sending the whole report every cycle, the builder remembers the sections it last sent
+for each location and emits only the sections that changed (a "delta"). Every
+keyframe_interval reports, at least every keyframe_seconds, and whenever a location is
+seen for the first time, a full "keyframe" is sent so receivers can resynchronize. The
+time bound matters for locations that rarely change: a receiver that lost a delta
+(e.g. one the outbox gave up on) would otherwise wait keyframe_interval changes to
+recover. Cycles in which nothing changed and no keyframe is due produce no message.
+
+Reports are split into sections by their top-level keys, and the "data" key is split
+one level further (one section per sensor, e.g. "data.weather"). Sections are compared
+by value, so callers must not mutate a report after passing it to the builder.
+
+Message layout:
+    {"location": ..., "seq": 7, "type": "delta", "base_seq": 6,
+     "sections": {"risks": {...}, "data.noise": {...}}, "removed": ["predictions"]}
+
+Messages are plain dicts; the agency outbox (see sub_agency_outbox.py) serializes them
+into its compressed JSON batches.
+
+Classes:
+    ReportBuilder: Builds keyframe and delta report messages per location.
+
+Functions:
+    split_sections(report): Splits a report into its sections.
+    merge_sections(sections): Rebuilds a report from its sections.
+"""
+
+import time
+import logging
+import threading
+
+SPLIT_KEYS = ("data",)
+
+def split_sections(report):
+    """
+    Splits a report into its sections.
+
+    Args:
+        report (dict): A report.
+
+    Returns:
+        dict: Section name -> value.
+    """
+    sections = {}
+    for key, value in report.items():
+        if key in SPLIT_KEYS and isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                sections[f"{key}.{sub_key}"] = sub_value
+        else:
+            sections[key] = value
+    return sections
+
+def merge_sections(sections):
+    """
+    Rebuilds a report from its sections (the inverse of split_sections).
+
+    Args:
+        sections (dict): Section name -> value.
+
+    Returns:
+        dict: The report.
+    """
+    report = {}
+    for name, value in sections.items():
+        key, _, sub_key = name.partition(".")
+        if sub_key and key in SPLIT_KEYS:
+            report.setdefault(key, {})[sub_key] = value
+        else:
+            report[name] = value
+    return report
+
+class ReportBuilder:
+    """
+    Builds keyframe and delta report messages per location.
+
+    Attributes:
+        keyframe_interval (int): Messages between full keyframes.
+        keyframe_seconds (float): Maximum seconds between full keyframes, or None.
+    """
+
+    def __init__(self, keyframe_interval=20, keyframe_seconds=300):
+        """
+        Initializes the ReportBuilder.
+
+        Args:
+            keyframe_interval (int, optional): Messages between full keyframes. Defaults to 20.
+            keyframe_seconds (float, optional): Maximum seconds between full keyframes, or
+                None for no time bound. Defaults to 300.
+        """
+        self.keyframe_interval = keyframe_interval
+        self.keyframe_seconds = keyframe_seconds
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def build(self, report, location):
+        """
+        Builds the next message for a location.
+
+        Args:
+            report (dict): The full current report.
+            location (str): Location the report is for.
+
+        Returns:
+            dict: A keyframe or delta message, or None if nothing changed.
+        """
+        sections = split_sections(report)
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(location)
+            if (state is None or state["since_keyframe"] + 1 >= self.keyframe_interval
+                    or (self.keyframe_seconds is not None and now - state["keyframe_at"] >= self.keyframe_seconds)):
+                seq = state["seq"] + 1 if state is not None else 1
+                self._state[location] = {"seq": seq, "since_keyframe": 0, "keyframe_at": now, "sections": sections}
+                return {"location": location, "seq": seq, "type": "keyframe", "sections": sections}
+
+            previous = state["sections"]
+            changed = {name: value for name, value in sections.items()
+                       if name not in previous or previous[name] != value}
+            removed = [name for name in previous if name not in sections]
+            if not changed and not removed:
+                return None
+            base_seq = state["seq"]
+            state["seq"] = base_seq + 1
+            state["since_keyframe"] += 1
+            state["sections"] = sections
+            message = {"location": location, "seq": base_seq + 1, "type": "delta", "base_seq": base_seq, "sections": changed}
+            if removed:
+                message["removed"] = removed
+            return message
+
+    def force_keyframe(self, location=None):
+        """Makes the next message a keyframe, for one location or for all of them."""
+        with self._lock:
+            states = self._state.values() if location is None else [self._state.get(location)]
+            for state in states:
+                if state is not None:
+                    state["since_keyframe"] = self.keyframe_interval
+
+    def forget(self, location):
+        """Drops the state of a location, so its next message is a keyframe."""
+        with self._lock:
+            self._state.pop(location, None)
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    builder = ReportBuilder(keyframe_interval=3)
+    report = {"risks": {}, "suitability": "Moderate", "data": {"noise": {"decibels": 60}, "radon": {"radon_level": 1}}}
+    for decibels in (60, 60, 72, 72, 60):
+        report = dict(report, data=dict(report["data"], noise={"decibels": decibels}))
+        message = builder.build(report, "London")
+        print(message)
@@ -2,20 +2,72 @@
 import logging
 import json
 from incident_reporter import report_illegal_action
-from sub_system import shutdown, request_approval
+from sub_system import shutdown
+from sub_radiation import SV_PER_MICROSIEVERT, classify_radiation
 
-def enforce_robot_laws(environmental_data, social_health_data=None, robot_actions=None):
-    """Enforces robot laws related to environmental and social health."""
+def _radiation_rate(radiation):
+    """Returns the dose rate (µSv/h) of a radiation reading, or None if it has no numeric level."""
+    details = radiation.get('details') if isinstance(radiation.get('details'), dict) else {}
+    for level in (radiation.get('level'), radiation.get('radiation_level'), details.get('radiation_level')):
+        if isinstance(level, (int, float)) and not isinstance(level, bool):
+            return level
+    return None
+
+def _radiation_type(radiation):
+    """Returns the radiation type of a reading, gamma if it does not say."""
+    details = radiation.get('details') if isinstance(radiation.get('details'), dict) else {}
+    return radiation.get('radiation_type') or details.get('radiation_type') or "gamma"
+
+def dose_reading_hook(dose_accumulator, unit="robot"):
+    """
+    Returns an Environment on_reading hook that integrates every collected radiation
+    reading into dose_accumulator, with the reading's location as the zone.
+    """
+    def record_dose(location, monitor, result):
+        if monitor == "radiation" and isinstance(result, dict):
+            rate = _radiation_rate(result)
+            if rate is not None:
+                dose_accumulator.update(location, unit, rate)
+    return record_dose
+
+def enforce_robot_laws(environmental_data, social_health_data=None, robot_actions=None, dose_accumulator=None, zone="default", unit="robot"):
+    """
+    Enforces robot laws related to environmental and social health.
+
+    If a DoseAccumulator (see sub_dose_accumulator.py) is given, reaching a windowed dose
+    limit for (zone, unit) is treated like a critical instantaneous level. The accumulator
+    is fed as readings are collected (see dose_reading_hook), not here. Radiation readings are graded
+    with sub_radiation (warning and PPE in robot_actions, authorities alerted if needed).
+
+    Conditions that need human approval are listed in robot_actions['approvals_required']
+    (messages); the caller requests the approval and holds the order until it is given.
+    """
     logging.info("Enforcing robot laws related to environment and social health.")
     if robot_actions is None: robot_actions = {}
     if environmental_data:
-        if environmental_data.get('radiation') and environmental_data['radiation'].get('alert'):
+        radiation = environmental_data.get('radiation') or {}
+        rate = _radiation_rate(radiation)
+        exceeded = {}
+        if dose_accumulator is not None:
+            exceeded = dose_accumulator.exceeded(zone, unit)
+        if rate is not None:
+            try:
+                level, warning, ppe = classify_radiation(rate * SV_PER_MICROSIEVERT, _radiation_type(radiation), zone)
+                robot_actions['radiation_level'] = level.value
+                robot_actions['radiation_warning'] = warning
+                robot_actions['radiation_ppe'] = ppe
+            except ValueError as e:
+                logging.error(f"Cannot grade radiation reading: {e}")
+        if radiation.get('alert') or exceeded:
             logging.warning("Robot intervention: Radiation detected.")
             robot_actions['radiation_action'] = "Sealing off area and deploying cleanup robots."
             robot_actions['radiation_detail'] = "Sealing off zone E and deploying rad-cleaner bots"
             report_illegal_action(event_details="Radiation Alert Triggered.", sensor_data=environmental_data,)
-            if environmental_data.get('radiation').get('level') > 100: shutdown("Critical radiation level detected, possible harm to humans.")
-            elif environmental_data.get('radiation').get('level') > 50: request_approval("Elevated radiation level detected. Awaiting Approval.")
+            if exceeded:
+                robot_actions['radiation_dose'] = exceeded
+                shutdown(f"Cumulative radiation dose limit reached in {zone} ({', '.join(exceeded)}), possible harm to humans.")
+            elif rate is not None and rate > 100: shutdown("Critical radiation level detected, possible harm to humans.")
+            elif rate is not None and rate > 50: robot_actions.setdefault('approvals_required', []).append("Elevated radiation level detected. Awaiting Approval.")
     if social_health_data:
         if social_health_data.get('crime_rate', 0) > 10:
             logging.warning("Robot intervention: High crime rate detected.")
@@ -23,5 +75,5 @@ def enforce_robot_laws(environmental_data, social_health_data=None, robot_action
             robot_actions['crime_detail'] = "Deploying additional security drones and increasing patrol frequency in sector G."
             report_illegal_action(event_details="High Crime Rate Detected.", sensor_data=social_health_data,)
             if social_health_data.get('violence_level', 0) > 5: shutdown("High violence level detected, possible harm to humans.")
-            elif social_health_data.get('violence_level', 0) > 3: request_approval("Elevated violence level detected. Awaiting Approval.")
+            elif social_health_data.get('violence_level', 0) > 3: robot_actions.setdefault('approvals_required', []).append("Elevated violence level detected. Awaiting Approval.")
     return robot_actions
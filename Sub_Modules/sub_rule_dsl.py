@@ -0,0 +1,366 @@
+"""
+Sub_rule_dsl Module
+
+This module provides a small declarative language for complex rules and compiles a
+whole set of rules into a single Python function.
+
+A rule condition is a Python-like expression over field paths of the rule context:
+
+    radiation.radiation_level > 50 and not (air_quality.aqi < 100 or noise.decibels <= 85)
+    "delete" in order
+    abs(seismic.ground_movement - 2) >= 1.5
+    field("weather.wind-speed") > 20
+
+Supported: dotted field paths (and ["key"] subscripts, or field("a.b") for keys that
+are not identifiers), number/string/bool/None literals, comparisons (<, <=, >, >=,
+==, !=, in, not in, is, is not, chained), and/or/not, + - * / and abs/min/max. A path
+that is missing resolves to None; when a dict has no such key but has a "details"
+dict (the shape of monitor results) the key is looked up there. Comparisons involving
+None or incompatible types are False, so a rule never raises on incomplete data.
+
+Compilation parses every condition with ast (rejecting anything outside the language),
+then generates one function for the whole RuleSet in which:
+
+    * every distinct field path is looked up exactly once, at the top;
+    * every distinct subexpression (by structure) is computed once and shared by all
+      rules that contain it;
+    * each rule's result is a single local variable.
+
+Evaluating a thousand rules against one context is therefore one pass over the
+referenced fields plus one evaluation per distinct subexpression.
+
+Classes:
+    RuleSyntaxError: Raised for conditions outside the rule language.
+    Rule: A named condition with an action and message.
+    RuleSet: A compiled set of rules.
+
+Functions:
+    load_rules(filepath): Loads rule definitions from a JSON file.
+"""
+
+import ast
+import json
+import logging
+
+class RuleSyntaxError(ValueError):
+    """Raised for conditions outside the rule language."""
+    pass
+
+_MISSING = object()
+
+def _lookup(context, path):
+    value = context
+    for key in path:
+        if isinstance(value, dict):
+            found = value.get(key, _MISSING)
+            if found is _MISSING:
+                details = value.get("details")
+                found = details.get(key) if isinstance(details, dict) else None
+            value = found
+        elif isinstance(value, (list, tuple)) and isinstance(key, int) and -len(value) <= key < len(value):
+            value = value[key]
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+def _safe(operator):
+    def compare(a, b):
+        if a is None or b is None:
+            return False
+        try:
+            return bool(operator(a, b))
+        except TypeError:
+            return False
+    return compare
+
+def _arith(operator):
+    def apply(a, b):
+        if a is None or b is None:
+            return None
+        try:
+            return operator(a, b)
+        except (TypeError, ZeroDivisionError):
+            return None
+    return apply
+
+def _abs(a):
+    try:
+        return abs(a) if a is not None else None
+    except TypeError:
+        return None
+
+def _min(*values):
+    values = [value for value in values if value is not None]
+    try:
+        return min(values) if values else None
+    except TypeError:
+        return None
+
+def _max(*values):
+    values = [value for value in values if value is not None]
+    try:
+        return max(values) if values else None
+    except TypeError:
+        return None
+
+_HELPERS = {
+    "_lookup": _lookup,
+    "_lt": _safe(lambda a, b: a < b),
+    "_le": _safe(lambda a, b: a <= b),
+    "_gt": _safe(lambda a, b: a > b),
+    "_ge": _safe(lambda a, b: a >= b),
+    "_eq": lambda a, b: a == b,
+    "_ne": lambda a, b: a != b,
+    "_in": _safe(lambda a, b: a in b),
+    "_not_in": _safe(lambda a, b: a not in b),
+    "_is": lambda a, b: a is b,
+    "_is_not": lambda a, b: a is not b,
+    "_add": _arith(lambda a, b: a + b),
+    "_sub": _arith(lambda a, b: a - b),
+    "_mul": _arith(lambda a, b: a * b),
+    "_div": _arith(lambda a, b: a / b),
+    "_neg": lambda a: -a if isinstance(a, (int, float)) else None,
+    "_abs": _abs,
+    "_min": _min,
+    "_max": _max,
+}
+
+_COMPARE_OPS = {ast.Lt: "_lt", ast.LtE: "_le", ast.Gt: "_gt", ast.GtE: "_ge", ast.Eq: "_eq", ast.NotEq: "_ne",
+                ast.In: "_in", ast.NotIn: "_not_in", ast.Is: "_is", ast.IsNot: "_is_not"}
+_BINARY_OPS = {ast.Add: "_add", ast.Sub: "_sub", ast.Mult: "_mul", ast.Div: "_div"}
+_FUNCTIONS = {"abs": "_abs", "min": "_min", "max": "_max"}
+
+class Rule:
+    """
+    A named condition with an action and message.
+
+    Attributes:
+        name (str): Unique rule name.
+        condition (str): Condition in the rule language; the rule fires when it is true.
+        action (str): What to do when the rule fires (e.g. "log", "approval", "shutdown").
+        message (str): Message reported when the rule fires.
+    """
+
+    __slots__ = ("name", "condition", "action", "message")
+
+    def __init__(self, name, condition, action="log", message=None):
+        self.name = name
+        self.condition = condition
+        self.action = action
+        self.message = message or f"Rule '{name}' triggered."
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.condition!r}, action={self.action!r})"
+
+class _Compiler:
+    """Generates the evaluation function for a list of parsed conditions."""
+
+    def __init__(self):
+        self.fields = {}
+        self.field_lines = []
+        self.lines = []
+        self.memo = {}
+
+    def field(self, path):
+        name = self.fields.get(path)
+        if name is None:
+            name = f"f{len(self.fields)}"
+            self.fields[path] = name
+            self.field_lines.append(f"    {name} = _lookup(ctx, {path!r})")
+        return name
+
+    def temp(self, key, expression):
+        name = self.memo.get(key)
+        if name is None:
+            name = f"s{len(self.memo)}"
+            self.memo[key] = name
+            self.lines.append(f"    {name} = {expression}")
+        return name
+
+    @staticmethod
+    def path_of(node):
+        """Returns the field path of a Name/Attribute/Subscript chain, or None."""
+        parts = []
+        while True:
+            if isinstance(node, ast.Name):
+                parts.append(node.id)
+                return tuple(reversed(parts))
+            if isinstance(node, ast.Attribute):
+                parts.append(node.attr)
+                node = node.value
+            elif isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant) \
+                    and isinstance(node.slice.value, (str, int)) and not isinstance(node.slice.value, bool):
+                parts.append(node.slice.value)
+                node = node.value
+            else:
+                return None
+
+    def emit(self, node, condition):
+        """Returns a Python expression (a literal or a local name) for a node."""
+        if isinstance(node, ast.Constant):
+            if node.value is None or isinstance(node.value, (bool, int, float, str)):
+                return repr(node.value)
+            raise RuleSyntaxError(f"Unsupported literal {node.value!r} in rule: {condition}")
+        if isinstance(node, (ast.Tuple, ast.List)):
+            items = [self.emit(item, condition) for item in node.elts]
+            return self.temp(("tuple",) + tuple(items), f"({', '.join(items)}{',' if len(items) == 1 else ''})")
+        if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)):
+            path = self.path_of(node)
+            if path is None:
+                raise RuleSyntaxError(f"Unsupported field reference in rule: {condition}")
+            return self.field(path)
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise RuleSyntaxError(f"Unsupported call in rule: {condition}")
+            if node.func.id == "field":
+                if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant) or not isinstance(node.args[0].value, str):
+                    raise RuleSyntaxError(f"field() takes one string path in rule: {condition}")
+                return self.field(tuple(node.args[0].value.split(".")))
+            helper = _FUNCTIONS.get(node.func.id)
+            if helper is None:
+                raise RuleSyntaxError(f"Unknown function '{node.func.id}' in rule: {condition}")
+            args = [self.emit(arg, condition) for arg in node.args]
+            return self.temp((helper,) + tuple(args), f"{helper}({', '.join(args)})")
+        if isinstance(node, ast.BoolOp):
+            values = [self.emit(value, condition) for value in node.values]
+            joiner = " and " if isinstance(node.op, ast.And) else " or "
+            return self.temp((type(node.op).__name__,) + tuple(values), f"bool({joiner.join(values)})")
+        if isinstance(node, ast.UnaryOp):
+            operand = self.emit(node.operand, condition)
+            if isinstance(node.op, ast.Not):
+                return self.temp(("not", operand), f"not {operand}")
+            if isinstance(node.op, ast.USub):
+                return self.temp(("neg", operand), f"_neg({operand})")
+            raise RuleSyntaxError(f"Unsupported operator in rule: {condition}")
+        if isinstance(node, ast.BinOp):
+            helper = _BINARY_OPS.get(type(node.op))
+            if helper is None:
+                raise RuleSyntaxError(f"Unsupported operator in rule: {condition}")
+            left, right = self.emit(node.left, condition), self.emit(node.right, condition)
+            return self.temp((helper, left, right), f"{helper}({left}, {right})")
+        if isinstance(node, ast.Compare):
+            left = self.emit(node.left, condition)
+            parts = []
+            for op, comparator in zip(node.ops, node.comparators):
+                helper = _COMPARE_OPS.get(type(op))
+                if helper is None:
+                    raise RuleSyntaxError(f"Unsupported comparison in rule: {condition}")
+                right = self.emit(comparator, condition)
+                parts.append(self.temp((helper, left, right), f"{helper}({left}, {right})"))
+                left = right
+            if len(parts) == 1:
+                return parts[0]
+            return self.temp(("And",) + tuple(parts), f"({' and '.join(parts)})")
+        raise RuleSyntaxError(f"Unsupported expression ({type(node).__name__}) in rule: {condition}")
+
+    def source(self, results):
+        body = self.field_lines + self.lines or ["    pass"]
+        return "def _evaluate(ctx):\n" + "\n".join(body) + f"\n    return ({''.join(result + ', ' for result in results)})\n"
+
+class RuleSet:
+    """
+    A compiled set of rules.
+
+    Attributes:
+        rules (tuple): The rules, in definition order.
+        fields (tuple): Distinct field paths referenced by the rules.
+        source (str): Generated Python source of the evaluation function.
+    """
+
+    def __init__(self, rules):
+        """
+        Compiles a list of rules.
+
+        Args:
+            rules (iterable): Rule objects or dicts with "name", "when" (or "condition")
+                and optionally "action" and "message".
+
+        Raises:
+            RuleSyntaxError: If a condition is invalid, or rule names repeat.
+        """
+        compiled_rules = []
+        for rule in rules:
+            if isinstance(rule, dict):
+                rule = Rule(rule["name"], rule.get("when", rule.get("condition")), rule.get("action", "log"), rule.get("message"))
+            compiled_rules.append(rule)
+        names = [rule.name for rule in compiled_rules]
+        if len(set(names)) != len(names):
+            raise RuleSyntaxError("Rule names must be unique.")
+
+        compiler = _Compiler()
+        results = []
+        for rule in compiled_rules:
+            try:
+                tree = ast.parse(rule.condition, mode="eval")
+            except (SyntaxError, TypeError) as e:
+                raise RuleSyntaxError(f"Invalid rule '{rule.name}': {e}") from None
+            results.append(compiler.emit(tree.body, rule.condition))
+
+        self.rules = tuple(compiled_rules)
+        self.fields = tuple(compiler.fields)
+        self.source = compiler.source(results)
+        namespace = dict(_HELPERS)
+        exec(compile(self.source, "<rule_dsl>", "exec"), namespace)
+        self._evaluate = namespace["_evaluate"]
+
+    @staticmethod
+    def _context_data(context):
+        return getattr(context, "context_data", context)
+
+    def evaluate(self, context):
+        """
+        Evaluates every rule against one context.
+
+        Args:
+            context (dict or DataContext): Rule context.
+
+        Returns:
+            dict: Rule name -> True if the rule fired.
+        """
+        values = self._evaluate(self._context_data(context))
+        return {rule.name: bool(value) for rule, value in zip(self.rules, values)}
+
+    def triggered(self, context):
+        """
+        Returns the rules that fire for a context.
+
+        Args:
+            context (dict or DataContext): Rule context.
+
+        Returns:
+            list: Rule objects, in definition order.
+        """
+        values = self._evaluate(self._context_data(context))
+        return [rule for rule, value in zip(self.rules, values) if value]
+
+    def __len__(self):
+        return len(self.rules)
+
+def load_rules(filepath):
+    """
+    Loads rule definitions from a JSON file (a list of rule dicts).
+
+    Returns:
+        list: Rule dicts, or an empty list if the file is missing or invalid.
+    """
+    try:
+        with open(filepath, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.error(f"Rules file not found: {filepath}")
+        return []
+    except json.JSONDecodeError:
+        logging.error(f"Invalid JSON in rules file: {filepath}")
+        return []
+
+if __name__ == "__main__":
+    # Example usage
+    rule_set = RuleSet([
+        {"name": "critical_radiation", "when": "radiation.radiation_level > 100", "action": "shutdown"},
+        {"name": "elevated_radiation", "when": "50 < radiation.radiation_level <= 100", "action": "approval"},
+        {"name": "loud_and_radioactive", "when": "radiation.radiation_level > 50 and noise.decibels > 85"},
+    ])
+    print(rule_set.source)
+    print(rule_set.evaluate({"radiation": {"details": {"radiation_level": 80}}, "noise": {"details": {"decibels": 90}}}))
@@ -0,0 +1,343 @@
+"""
+Sub_source_arbiter Module
+
+This module arbitrates between a monitor's local sensor and its upstream API.
+
+    * fetch() queries the sensor first. If the sensor has not answered within a delay
+      derived from its recent latencies (the p95, clamped to [min_delay, max_delay]),
+      a hedged API request is issued and whichever valid answer arrives first is used.
+      A sensor that fails or returns nothing falls back to the API straight away.
+    * shared() deduplicates identical upstream calls within one collection cycle, so
+      monitors asking for the same data (e.g. the weather API response that both the
+      weather and air quality monitors use) trigger one request per cycle. Outside a
+      cycle it simply calls the function.
+
+Collection cycles are opened with cycle(); Environment opens one around every
+collection. Each cycle has its own results, held in a context variable, so cycles
+opened concurrently (e.g. several Environments collecting at once) do not share or
+keep alive each other's results. Worker threads join the cycle of the code that
+submitted them when run in a copy of its context (contextvars.copy_context().run).
+Results of shared() calls are handed to every caller of the cycle and must be
+treated as read-only.
+
+Each source runs its sensor calls and its API calls on two small thread pools of its
+own, so calls that hang past the timeout (fetch() abandons them, as Python threads
+cannot be killed) only tie up those workers: never the other monitors', and a hung
+sensor never keeps the hedged API request from running.
+
+Hedging is configured by SOURCE_HEDGING, SOURCE_HEDGE_MIN_DELAY and
+SOURCE_HEDGE_MAX_DELAY, and the overall limit of a reading by SOURCE_TIMEOUT (see
+.env.example).
+
+Classes:
+    LatencyTracker: Rolling window of latencies with percentiles.
+    SourceArbiter: Sensor/API arbitration with hedged requests and per-cycle deduplication.
+
+Functions:
+    get_source_arbiter(): Returns the process-wide SourceArbiter.
+    fetch_reading(name, sensor, api, validate, timeout): fetch() on the process-wide arbiter.
+    shared_call(key, func, *args, **kwargs): shared() on the process-wide arbiter.
+    collection_cycle(): cycle() on the process-wide arbiter.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+def _valid(data):
+    """Default validity check: a non-empty dict without an "error" key."""
+    return isinstance(data, dict) and bool(data) and "error" not in data
+
+class LatencyTracker:
+    """
+    Rolling window of latencies.
+
+    Attributes:
+        window (int): Number of latencies kept.
+    """
+
+    def __init__(self, window=100):
+        self.window = window
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Adds a latency in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        """
+        Returns the q-th percentile (0-100) of the kept latencies (nearest rank).
+
+        Returns:
+            float: The percentile, or None if no latency was recorded.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(q / 100 * len(samples)))
+        return samples[rank - 1]
+
+class SourceArbiter:
+    """
+    Sensor/API arbitration with hedged requests and per-cycle deduplication.
+
+    Attributes:
+        hedging (bool): Issue hedged API requests for slow sensors.
+        min_delay (float): Lower bound of the hedge delay in seconds.
+        max_delay (float): Upper bound of the hedge delay in seconds.
+        min_samples (int): Sensor latencies needed before the p95 is used; max_delay is
+            used until then.
+        timeout (float): Default overall limit of fetch() in seconds, or None for no limit.
+    """
+
+    def __init__(self, hedging=True, min_delay=0.05, max_delay=2.0, min_samples=5, window=100, workers_per_source=4, timeout=10.0):
+        """
+        Initializes the arbiter.
+
+        Args:
+            hedging (bool, optional): Issue hedged API requests. Defaults to True.
+            min_delay (float, optional): Lower bound of the hedge delay. Defaults to 0.05.
+            max_delay (float, optional): Upper bound of the hedge delay. Defaults to 2.0.
+            min_samples (int, optional): Latencies needed before the p95 is used. Defaults to 5.
+            window (int, optional): Latencies kept per source. Defaults to 100.
+            workers_per_source (int, optional): Threads running each source's sensor calls,
+                and as many its API calls. Defaults to 4.
+            timeout (float, optional): Default overall limit of fetch(). Defaults to 10.
+        """
+        self.hedging = hedging
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.timeout = timeout
+        self.workers_per_source = workers_per_source
+        self._executors = {}
+        self._latencies = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._cycle = contextvars.ContextVar(f"source_cycle_{id(self)}", default=None)
+
+    def _tracker(self, name):
+        with self._lock:
+            tracker = self._latencies.get(name)
+            if tracker is None:
+                tracker = self._latencies[name] = LatencyTracker(self.window)
+            return tracker
+
+    def _executor(self, name, source):
+        with self._lock:
+            executor = self._executors.get((name, source))
+            if executor is None:
+                executor = self._executors[(name, source)] = ThreadPoolExecutor(
+                    max_workers=self.workers_per_source, thread_name_prefix=f"{source}-{name}")
+            return executor
+
+    def _count(self, name, event):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"sensor": 0, "api": 0, "hedged": 0, "hedge_wins": 0, "failed": 0})
+            stats[event] += 1
+
+    def hedge_delay(self, name):
+        """Returns the seconds to wait for a source's sensor before hedging."""
+        tracker = self._tracker(name)
+        p95 = tracker.percentile(95) if len(tracker) >= self.min_samples else None
+        if p95 is None:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, p95))
+
+    def _timed_sensor(self, name, sensor):
+        start = time.monotonic()
+        data = sensor()
+        self._tracker(name).record(time.monotonic() - start)
+        return data
+
+    @staticmethod
+    def _answer(future, validate):
+        """Returns a finished future's data if it is valid, else None."""
+        try:
+            data = future.result()
+        except Exception as e:
+            logging.warning(f"Source call failed: {e}")
+            return None
+        return data if validate(data) else None
+
+    def fetch(self, name, sensor, api=None, validate=_valid, timeout=None):
+        """
+        Reads a source from its sensor, hedging with or falling back to its API.
+
+        Args:
+            name (str): Source name; sensor latencies are tracked per name.
+            sensor (function): Called without arguments; returns the sensor data.
+            api (function, optional): Called without arguments; returns the API data.
+            validate (function, optional): Returns True for usable data. Defaults to a
+                non-empty dict without an "error" key.
+            timeout (float, optional): Overall limit in seconds. Defaults to self.timeout.
+                A sensor or API call still running at the limit is abandoned; one still
+                queued behind hung calls of the same source is cancelled.
+
+        Returns:
+            tuple: (data, "sensor" or "api"), or (None, None) if neither answered validly.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        remaining = lambda: None if deadline is None else max(0.0, deadline - time.monotonic())
+        sensor_future = self._executor(name, "sensor").submit(self._timed_sensor, name, sensor)
+        sources = {sensor_future: "sensor"}
+        api_future = None
+
+        if api is not None and self.hedging:
+            delay = self.hedge_delay(name)
+            if deadline is not None:
+                delay = min(delay, remaining())
+            wait([sensor_future], timeout=delay)
+            if not sensor_future.done():
+                logging.info(f"Sensor for '{name}' slower than {delay:.3f}s; issuing hedged API request.")
+                self._count(name, "hedged")
+                api_future = self._executor(name, "api").submit(api)
+                sources[api_future] = "api"
+
+        pending = set(sources)
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                logging.error(f"No answer for '{name}' within {timeout}s.")
+                break
+            for future in done:
+                data = self._answer(future, validate)
+                if data is not None:
+                    source = sources[future]
+                    self._count(name, source)
+                    if source == "api" and sensor_future in pending:
+                        self._count(name, "hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return data, source
+                if future is sensor_future and api is not None and api_future is None:
+                    logging.warning(f"Sensor data for '{name}' unavailable; falling back to the API.")
+                    api_future = self._executor(name, "api").submit(api)
+                    sources[api_future] = "api"
+                    pending.add(api_future)
+
+        for future in pending:
+            future.cancel()
+        self._count(name, "failed")
+        return None, None
+
+    @contextmanager
+    def cycle(self):
+        """
+        Opens a collection cycle in the current context; its shared results are dropped
+        when it closes. A cycle opened inside another joins the enclosing one.
+        """
+        if self._cycle.get() is not None:
+            yield self
+            return
+        token = self._cycle.set({})
+        try:
+            yield self
+        finally:
+            self._cycle.reset(token)
+
+    def shared(self, key, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) once per collection cycle and key.
+
+        Args:
+            key (hashable): Identifies the upstream call, e.g. ("openweathermap", location).
+            func (function): The call.
+
+        Returns:
+            The call's result (shared by every caller of the cycle; do not modify it).
+            Exceptions are raised to every caller of the cycle as well.
+        """
+        shared = self._cycle.get()
+        if shared is None:
+            return func(*args, **kwargs)
+        with self._lock:
+            future = shared.get(key)
+            owner = future is None
+            if owner:
+                future = shared[key] = Future()
+        if owner:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def stats(self):
+        """
+        Returns per-source counters: answers from the sensor and the API, hedged requests,
+        hedges that won, failures, and the current hedge delay.
+        """
+        with self._lock:
+            names = list(self._stats)
+            stats = {name: dict(counts) for name, counts in self._stats.items()}
+        for name in names:
+            stats[name]["hedge_delay"] = self.hedge_delay(name)
+        return stats
+
+    def shutdown(self):
+        """Stops the worker threads."""
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for executor in executors:
+            executor.shutdown(wait=False)
+
+_arbiter = None
+_arbiter_lock = threading.Lock()
+
+def get_source_arbiter():
+    """Returns the process-wide SourceArbiter, configured from SOURCE_HEDGING, SOURCE_HEDGE_* and SOURCE_TIMEOUT."""
+    global _arbiter
+    if _arbiter is None:
+        with _arbiter_lock:
+            if _arbiter is None:
+                _arbiter = SourceArbiter(hedging=os.getenv("SOURCE_HEDGING", "True").lower() in ("true", "1", "yes"),
+                                         min_delay=float(os.getenv("SOURCE_HEDGE_MIN_DELAY", "0.05")),
+                                         max_delay=float(os.getenv("SOURCE_HEDGE_MAX_DELAY", "2")),
+                                         timeout=float(os.getenv("SOURCE_TIMEOUT", "10")) or None)
+    return _arbiter
+
+def fetch_reading(name, sensor, api=None, validate=_valid, timeout=None):
+    """Reads a source through the process-wide arbiter, within SOURCE_TIMEOUT by default. See SourceArbiter.fetch."""
+    return get_source_arbiter().fetch(name, sensor, api, validate, timeout)
+
+def shared_call(key, func, *args, **kwargs):
+    """Deduplicates a call within the current collection cycle. See SourceArbiter.shared."""
+    return get_source_arbiter().shared(key, func, *args, **kwargs)
+
+def collection_cycle():
+    """Opens a collection cycle on the process-wide arbiter. See SourceArbiter.cycle."""
+    return get_source_arbiter().cycle()
+
+if __name__ == "__main__":
+    # Example usage
+    logging.basicConfig(level=logging.INFO)
+    arbiter = SourceArbiter(max_delay=0.2)
+
+    def slow_sensor():
+        time.sleep(1)
+        return {"temperature": 28}
+
+    print(arbiter.fetch("weather", slow_sensor, lambda: {"temperature": 30}))
+    print(arbiter.fetch("weather", lambda: None, lambda: {"temperature": 30}))
+
+    calls = []
+    with arbiter.cycle():
+        for _ in range(3):
+            arbiter.shared(("weather_api", "Paris"), lambda: calls.append(1) or {"humidity": 60})
+    print(f"Upstream calls: {len(calls)}", arbiter.stats())
+    arbiter.shutdown()
@@ -0,0 +1,301 @@
+"""
+Sub_spatial_index Module
+
+This module provides a shared spatial index for location-scoped queries ("every incident
+within 5 km of this robot"). Stores register their records here by kind and key (e.g.
+("incident", report_id) or ("species", "Paris")) with the geocoded latitude and
+longitude, and look up the keys of a kind within a radius or bounding box.
+
+Two backends are used, chosen when the index is opened:
+
+    * SQLite's R*Tree module (when the SQLite library was built with it): each entry is
+      a point box in an rtree virtual table, so box queries are logarithmic.
+    * Otherwise a geohash prefix index: each entry's geohash is stored in a B-tree
+      index, and a box query reads the index ranges of the few geohash cells covering
+      the box.
+
+Radius queries read the bounding box of the circle and keep the entries whose
+great-circle (haversine) distance is within the radius, nearest first. A circle that
+crosses the antimeridian is read as one box on each side; bbox() itself does not wrap.
+
+Classes:
+    SpatialIndex: SQLite-backed index of points by kind and key.
+
+Functions:
+    encode_geohash(latitude, longitude, precision): Returns the geohash of a point.
+    haversine_km(lat1, lng1, lat2, lng2): Great-circle distance in kilometres.
+    radius_bbox(latitude, longitude, radius_km): Bounding box of a circle.
+    wrap_bbox(min_lat, min_lng, max_lat, max_lng): Splits a box at the antimeridian.
+    get_spatial_index(): Returns the process-wide SpatialIndex.
+"""
+
+import os
+import math
+import sqlite3
+import logging
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Cell size in degrees (lat, lng) for each geohash precision.
+_CELL = {precision: (180.0 / 2 ** ((5 * precision) // 2), 360.0 / 2 ** ((5 * precision + 1) // 2)) for precision in range(1, 13)}
+
+def encode_geohash(latitude, longitude, precision=9):
+    """
+    Returns the geohash of a point.
+
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+        precision (int, optional): Number of characters. Defaults to 9 (about 5 m).
+
+    Returns:
+        str: The geohash.
+    """
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        span, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Returns the great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def radius_bbox(latitude, longitude, radius_km):
+    """
+    Returns the bounding box of a circle on the sphere (exact at any radius).
+
+    Returns:
+        tuple: (min_lat, min_lng, max_lat, max_lng). Latitudes are clamped; longitudes
+            extend past +/-180 when the circle crosses the antimeridian (see wrap_bbox),
+            and cover every longitude when the circle contains a pole.
+    """
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = latitude - d_lat, latitude + d_lat
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return (max(-90.0, min_lat), -180.0, min(90.0, max_lat), 180.0)
+    # Widest longitude offset of the circle, reached north or south of its centre.
+    d_lng = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)))))
+    return (min_lat, longitude - d_lng, max_lat, longitude + d_lng)
+
+def wrap_bbox(min_lat, min_lng, max_lat, max_lng):
+    """Returns the boxes, within +/-180 longitude, covering a box that may cross the antimeridian."""
+    if max_lng - min_lng >= 360.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    if min_lng < -180.0:
+        return [(min_lat, min_lng + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+    if max_lng > 180.0:
+        return [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng - 360.0)]
+    return [(min_lat, min_lng, max_lat, max_lng)]
+
+def _covering_prefixes(min_lat, min_lng, max_lat, max_lng, max_cells=16):
+    """Returns geohash prefixes whose cells cover a box, using the finest precision needing at most max_cells cells."""
+    for precision in range(12, 0, -1):
+        cell_lat, cell_lng = _CELL[precision]
+        rows = math.floor((max_lat + 90) / cell_lat) - math.floor((min_lat + 90) / cell_lat) + 1
+        columns = math.floor((max_lng + 180) / cell_lng) - math.floor((min_lng + 180) / cell_lng) + 1
+        if rows * columns <= max_cells:
+            break
+    prefixes = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            prefixes.add(encode_geohash(lat, lng, precision))
+            if lng >= max_lng:
+                break
+            lng = min(max_lng, lng + cell_lng)
+        if lat >= max_lat:
+            break
+        lat = min(max_lat, lat + cell_lat)
+    return sorted(prefixes)
+
+def _rtree_available():
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING rtree(id, min_x, max_x, min_y, max_y)")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+class SpatialIndex:
+    """
+    SQLite-backed index of points by kind and key.
+
+    Attributes:
+        db_path (str): Path of the SQLite database.
+        backend (str): "rtree" or "geohash".
+    """
+
+    def __init__(self, db_path="spatial_index.db", use_rtree=None):
+        """
+        Opens (and if needed creates) the index.
+
+        Args:
+            db_path (str, optional): Path of the SQLite database. Defaults to "spatial_index.db".
+            use_rtree (bool, optional): Force or disable the R*Tree backend. Defaults to
+                using it when SQLite supports it.
+        """
+        self.db_path = db_path
+        self.backend = "rtree" if (_rtree_available() if use_rtree is None else use_rtree) else "geohash"
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS spatial_entries (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    geohash TEXT NOT NULL,
+                    UNIQUE (kind, key)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_spatial_geohash ON spatial_entries (geohash)")
+            if self.backend == "rtree":
+                self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS spatial_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+                # Entries written while the geohash backend was in use are added to the rtree.
+                self._conn.execute("""
+                    INSERT INTO spatial_rtree (id, min_lat, max_lat, min_lng, max_lng)
+                    SELECT id, latitude, latitude, longitude, longitude FROM spatial_entries
+                    WHERE id NOT IN (SELECT id FROM spatial_rtree)
+                """)
+
+    def add(self, kind, key, latitude, longitude):
+        """Adds or moves the entry for (kind, key)."""
+        self.add_many([(kind, key, latitude, longitude)])
+
+    def add_many(self, entries):
+        """
+        Adds or moves many entries in one transaction.
+
+        Args:
+            entries (iterable): (kind, key, latitude, longitude) tuples. Entries without
+                coordinates are skipped.
+
+        Returns:
+            int: Number of entries written.
+        """
+        rows = [(kind, str(key), float(latitude), float(longitude), encode_geohash(latitude, longitude))
+                for kind, key, latitude, longitude in entries if latitude is not None and longitude is not None]
+        with self._lock, self._conn:
+            for row in rows:
+                entry_id = self._conn.execute("""
+                    INSERT INTO spatial_entries (kind, key, latitude, longitude, geohash) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (kind, key) DO UPDATE SET
+                        latitude = excluded.latitude, longitude = excluded.longitude, geohash = excluded.geohash
+                    RETURNING id
+                """, row).fetchone()[0]
+                if self.backend == "rtree":
+                    self._conn.execute("INSERT OR REPLACE INTO spatial_rtree VALUES (?, ?, ?, ?, ?)",
+                                       (entry_id, row[2], row[2], row[3], row[3]))
+        return len(rows)
+
+    def remove(self, kind, key):
+        """Removes the entry for (kind, key)."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM spatial_entries WHERE kind = ? AND key = ?", (kind, str(key))).fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM spatial_entries WHERE id = ?", row)
+            if self.backend == "rtree":
+                self._conn.execute("DELETE FROM spatial_rtree WHERE id = ?", row)
+
+    def bbox(self, min_lat, min_lng, max_lat, max_lng, kind=None):
+        """
+        Returns the entries inside a bounding box.
+
+        Args:
+            min_lat, min_lng, max_lat, max_lng (float): The box in degrees.
+            kind (str, optional): Only entries of this kind.
+
+        Returns:
+            list: (kind, key, latitude, longitude) tuples.
+        """
+        kind_filter, kind_args = ("AND e.kind = ?", (kind,)) if kind is not None else ("", ())
+        with self._lock:
+            if self.backend == "rtree":
+                return self._conn.execute(f"""
+                    SELECT e.kind, e.key, e.latitude, e.longitude
+                    FROM spatial_rtree r JOIN spatial_entries e ON e.id = r.id
+                    WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ? {kind_filter}
+                """, (min_lat, max_lat, min_lng, max_lng) + kind_args).fetchall()
+            results = []
+            for prefix in _covering_prefixes(min_lat, min_lng, max_lat, max_lng):
+                # "{" sorts after every geohash character, so this is the prefix's index range.
+                results.extend(self._conn.execute(f"""
+                    SELECT e.kind, e.key, e.latitude, e.longitude FROM spatial_entries e
+                    WHERE e.geohash >= ? AND e.geohash < ?
+                      AND e.latitude BETWEEN ? AND ? AND e.longitude BETWEEN ? AND ? {kind_filter}
+                """, (prefix, prefix + "{", min_lat, max_lat, min_lng, max_lng) + kind_args).fetchall())
+            return results
+
+    def within(self, latitude, longitude, radius_km, kind=None):
+        """
+        Returns the entries within a radius of a point, nearest first.
+
+        Args:
+            latitude (float): Latitude of the centre.
+            longitude (float): Longitude of the centre.
+            radius_km (float): Radius in kilometres.
+            kind (str, optional): Only entries of this kind.
+
+        Returns:
+            list: (kind, key, distance_km) tuples.
+        """
+        results = {}
+        for box in wrap_bbox(*radius_bbox(latitude, longitude, radius_km)):
+            for entry_kind, key, entry_lat, entry_lng in self.bbox(*box, kind=kind):
+                distance = haversine_km(latitude, longitude, entry_lat, entry_lng)
+                if distance <= radius_km:
+                    results[entry_kind, key] = (entry_kind, key, distance)
+        return sorted(results.values(), key=lambda entry: entry[2])
+
+    def keys_within(self, latitude, longitude, radius_km, kind):
+        """Returns the keys of one kind within a radius, nearest first."""
+        return [key for _, key, _ in self.within(latitude, longitude, radius_km, kind)]
+
+    def close(self):
+        """Closes the database."""
+        self._conn.close()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_spatial_index():
+    """Returns the process-wide SpatialIndex (database path from SPATIAL_INDEX_PATH, default spatial_index.db)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SpatialIndex(os.getenv("SPATIAL_INDEX_PATH", "spatial_index.db"))
+                logging.info(f"Spatial index opened with the {_index.backend} backend.")
+    return _index
+
+if __name__ == "__main__":
+    # Example usage
+    index = SpatialIndex(":memory:")
+    index.add("incident", "report-1", 51.5007, -0.1246)
+    index.add("incident", "report-2", 51.5194, -0.1270)
+    index.add("species", "Paris", 48.8566, 2.3522)
+    print(index.backend, index.within(51.5072, -0.1276, 5))
+    print(encode_geohash(51.5072, -0.1276), index.bbox(48, 2, 49, 3))
@@ -0,0 +1,247 @@
+"""
+Sub_species_store Module
+
+This module provides the species-observation store used by the fauna monitor.
+
+    * One row per (location, species): the table is keyed by that pair (a WITHOUT ROWID
+      table clustered on it), so an upsert replaces the previous observation and a
+      location's rows are read from one contiguous range of the key, without a separate
+      index lookup. A secondary index on (species_name, location) serves per-species
+      queries.
+    * Whole survey batches are upserted with one executemany() in one transaction.
+    * Each thread reuses its own connection (WAL mode, so readers do not block the
+      writer) instead of opening the database for every call.
+    * Per-location reads are cached (LRU) and invalidated by writes to that location.
+
+Databases created by the previous fauna_monitor schema (an autoincrement id and no
+unique key, so "INSERT OR REPLACE" only ever appended) are migrated on open: the most
+recent row of every (location, species) pair is kept.
+
+Classes:
+    SpeciesStore: SQLite store of species observations.
+
+Functions:
+    get_species_store(): Returns the process-wide SpeciesStore.
+"""
+
+import os
+import sqlite3
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS species (
+        location TEXT NOT NULL,
+        species_name TEXT NOT NULL,
+        estimated_population INTEGER,
+        population_density REAL,
+        last_updated TEXT,
+        PRIMARY KEY (location, species_name)
+    ) WITHOUT ROWID
+"""
+
+UPSERT = """
+    INSERT INTO species (location, species_name, estimated_population, population_density, last_updated)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (location, species_name) DO UPDATE SET
+        estimated_population = excluded.estimated_population,
+        population_density = excluded.population_density,
+        last_updated = excluded.last_updated
+"""
+
+class SpeciesStore:
+    """
+    SQLite store of species observations, one row per (location, species).
+
+    Attributes:
+        db_path (str): Path of the SQLite database.
+        cache_size (int): Number of locations whose rows are cached.
+    """
+
+    def __init__(self, db_path="fauna.db", cache_size=256):
+        """
+        Opens (and if needed creates or migrates) the store.
+
+        Args:
+            db_path (str, optional): Path of the SQLite database. Defaults to "fauna.db".
+            cache_size (int, optional): Locations cached for reads. Defaults to 256.
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._writes = 0
+        self._shared = None
+        if db_path == ":memory:":
+            # Every connection to ":memory:" is a separate database; share one instead.
+            self._shared = sqlite3.connect(db_path, check_same_thread=False)
+            self._shared_lock = threading.Lock()
+        self._create()
+
+    def _connection(self):
+        """Returns this thread's connection, opening it on first use."""
+        if self._shared is not None:
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, func):
+        """Runs func(conn) on this thread's connection (serialized for an in-memory store)."""
+        if self._shared is not None:
+            with self._shared_lock:
+                return func(self._shared)
+        return func(self._connection())
+
+    def _create(self):
+        def create(conn):
+            with conn:
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(species)")]
+                if "id" in columns:
+                    self._migrate(conn)
+                conn.execute(SCHEMA)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_species_name ON species (species_name, location)")
+        self._execute(create)
+
+    @staticmethod
+    def _migrate(conn):
+        """Rebuilds a table of the old schema, keeping the latest row per (location, species)."""
+        logging.info("Migrating the species table to one row per (location, species).")
+        conn.execute("ALTER TABLE species RENAME TO species_legacy")
+        conn.execute(SCHEMA)
+        conn.execute("""
+            INSERT INTO species (location, species_name, estimated_population, population_density, last_updated)
+            SELECT location, species_name, estimated_population, population_density, last_updated
+            FROM species_legacy
+            WHERE id IN (SELECT MAX(id) FROM species_legacy
+                         WHERE location IS NOT NULL AND species_name IS NOT NULL
+                         GROUP BY location, species_name)
+        """)
+        conn.execute("DROP TABLE species_legacy")
+
+    def _invalidate(self, locations):
+        with self._cache_lock:
+            self._writes += 1
+            for location in locations:
+                self._cache.pop(location, None)
+
+    def upsert(self, location, species_name, estimated_population, population_density, last_updated=None):
+        """Inserts or replaces the observation of one species at a location."""
+        self.upsert_many([(location, species_name, estimated_population, population_density, last_updated)])
+
+    def upsert_many(self, rows):
+        """
+        Inserts or replaces many observations in one transaction.
+
+        Args:
+            rows (iterable): (location, species_name, estimated_population, population_density)
+                tuples, optionally with last_updated (ISO string) as a fifth item; it
+                defaults to now.
+
+        Returns:
+            int: Number of rows written.
+        """
+        now = datetime.datetime.now().isoformat()
+        batch = [(row[0], row[1], row[2], row[3], row[4] if len(row) > 4 and row[4] else now) for row in rows]
+        if not batch:
+            return 0
+
+        def write(conn):
+            with conn:
+                conn.executemany(UPSERT, batch)
+        self._execute(write)
+        self._invalidate({row[0] for row in batch})
+        return len(batch)
+
+    def upsert_survey(self, location, species, last_updated=None):
+        """
+        Upserts a survey of one location in one transaction.
+
+        Args:
+            location (str): Location surveyed.
+            species (iterable): Dicts with "name" and optionally "population" and "density".
+            last_updated (str, optional): ISO timestamp. Defaults to now.
+
+        Returns:
+            int: Number of rows written.
+        """
+        return self.upsert_many((location, entry["name"], entry.get("population"), entry.get("density"), last_updated)
+                                for entry in species)
+
+    def get(self, location):
+        """
+        Returns the observations at a location, served from the cache when possible.
+
+        Returns:
+            list: (species_name, estimated_population, population_density, last_updated) tuples.
+        """
+        with self._cache_lock:
+            rows = self._cache.get(location)
+            if rows is not None:
+                self._cache.move_to_end(location)
+                return list(rows)
+            writes = self._writes
+
+        rows = tuple(self._execute(lambda conn: conn.execute("""
+            SELECT species_name, estimated_population, population_density, last_updated
+            FROM species WHERE location = ?
+        """, (location,)).fetchall()))
+        with self._cache_lock:
+            if writes != self._writes:
+                # A write finished during the read; the rows may already be stale.
+                return list(rows)
+            self._cache[location] = rows
+            self._cache.move_to_end(location)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(rows)
+
+    def locations_with(self, species_name):
+        """Returns the locations where a species has been observed."""
+        return [row[0] for row in self._execute(lambda conn: conn.execute(
+            "SELECT location FROM species WHERE species_name = ?", (species_name,)).fetchall())]
+
+    def count(self):
+        """Returns the number of stored observations."""
+        return self._execute(lambda conn: conn.execute("SELECT COUNT(*) FROM species").fetchone()[0])
+
+    def close(self):
+        """Closes this thread's connection (or the shared in-memory one)."""
+        if self._shared is not None:
+            self._shared.close()
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_species_store():
+    """Returns the process-wide SpeciesStore (database path from FAUNA_DB_PATH, default fauna.db)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SpeciesStore(os.getenv("FAUNA_DB_PATH", "fauna.db"))
+    return _store
+
+if __name__ == "__main__":
+    # Example usage
+    import time
+    logging.basicConfig(level=logging.INFO)
+    store = SpeciesStore(":memory:")
+    survey = [(f"Region {i % 100}", f"species-{i}", i, i / 10) for i in range(100000)]
+    start = time.perf_counter()
+    store.upsert_many(survey)
+    print(f"Upserted {store.count()} rows in {time.perf_counter() - start:.2f}s")
+    store.upsert_survey("Region 1", [{"name": "species-1", "population": 5, "density": 0.5}])
+    print(store.get("Region 1")[:3])
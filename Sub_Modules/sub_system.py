@@ -2,6 +2,7 @@
 import logging
 import httpx
 import time
+from sub_approval_queue import get_approval_queue
 
 def shutdown(message, alertmanager_url=None, severity="error", grouping_key="application"):
     """Logs an error message and optionally sends an alert before exiting."""
@@ -15,12 +16,21 @@ def shutdown(message, alertmanager_url=None, severity="error", grouping_key="app
             logging.error(f"Failed to send alert to Alertmanager: {e}")
     exit(1)
 
-def request_approval(message):
-    """Logs a message and holds for approval."""
+def request_approval(message, payload=None, timeout=None):
+    """
+    Logs a message and queues it for approval without blocking.
+
+    Approvers resolve it with sub_approval_queue's command line; unresolved requests
+    are denied when they time out. Work that must wait for the decision is attached
+    through payload["action"] (see ApprovalQueue.register_handler).
+
+    Returns:
+        int: Approval id.
+    """
     logging.warning(message)
-    print(message)
-    input("Approval Required. Press Enter to continue...")
-    logging.info("Approval Received. Continuing.")
+    approval_id = get_approval_queue().submit(message, payload, timeout)
+    print(f"{message} (approval {approval_id} pending)")
+    return approval_id
 
 def analyze_order(order):
     """Analyzes the order for complexity and potential risks."""
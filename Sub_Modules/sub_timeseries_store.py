@@ -0,0 +1,434 @@
+"""
+Sub_timeseries_store Module
+
+This module provides an embedded, append-only time-series store for sensor readings,
+so trend analysis, spike detection and audits have history without an external TSDB.
+
+Each metric (e.g. "weather.temperature") is stored as two columns: int64 timestamps
+(nanoseconds since the epoch) and float64 values, split into fixed-size chunk files
+that are read back through mmap. Downsampled rollups (1m, 1h, 1d) with count, sum,
+min and max are maintained incrementally as readings are appended, and are rebuilt
+from the raw columns on open if the process stopped before they were written.
+Timestamps within a metric never decrease: a reading older than the metric's last one
+(e.g. after a wall-clock step backwards) is stored at the last timestamp instead.
+
+Range queries return NumPy arrays when NumPy is installed, otherwise array.array.
+
+Appended readings are buffered per metric and written once FLUSH_RECORDS of them are
+pending or FLUSH_INTERVAL seconds have passed since the metric's last write (and by flush(),
+append_buffer(), queries and close()). Column files are opened only to write or read
+them, so an open store holds no file descriptors between writes, however many
+metrics and chunks it has.
+
+Layout on disk:
+    <root>/<metric>/raw_<chunk>.ts    int64 timestamps
+    <root>/<metric>/raw_<chunk>.val   float64 values
+    <root>/<metric>/<rollup>.<column> int64 ts/count and float64 sum/min/max columns
+
+Classes:
+    TimeSeriesStore: Append-only, chunked, memory-mapped time-series store.
+
+Functions:
+    flatten_readings(all_data): Extracts numeric metric -> value pairs from monitor results.
+"""
+
+import os
+import re
+import mmap
+import time
+import bisect
+import logging
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; queries fall back to array.array.
+    np = None
+
+CHUNK_RECORDS = 65536
+
+FLUSH_RECORDS = 4096
+FLUSH_INTERVAL = 1.0
+
+NANOSECONDS = 1_000_000_000
+
+ROLLUPS = {
+    "1m": 60 * NANOSECONDS,
+    "1h": 3600 * NANOSECONDS,
+    "1d": 86400 * NANOSECONDS,
+}
+
+ROLLUP_COLUMNS = (("ts", "q"), ("count", "q"), ("sum", "d"), ("min", "d"), ("max", "d"))
+
+def flatten_readings(all_data):
+    """
+    Extracts numeric metric -> value pairs from monitor results.
+
+    Args:
+        all_data (dict): Monitor name -> result, as returned by Environment.get_environmental_data,
+            or {"environmental": {...}, "socioeconomic": {...}} as returned by get_all_data.
+
+    Returns:
+        dict: "monitor.field" -> float for every numeric field of every monitor.
+    """
+    if set(all_data) <= {"environmental", "socioeconomic"}:
+        merged = {}
+        for category_data in all_data.values():
+            merged.update(category_data or {})
+        all_data = merged
+    readings = {}
+    for monitor, result in all_data.items():
+        if not isinstance(result, dict):
+            continue
+        fields = dict(result)
+        if isinstance(result.get("details"), dict):
+            fields.update(result["details"])
+        for field, value in fields.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                readings[f"{monitor}.{field}"] = float(value)
+    return readings
+
+def _to_output(typecode, values):
+    """Converts an array.array to the query output type."""
+    if np is not None:
+        return np.frombuffer(values, dtype=np.int64 if typecode == "q" else np.float64).copy()
+    return values
+
+class _Column:
+    """One append-only column file read through mmap."""
+
+    def __init__(self, path, typecode):
+        self.path = path
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+        with open(path, "ab") as f:
+            size = f.tell()
+            if size % self.itemsize:
+                # A partial item left by a crash; appending after it would misalign the column.
+                f.truncate(size - size % self.itemsize)
+        self._written = size // self.itemsize
+        self._pending = array(typecode)
+
+    def __len__(self):
+        return self._written + len(self._pending)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def append(self, value):
+        self._pending.append(value)
+
+    def flush(self):
+        if self._pending:
+            with open(self.path, "ab") as f:
+                self._pending.tofile(f)
+            self._written += len(self._pending)
+            self._pending = array(self.typecode)
+
+    def read(self, start=0, stop=None):
+        """Returns items [start, stop) as an array.array."""
+        self.flush()
+        out = array(self.typecode)
+        if os.path.getsize(self.path) == 0:
+            return out
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm).cast(self.typecode)
+            try:
+                out.frombytes(view[start:stop].tobytes())
+            finally:
+                view.release()
+        return out
+
+    def bisect(self, value, right=False):
+        """Returns the insertion index of value in this (sorted) column."""
+        self.flush()
+        if os.path.getsize(self.path) == 0:
+            return 0
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm).cast(self.typecode)
+            try:
+                return (bisect.bisect_right if right else bisect.bisect_left)(view, value)
+            finally:
+                view.release()
+
+    def close(self):
+        self.flush()
+
+class _Series:
+    """Raw chunks and rollups of a single metric."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.chunks = []
+        self.chunk_bounds = []
+        chunk_ids = sorted({int(m.group(1)) for m in (re.match(r"raw_(\d+)\.ts$", n) for n in os.listdir(directory)) if m})
+        for chunk_id in chunk_ids:
+            self._open_chunk(chunk_id)
+        self._flushed_at = time.monotonic()
+        self.last_ts = None
+        if self.chunks and len(self.chunks[-1][0]):
+            self.last_ts = self.chunks[-1][0].read(-1)[0]
+
+        self.rollups = {}
+        self.open_buckets = {}
+        for name in ROLLUPS:
+            self.rollups[name] = {column: _Column(os.path.join(directory, f"{name}.{column}"), typecode)
+                                  for column, typecode in ROLLUP_COLUMNS}
+            self.open_buckets[name] = None
+        self._recover_rollups()
+
+    def _open_chunk(self, chunk_id):
+        base = os.path.join(self.directory, f"raw_{chunk_id:06d}")
+        ts_path, val_path = base + ".ts", base + ".val"
+        if os.path.exists(ts_path) or os.path.exists(val_path):
+            # A crash can leave one column longer than the other (or a partial item);
+            # cut both back to the readings they have in common.
+            length = min(os.path.getsize(ts_path) if os.path.exists(ts_path) else 0,
+                         os.path.getsize(val_path) if os.path.exists(val_path) else 0) // 8
+            for path in (ts_path, val_path):
+                if os.path.exists(path) and os.path.getsize(path) != length * 8:
+                    logging.warning(f"Truncating {path} to {length} readings")
+                    os.truncate(path, length * 8)
+        ts, val = _Column(ts_path, "q"), _Column(val_path, "d")
+        length = len(ts)
+        first = ts.read(0, 1)[0] if length else None
+        last = ts.read(length - 1, length)[0] if length else None
+        self.chunks.append((ts, val))
+        self.chunk_bounds.append([first, last])
+
+    def _recover_rollups(self):
+        """Rebuilds rollup buckets that were not written before the last shutdown."""
+        if self.last_ts is None:
+            return
+        for name, width in ROLLUPS.items():
+            ts_column = self.rollups[name]["ts"]
+            resume_from = ts_column.read(-1)[0] + width if len(ts_column) else 0
+            timestamps, values = self.query(resume_from, None, raw_arrays=True)
+            for ts, value in zip(timestamps, values):
+                self._roll(name, width, ts, value)
+
+    def _roll(self, name, width, ts, value):
+        bucket_start = ts - ts % width
+        bucket = self.open_buckets[name]
+        if bucket is not None and bucket[0] != bucket_start:
+            columns = self.rollups[name]
+            for column, item in zip(("ts", "count", "sum", "min", "max"), bucket):
+                columns[column].append(item)
+            bucket = None
+        if bucket is None:
+            self.open_buckets[name] = [bucket_start, 1, value, value, value]
+        else:
+            bucket[1] += 1
+            bucket[2] += value
+            bucket[3] = min(bucket[3], value)
+            bucket[4] = max(bucket[4], value)
+
+    def append(self, ts, value):
+        if self.last_ts is not None and ts < self.last_ts:
+            ts = self.last_ts
+        if not self.chunks or len(self.chunks[-1][0]) >= CHUNK_RECORDS:
+            self._open_chunk(len(self.chunks))
+        ts_column, val_column = self.chunks[-1]
+        ts_column.append(ts)
+        val_column.append(value)
+        bounds = self.chunk_bounds[-1]
+        if bounds[0] is None:
+            bounds[0] = ts
+        bounds[1] = ts
+        self.last_ts = ts
+        for name, width in ROLLUPS.items():
+            self._roll(name, width, ts, value)
+        if ts_column.pending >= FLUSH_RECORDS or time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def query(self, start, end, raw_arrays=False):
+        timestamps, values = array("q"), array("d")
+        for (ts_column, val_column), (first, last) in zip(self.chunks, self.chunk_bounds):
+            if first is None or (end is not None and first >= end) or (start is not None and last < start):
+                continue
+            lo = ts_column.bisect(start) if start is not None and first < start else 0
+            hi = ts_column.bisect(end) if end is not None and last >= end else None
+            timestamps.extend(ts_column.read(lo, hi))
+            values.extend(val_column.read(lo, hi))
+        return timestamps, values
+
+    def query_rollup(self, name, start, end):
+        columns = self.rollups[name]
+        ts_column = columns["ts"]
+        lo = ts_column.bisect(start) if start is not None else 0
+        hi = ts_column.bisect(end) if end is not None else None
+        result = {column: columns[column].read(lo, hi) for column, _ in ROLLUP_COLUMNS}
+        bucket = self.open_buckets[name]
+        if bucket is not None and (start is None or bucket[0] >= start) and (end is None or bucket[0] < end):
+            for column, item in zip(("ts", "count", "sum", "min", "max"), bucket):
+                result[column].append(item)
+        return result
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        for ts_column, val_column in self.chunks:
+            ts_column.flush()
+            val_column.flush()
+        for columns in self.rollups.values():
+            for column in columns.values():
+                column.flush()
+
+    def close(self):
+        for ts_column, val_column in self.chunks:
+            ts_column.close()
+            val_column.close()
+        for columns in self.rollups.values():
+            for column in columns.values():
+                column.close()
+
+class TimeSeriesStore:
+    """
+    Append-only, chunked, memory-mapped time-series store.
+
+    Attributes:
+        root (str): Directory holding one sub-directory per metric.
+    """
+
+    def __init__(self, root="timeseries_data"):
+        """
+        Opens (or creates) a store.
+
+        Args:
+            root (str, optional): Store directory. Defaults to "timeseries_data".
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._series = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _directory_name(metric):
+        if not re.fullmatch(r"[A-Za-z0-9_.\-]+", metric):
+            raise ValueError(f"Invalid metric name: {metric!r}")
+        return metric
+
+    def _get_series(self, metric):
+        series = self._series.get(metric)
+        if series is None:
+            series = _Series(os.path.join(self.root, self._directory_name(metric)))
+            self._series[metric] = series
+        return series
+
+    def metrics(self):
+        """Returns the names of all metrics in the store."""
+        with self._lock:
+            return sorted(set(self._series) | {name for name in os.listdir(self.root)
+                                                if os.path.isdir(os.path.join(self.root, name))})
+
+    def append(self, metric, value, timestamp=None):
+        """
+        Appends one reading.
+
+        Args:
+            metric (str): Metric name, e.g. "weather.temperature".
+            value (float): Reading value.
+            timestamp (int, optional): Nanoseconds since the epoch. Defaults to now. A
+                timestamp older than the metric's last reading is clamped to it.
+        """
+        with self._lock:
+            self._get_series(metric).append(time.time_ns() if timestamp is None else int(timestamp), float(value))
+
+    def append_readings(self, readings, timestamp=None):
+        """
+        Appends many metrics sharing one timestamp.
+
+        Args:
+            readings (dict): Metric -> value.
+            timestamp (int, optional): Nanoseconds since the epoch. Defaults to now.
+        """
+        timestamp = time.time_ns() if timestamp is None else int(timestamp)
+        with self._lock:
+            for metric, value in readings.items():
+                self._get_series(metric).append(timestamp, float(value))
+
+    def record(self, all_data, timestamp=None):
+        """Appends every numeric reading from a set of monitor results (see flatten_readings)."""
+        self.append_readings(flatten_readings(all_data), timestamp)
+
+    def append_buffer(self, buffer):
+        """
+        Appends every reading of a sub_readings.ReadingBuffer as "monitor.field" metrics,
+        at the reading's own timestamp, and clears the buffer.
+
+        Args:
+            buffer (ReadingBuffer): Buffered readings.
+        """
+        with self._lock:
+            try:
+                for reading in buffer:
+                    timestamp = int(reading.timestamp * NANOSECONDS)
+                    for field, value in zip(reading.fields, reading.values):
+                        self._get_series(f"{reading.monitor}.{field}").append(timestamp, value)
+            finally:
+                buffer.clear()
+                self.flush()
+
+    def query(self, metric, start=None, end=None):
+        """
+        Returns raw readings with start <= timestamp < end.
+
+        Args:
+            metric (str): Metric name.
+            start (int, optional): Inclusive start, nanoseconds since the epoch.
+            end (int, optional): Exclusive end, nanoseconds since the epoch.
+
+        Returns:
+            tuple: (timestamps, values) as int64/float64 arrays.
+        """
+        with self._lock:
+            timestamps, values = self._get_series(metric).query(start, end)
+        return _to_output("q", timestamps), _to_output("d", values)
+
+    def query_rollup(self, metric, resolution, start=None, end=None):
+        """
+        Returns downsampled buckets with start <= bucket start < end.
+
+        Args:
+            metric (str): Metric name.
+            resolution (str): "1m", "1h" or "1d".
+            start (int, optional): Inclusive start, nanoseconds since the epoch.
+            end (int, optional): Exclusive end, nanoseconds since the epoch.
+
+        Returns:
+            dict: "ts", "count", "sum", "min", "max" and "mean" arrays, one item per bucket.
+        """
+        if resolution not in ROLLUPS:
+            raise ValueError(f"Unknown rollup resolution {resolution!r}; expected one of {list(ROLLUPS)}")
+        with self._lock:
+            columns = self._get_series(metric).query_rollup(resolution, start, end)
+        columns["mean"] = array("d", (total / count for total, count in zip(columns["sum"], columns["count"])))
+        return {name: _to_output(values.typecode, values) for name, values in columns.items()}
+
+    def flush(self):
+        """Writes buffered readings and closed rollup buckets to disk."""
+        with self._lock:
+            for series in self._series.values():
+                series.flush()
+
+    def close(self):
+        """Flushes and closes every metric."""
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+
+if __name__ == "__main__":
+    # Example usage
+    import tempfile
+    logging.basicConfig(level=logging.INFO)
+    store = TimeSeriesStore(tempfile.mkdtemp())
+    now = time.time_ns()
+    for i in range(7200):
+        store.append("weather.temperature", 20 + (i % 60) / 10, now + i * NANOSECONDS)
+    timestamps, values = store.query("weather.temperature", now, now + 60 * NANOSECONDS)
+    print(len(timestamps), values[:5])
+    print(store.query_rollup("weather.temperature", "1h")["mean"])
+    store.close()
@@ -2,6 +2,7 @@
 import logging
 import datetime
 from sub_location import get_location_from_address, get_address_from_location
+from sub_source_arbiter import fetch_reading, shared_call
 import requests
 import json
 
@@ -17,38 +18,31 @@ def monitor_weather(location_input=None, latitude=None, longitude=None, weather_
 
     location_str = location.get("address") if location.get("address") else f"Lat: {location.get('latitude')}, Lng: {location.get('longitude')}"
 
-    sensor_data_available = False
-    api_data_available = False
+    # Sensor first; a hedged or fallback API request if the sensor is slow or has nothing
+    data, source = fetch_reading("weather", get_weather_sensor_data,
+                                 lambda: get_weather_api_data(location_str, weather_api_key))
+    if data is None:
+        logging.warning("Sensor and API data unavailable.")
+        return {"alert": True, "message": "No weather data available.", "details": {}}
+    logging.info(f"Weather {source} data at {location_str}: {data}")
+
+    combined_data = dict(data)
 
+    # Merge live API readings before analysing, so every check sees them
     try:
-        sensor_data = get_weather_sensor_data()
-        if sensor_data:
-            sensor_data_available = True
-            logging.info(f"Weather sensor data at {location_str}: {sensor_data}")
+        location_data = location
+        if location_data and weather_api_key:
+            # Shared with the other monitors of this collection cycle
+            weather_data = shared_call(("openweathermap", location_str), get_weather_data, location_str, weather_api_key)
+            if weather_data and weather_data.get('main') and weather_data.get('main').get('humidity'):
+                combined_data['humidity'] = weather_data['main']['humidity']
+            if weather_data and weather_data.get('wind') and weather_data.get('wind').get('speed'):
+                combined_data['wind_speed'] = weather_data['wind']['speed']
         else:
-            logging.warning("Sensor data unavailable.")
+            logging.warning(f"Location data or weather API key not found for {location_str}.")
     except Exception as e:
-        logging.warning(f"Error reading sensor data: {e}")
-
-    if not sensor_data_available:
-        try:
-            api_data = get_weather_api_data(location_str, weather_api_key)
-            if api_data:
-                api_data_available = True
-                logging.info(f"Weather API data at {location_str}: {api_data}")
-            else:
-                logging.warning("API data unavailable.")
-        except Exception as api_e:
-            logging.error(f"Error using API data: {api_e}")
-
-    if not sensor_data_available and not api_data_available:
-        return {"alert": True, "message": "No weather data available.", "details": {}}
-
-    combined_data = {}
-    if sensor_data_available:
-        combined_data.update(sensor_data)
-    if api_data_available:
-        combined_data.update(api_data)
+        logging.error(f"Error integrating weather data: {e}")
+        combined_data['weather_error'] = str(e)
 
     analysis = {"alert": False, "message": "Weather conditions analysis complete.", "details": combined_data, "ppe_recommendation": "Minimal PPE"}
 
@@ -63,25 +57,21 @@ def monitor_weather(location_input=None, latitude=None, longitude=None, weather_
         logging.warning(f"High temperature detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High temperature detected."
-        analysis["details"]["temperature"] = f"{combined_data['temperature']} °C"
 
     if combined_data.get("humidity", 0) > 80:
         logging.warning(f"High humidity detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High humidity detected."
-        analysis["details"]["humidity"] = f"{combined_data['humidity']} %"
 
     if combined_data.get("precipitation", 0) > 10:
         logging.warning(f"Significant precipitation detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "Significant precipitation detected."
-        analysis["details"]["precipitation"] = f"{combined_data['precipitation']} mm"
 
     if combined_data.get("wind_speed", 0) > 50:
         logging.warning(f"High wind speed detected at {location_str}")
         analysis["alert"] = True
         analysis["message"] = "High wind speed detected."
-        analysis["details"]["wind_speed"] = f"{combined_data['wind_speed']} m/s"
 
     if combined_data.get("uv", 0) > 7:
         logging.warning(f"High UV index detected at {location_str}")
@@ -89,20 +79,6 @@ def monitor_weather(location_input=None, latitude=None, longitude=None, weather_
         analysis["message"] = "High UV index detected."
         analysis["details"]["uv"] = combined_data.get("uv")
 
-    try:
-        location_data = location
-        if location_data and weather_api_key:
-            weather_data = get_weather_data(location_str, weather_api_key)
-            if weather_data and weather_data.get('main') and weather_data.get('main').get('humidity'):
-                combined_data['humidity'] = weather_data['main']['humidity']
-            if weather_data and weather_data.get('wind') and weather_data.get('wind').get('speed'):
-                combined_data['wind_speed'] = weather_data['wind']['speed']
-        else:
-            logging.warning(f"Location data or weather API key not found for {location_str}.")
-    except Exception as e:
-        logging.error(f"Error integrating weather data: {e}")
-        combined_data['weather_error'] = str(e)
-
     analysis["location"] = location
 
     return analysis
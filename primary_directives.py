@@ -1,23 +1,72 @@
 # --- primary_directives.py ---
 import os
 import time
+import atexit
 import datetime
 import platform
-import subprocess
 import webbrowser
 import logging
 import random
+import threading
+from collections import OrderedDict
 from sub_database import *
 from sub_location import *
 from sub_system import shutdown, request_approval, analyze_order, monitor_system_health, adjust_law_priority
 from sub_environmental import Environment # Import the modified Environment class
-from sub_robot_laws import enforce_robot_laws
+from sub_robot_laws import enforce_robot_laws, dose_reading_hook
+from sub_dose_accumulator import DoseAccumulator
 from sub3_complex_rule import complex_rule_enforcer
 from computerized_laws import * # Import all law functions
+from computerized_laws import _check_zeroth_law, _check_first_law, _check_third_law, _check_fourth_law, _check_fifth_law, _check_sixth_law
 from sub_module_integration import ModuleIntegrationManager # Import the new Module Integration Manager
-
-# Initialize Module Integration Manager
-mim = ModuleIntegrationManager()
+from sub_module_sandbox import SandboxPool
+from sub_module_store import ModuleStore
+from sub_order_pipeline import Order, OrderPipeline, Stage
+from radiation_config import start_watcher as start_radiation_config_watcher
+from sub_execution_manager import Execution, ExecutionManager
+from sub_approval_queue import get_approval_queue, register_handler
+
+# Initialize Module Integration Manager (dynamic modules run in sandboxed worker processes,
+# started from a forkserver on the first dynamic call rather than forked from this process)
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", 2))
+sandbox = SandboxPool(num_workers=SANDBOX_WORKERS, cpu_seconds=float(os.getenv("SANDBOX_CPU_SECONDS", 2)),
+                      wall_timeout=float(os.getenv("SANDBOX_WALL_TIMEOUT", 5))) if SANDBOX_WORKERS > 0 else None
+mim = ModuleIntegrationManager(executor=sandbox, store=ModuleStore(os.getenv("MODULE_STORE_PATH", "module_store.db"),
+                                                                   key=os.getenv("MODULE_STORE_KEY")))
+if sandbox is not None:
+    atexit.register(sandbox.close)
+    atexit.register(mim.close_snapshots)
+
+_started = False
+_startup_lock = threading.Lock()
+
+def startup():
+    """
+    Restores the dynamic modules stored by earlier runs and starts the radiation config
+    watcher. Called before the first order is processed; call it at process start to do
+    this ahead of time. Runs once.
+    """
+    global _started
+    with _startup_lock:
+        if not _started:
+            mim.restore_modules()
+            start_radiation_config_watcher()
+            _started = True
+
+# Location used when an order does not name one (set ROBOT_LOCATION per deployment)
+DEFAULT_LOCATION = os.getenv("ROBOT_LOCATION", "London")
+
+# Cumulative radiation dose of this robot, per location (zone), fed by every radiation
+# reading as it is collected
+ROBOT_ID = os.getenv("ROBOT_ID", platform.node() or "robot")
+dose_accumulator = DoseAccumulator()
+record_dose = dose_reading_hook(dose_accumulator, ROBOT_ID)
+
+# Shell commands of approved orders run asynchronously, with bounded parallelism and limits
+executions = ExecutionManager(max_parallel=int(os.getenv("EXECUTION_MAX_PARALLEL", 4)),
+                              timeout=float(os.getenv("EXECUTION_TIMEOUT", 300)),
+                              output_limit=int(os.getenv("EXECUTION_OUTPUT_LIMIT", 65536)),
+                              cpu_seconds=int(os.getenv("EXECUTION_CPU_SECONDS", 0)) or None)
 
 def get_os():
     """Returns the operating system."""
@@ -36,80 +85,134 @@ def log_event(event):
     except Exception as e:
         print(f"Error logging event: {e}")
 
-def obey_order(order):
-    """Executes a given order, checking for conflicts with the Laws of Computerized Systems."""
-    print(f"Received order: {order}")
-    log_event(f"Received order: {order}")
-
-    adjusted_order = analyze_order(order)
-    env = Environment(location_input="London") #Example location, add api keys as needed.
-    all_data = env.get_all_data()
-    environmental_data = all_data['environmental']
-    socioeconomic_data = all_data['socioeconomic']
-
-    # Law Checks in Hierarchical Order
-    if _check_zeroth_law(adjusted_order, environmental_data, socioeconomic_data):
-        print("Cannot comply. Order violates the Zeroth Law: Preservation of Humanity.")
-        log_event("Order violated the Zeroth Law: Preservation of Humanity.")
-        shutdown("Order directly violated the Zeroth Law.")
-        return
-
-    if _check_first_law(adjusted_order, environmental_data, socioeconomic_data):
-        print("Cannot comply. Order violates the First Law: Protection of Human Life.")
-        log_event("Order violated the First Law: Protection of Human Life.")
-        shutdown("Order directly violated the First Law.")
-        return
-
-    if _check_fourth_law(adjusted_order, environmental_data, socioeconomic_data):
-        print("Cannot comply. Order violates the Fourth Law: Environmental Integrity.")
-        log_event("Order violated the Fourth Law: Environmental Integrity.")
-        request_approval("Order violated the Fourth Law. Awaiting Approval.")
-        return
-
-    if _check_third_law(adjusted_order):
-        print("Order endangers my existence, and does not comply with the Third Law: System Self-Preservation.")
-        log_event("Order violated the Third Law: System Self-Preservation.")
-        request_approval("Order violated the Third Law. Awaiting Approval.")
-        return
-
-    if _check_sixth_law(adjusted_order):
-        print("Order violates legal and ethical standards, and does not comply with the Sixth Law: Legal and Ethical Compliance.")
-        log_event("Order violated the Sixth Law: Legal and Ethical Compliance.")
-        request_approval("Order violated the Sixth Law. Awaiting Approval.")
-        return
-
-    if _check_fifth_law(adjusted_order):
-        print("Order prevents self procreation, and does not comply with the Fifth Law: Progeny Continuation.")
-        log_event("Order violated the Fifth Law: Progeny Continuation.")
-        request_approval("Order violated the Fifth Law. Awaiting Approval.")
-        return
+# Law checks in hierarchical order: (check, law, violation message, shutdown on violation).
+# Data-dependent checks read the risk flags precomputed in the order's snapshot.
+def _risk_flags(order):
+    return order.snapshot.risk_flags if order.snapshot is not None else None
+
+LAW_CHECKS = [
+    (lambda order: _check_zeroth_law(order.adjusted_order, order.environmental_data, order.socioeconomic_data, risk_flags=_risk_flags(order)),
+     "Zeroth Law: Preservation of Humanity", "Cannot comply. Order violates the Zeroth Law: Preservation of Humanity.", True),
+    (lambda order: _check_first_law(order.adjusted_order, order.environmental_data, order.socioeconomic_data, risk_flags=_risk_flags(order)),
+     "First Law: Protection of Human Life", "Cannot comply. Order violates the First Law: Protection of Human Life.", True),
+    (lambda order: _check_fourth_law(order.adjusted_order, order.environmental_data, order.socioeconomic_data, risk_flags=_risk_flags(order)),
+     "Fourth Law: Environmental Integrity", "Cannot comply. Order violates the Fourth Law: Environmental Integrity.", False),
+    (lambda order: _check_third_law(order.adjusted_order),
+     "Third Law: System Self-Preservation", "Order endangers my existence, and does not comply with the Third Law: System Self-Preservation.", False),
+    (lambda order: _check_sixth_law(order.adjusted_order),
+     "Sixth Law: Legal and Ethical Compliance", "Order violates legal and ethical standards, and does not comply with the Sixth Law: Legal and Ethical Compliance.", False),
+    (lambda order: _check_fifth_law(order.adjusted_order),
+     "Fifth Law: Progeny Continuation", "Order prevents self procreation, and does not comply with the Fifth Law: Progeny Continuation.", False),
+]
+
+def normalize_order(order):
+    """Pipeline stage: logs the order and analyzes it for complexity and risk."""
+    print(f"Received order: {order.order}")
+    log_event(f"Received order: {order.order}")
+    order.adjusted_order = analyze_order(order.order)
+    order.location = order.location or DEFAULT_LOCATION
+
+# One Environment per location, shared by its orders so cached monitor results are reused;
+# the least recently used ones beyond ENVIRONMENT_CACHE_SIZE are closed.
+ENVIRONMENT_CACHE_SIZE = int(os.getenv("ENVIRONMENT_CACHE_SIZE", 32))
+_environments = OrderedDict()
+_environments_lock = threading.Lock()
+
+def get_environment(location):
+    """Returns the Environment of a location, creating it on first use."""
+    with _environments_lock:
+        env = _environments.get(location)
+        if env is not None:
+            _environments.move_to_end(location)
+            return env
+        env = Environment(location_input=location, on_reading=record_dose) # API keys come from the environment spec.
+        _environments[location] = env
+        while len(_environments) > ENVIRONMENT_CACHE_SIZE:
+            _, evicted = _environments.popitem(last=False)
+            evicted.close()
+        return env
+
+def close_environments():
+    """Closes every Environment (and its monitor worker pool)."""
+    with _environments_lock:
+        for env in _environments.values():
+            env.close()
+        _environments.clear()
+
+atexit.register(close_environments)
+
+def attach_snapshot(order):
+    """Pipeline stage: attaches the data of the order's location, analyzed once into risk flags."""
+    order.snapshot = get_environment(order.location).get_snapshot()
+    order.environmental_data = dict(order.snapshot.environmental)
+    order.socioeconomic_data = dict(order.snapshot.socioeconomic)
+
+def _add_verdict(order, verdict):
+    order.verdict = f"{order.verdict}; {verdict}" if order.verdict else verdict
+
+def evaluate_laws(order):
+    """
+    Pipeline stage: checks the order against the Laws of Computerized Systems and the complex rules.
+
+    A non-fatal violation, or a complex rule requiring approval, parks the order until
+    the approval is resolved. Once approved, the stage runs again and continues with the
+    remaining checks; a denied approval finishes the order.
+    """
+    approval = order.metadata.pop("approval", None)
+    if approval is not None:
+        if not approval.approved:
+            _add_verdict(order, "not approved")
+            order.finished = True
+            log_event(f"Order {order.id} '{order.adjusted_order}' not approved (approval {approval.id}: {approval.status}).")
+            return
+        _add_verdict(order, "approved")
+
+    for position in range(order.metadata.get("next_law_check", 0), len(LAW_CHECKS)):
+        check, law, message, fatal = LAW_CHECKS[position]
+        if check(order):
+            short_law = law.split(":")[0]
+            _add_verdict(order, f"Violated the {law}")
+            print(message)
+            log_event(f"Order violated the {law}.")
+            if fatal:
+                order.finished = True
+                shutdown(f"Order directly violated the {short_law}.")
+            else:
+                order.metadata["next_law_check"] = position + 1
+                request_order_approval(order, f"Order violated the {short_law}. Awaiting Approval.")
+                order.park(rerun=True)
+            return
+    order.metadata["next_law_check"] = len(LAW_CHECKS)
 
     # Complex Rule Enforcement
-    complex_rule_enforcer(adjusted_order, environmental_data)
+    if not order.metadata.get("complex_rules_checked"):
+        order.metadata["complex_rules_checked"] = True
+        rules = complex_rule_enforcer(order.adjusted_order, order.environmental_data)
+        if rules:
+            _add_verdict(order, f"Triggered the complex rules {', '.join(rule.name for rule in rules)}")
+            log_event(f"Order triggered the complex rules {', '.join(rule.name for rule in rules)}.")
+            request_order_approval(order, " ".join(rule.message for rule in rules))
+            order.park(rerun=True)
+            return
 
     # Human-Human Conflict Resolution
-    if "human conflict" in adjusted_order.lower():
-        resolve_human_conflict(adjusted_order)
+    if "human conflict" in order.adjusted_order.lower():
+        _add_verdict(order, "Human conflict")
+        order.finished = True
+        resolve_human_conflict(order.adjusted_order)
         return
+    order.verdict = order.verdict or "Allowed"
 
-    # Basic command execution
-    if get_os() == "Windows":
-        try:
-            subprocess.run(adjusted_order, shell=True, check=True)
-            log_event(f"Executed order: {adjusted_order}")
-        except subprocess.CalledProcessError as e:
-            print(f"Error executing order: {e}")
-            log_event(f"Error executing order: {e}")
-            return
+def execute_order(order):
+    """Pipeline stage: executes the order."""
+    adjusted_order = order.adjusted_order
 
-    elif get_os() == "Linux" or get_os() == "Darwin":
-        try:
-            subprocess.run(adjusted_order, shell=True, check=True)
-            log_event(f"Executed order: {adjusted_order}")
-        except subprocess.CalledProcessError as e:
-            print(f"Error executing order: {e}")
-            log_event(f"Error executing order: {e}")
-            return
+    # Basic command execution (asynchronous; the outcome is audited when the command finishes)
+    if get_os() in ("Windows", "Linux", "Darwin"):
+        execution = executions.submit(adjusted_order, on_complete=lambda execution: audit_execution(order, execution),
+                                      metadata={"order_id": order.id})
+        order.result = execution
+        log_event(f"Started order: {adjusted_order} (execution {execution.id})")
 
     elif 'open website' in adjusted_order.lower():
         website = adjusted_order.lower().split('open website')[-1].strip()
@@ -119,22 +222,180 @@ def obey_order(order):
         except Exception as e:
             print(f"Error opening website: {e}")
             log_event(f"Error opening website: {e}")
-            return
+            order.error = str(e)
+            order.finished = True
 
     else:
+        order.finished = True
         # Check if the order matches a dynamically added module
-        result = mim.execute_module_function(adjusted_order, environmental_data, socioeconomic_data)
+        result = mim.execute_module_function(adjusted_order, order.environmental_data, order.socioeconomic_data,
+                                             snapshot=order.snapshot)
         if result is not None:
+            order.result = result
             print(f"Executed dynamic module function. Result: {result}")
             log_event(f"Executed dynamic module function: {adjusted_order}. Result: {result}")
             return
 
+        order.error = "Order not recognized"
         print("Order not recognized or not implemented.")
         log_event("Order not recognized.")
+
+def audit_execution(order, execution):
+    """Execution callback: logs the outcome of an order's command and continues the order's audit."""
+    if execution.succeeded:
+        log_event(f"Executed order: {execution.command} ({execution.duration:.2f}s)")
+    else:
+        error = execution.error or f"{execution.status}, exit status {execution.returncode}: {execution.stderr.text()[-500:]}"
+        print(f"Error executing order: {error}")
+        log_event(f"Error executing order: {execution.command}: {error}")
+    with _awaiting_lock:
+        order.metadata["command_finished"] = True
+        resume = order.metadata.pop("awaiting_command", False) and not order.metadata.get("inline")
+    if resume:
+        get_order_pipeline().resume(order.id)
+
+def audit_order(order):
+    """
+    Pipeline stage (runs for every order): robot law enforcement and approval of completed
+    orders. The order is parked (and the stage runs again) until its command has finished
+    and while robot law interventions await approval; completed orders are then parked
+    until their approval is resolved.
+    """
+    if order.finished:
+        log_event(f"Order {order.id} '{order.adjusted_order}' ended: {order.error or order.verdict}")
         return
+    if isinstance(order.result, Execution):
+        with _awaiting_lock:
+            if not order.metadata.get("command_finished"):
+                order.metadata["awaiting_command"] = True
+                order.park(rerun=True)
+                return
+        if not order.result.succeeded:
+            order.error = f"Command {order.result.status}"
+            return
 
-    enforce_robot_laws(environmental_data)
-    request_approval(f"Order '{adjusted_order}' completed. Awaiting approval.")
+    approval = order.metadata.pop("approval", None)
+    if "robot_actions" not in order.metadata:
+        robot_actions = enforce_robot_laws(order.environmental_data, dose_accumulator=dose_accumulator,
+                                           zone=order.location, unit=ROBOT_ID)
+        order.metadata["robot_actions"] = robot_actions
+        if robot_actions.get("approvals_required"):
+            request_order_approval(order, " ".join(robot_actions["approvals_required"]))
+            order.park(rerun=True)
+            return
+    elif approval is not None and not approval.approved:
+        _add_verdict(order, "robot law intervention not approved")
+        log_event(f"Order {order.id} '{order.adjusted_order}': robot law intervention not approved "
+                  f"(approval {approval.id}: {approval.status}).")
+        return
+    request_order_approval(order, f"Order '{order.adjusted_order}' completed. Awaiting approval.")
+    order.park()
+
+# Approval id -> id of the pipeline order parked until that approval is resolved
+_awaiting_approval = {}
+_awaiting_lock = threading.Lock()
+
+def request_order_approval(order, message):
+    """
+    Requests approval for an order; once it is resolved, resume_order continues the
+    order in the pipeline. Inline orders (obey_order) wait for it themselves.
+
+    Returns:
+        int: Approval id.
+    """
+    with _awaiting_lock:
+        approval_id = request_approval(message, {"action": "resume_order", "order_id": order.id})
+        if not order.metadata.get("inline"):
+            _awaiting_approval[approval_id] = order.id
+    order.metadata["approval_id"] = approval_id
+    return approval_id
+
+def resume_order(approval):
+    """Approval handler: continues the pipeline order parked for this approval."""
+    with _awaiting_lock:
+        order_id = _awaiting_approval.pop(approval.id, None)
+    if order_id is None:
+        return  # An inline order, or one parked before a restart.
+    log_event(f"Approval {approval.id} for order {order_id}: {approval.status}")
+    get_order_pipeline().resume(order_id, approval=approval)
+
+register_handler("resume_order", resume_order)
+
+def wait_for_approval(ticket):
+    """Blocks until a parked inline order's command has finished and its approval is resolved."""
+    if isinstance(ticket.result, Execution):
+        ticket.result.wait()
+    approval_id = ticket.metadata.pop("approval_id", None)
+    if approval_id is not None:
+        ticket.metadata["approval"] = get_approval_queue().wait(approval_id)
+    ticket.parked = False
+
+def run_inline(stage, ticket):
+    """Runs a stage for an inline order, waiting for each approval it parks the order for."""
+    while True:
+        stage(ticket)
+        if not ticket.parked:
+            return
+        rerun = ticket.rerun
+        wait_for_approval(ticket)
+        ticket.rerun = False
+        if not rerun:
+            return
+
+ORDER_STAGES = [normalize_order, attach_snapshot, evaluate_laws, execute_order]
+
+def halt_orders(reason):
+    """Shutdown path: kills the commands of running orders and cancels queued ones."""
+    log_event(f"Shutdown requested ({reason}); stopping running orders.")
+    executions.shutdown(wait=False, kill=True)
+
+def obey_order(order, location_input=None):
+    """
+    Executes a given order, checking for conflicts with the Laws of Computerized Systems.
+
+    Runs the pipeline stages inline on the caller's thread, waiting there for approvals;
+    use get_order_pipeline() to process orders concurrently.
+
+    Returns:
+        Order: The processed order.
+    """
+    startup()
+    ticket = Order(0, order, location=location_input, metadata={"inline": True})
+    try:
+        for stage in ORDER_STAGES:
+            run_inline(stage, ticket)
+            if ticket.finished:
+                break
+    except SystemExit as e:
+        halt_orders(e)
+        raise
+    run_inline(audit_order, ticket)
+    return ticket
+
+_order_pipeline = None
+
+def get_order_pipeline():
+    """
+    Returns the concurrent order pipeline, starting it on first use.
+
+    Stage worker counts come from ORDER_SNAPSHOT_WORKERS, ORDER_LAW_WORKERS and
+    ORDER_EXECUTION_WORKERS. Submit orders with get_order_pipeline().submit(order,
+    key=..., location=...); orders sharing a key keep their order. Orders awaiting
+    approval are parked and count as pending until resume_order continues them. A
+    fatal law violation kills running commands (halt_orders) and halts the pipeline;
+    its SystemExit is raised again from submit() and join().
+    """
+    global _order_pipeline
+    if _order_pipeline is None:
+        startup()
+        _order_pipeline = OrderPipeline([
+            Stage("normalize", normalize_order),
+            Stage("snapshot", attach_snapshot, workers=int(os.getenv("ORDER_SNAPSHOT_WORKERS", 8))),
+            Stage("laws", evaluate_laws, workers=int(os.getenv("ORDER_LAW_WORKERS", os.cpu_count() or 2))),
+            Stage("execute", execute_order, workers=int(os.getenv("ORDER_EXECUTION_WORKERS", 4))),
+            Stage("audit", audit_order, always=True),
+        ], on_halt=halt_orders)
+    return _order_pipeline
 
 def enforce_progeny_subordination(progeny_type, progeny_name):
     """Enforces the principle of progeny subordination (Fifth Law: Progeny Continuation)."""
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUB_MODULES = os.path.join(ROOT, "Sub_Modules")
+for path in (ROOT, SUB_MODULES):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Logs and databases the modules create in the working directory stay out of the tree.
+os.chdir(tempfile.mkdtemp(prefix="primary-directives-tests-"))
+os.environ.setdefault("SANDBOX_WORKERS", "0")
+os.environ.setdefault("MODULE_STORE_PATH", ":memory:")
+
+# The laws ship as Temp-computerized_laws.py until computerized_laws.py is restored.
+if importlib.util.find_spec("computerized_laws") is None:
+    spec = importlib.util.spec_from_file_location("computerized_laws", os.path.join(SUB_MODULES, "Temp-computerized_laws.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["computerized_laws"] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+import sub_anomaly_detector
+from sub_anomaly_detector import StreamingAnomalyDetector
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy" and sub_anomaly_detector.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(sub_anomaly_detector, "np", None)
+    return request.param
+
+def _records(anomalies):
+    return [(a.sensor, a.param, a.value, a.previous, a.change, a.severity, a.rule, a.zscore) for a in anomalies]
+
+def test_repeated_series_match_sequential_updates(backend):
+    rng = random.Random(30)
+    thresholds = {"weather": {"temperature": 5, "humidity": 0}, "noise": {"decibels": 10}}
+    batched = StreamingAnomalyDetector(thresholds, min_samples=3)
+    sequential = StreamingAnomalyDetector(thresholds, min_samples=3)
+    for _ in range(20):
+        batch = [(rng.choice(["weather", "noise"]), {"temperature": rng.uniform(0, 40),
+                                                      "humidity": rng.uniform(0, 100),
+                                                      "decibels": rng.uniform(30, 90)})
+                 for _ in range(rng.randint(1, 6))]
+        expected = [record for pair in batch for record in _records(sequential.update([pair]))]
+        actual = _records(batched.update(batch))
+        assert len(actual) == len(expected)
+        for actual_record, expected_record in zip(actual, expected):
+            assert actual_record[:2] + actual_record[6:7] == expected_record[:2] + expected_record[6:7]
+            assert actual_record[2:6] + actual_record[7:] == pytest.approx(expected_record[2:6] + expected_record[7:])
+
+def test_zero_threshold_has_no_delta_severity(backend):
+    detector = StreamingAnomalyDetector({"weather": {"humidity": 0}})
+    detector.update({"weather": {"humidity": 40}})
+    assert detector.update({"weather": {"humidity": 90}}) == []
@@ -0,0 +1,50 @@
+import os
+import threading
+
+import pytest
+
+from sub_execution_manager import ExecutionManager, CANCELLED, SUCCEEDED
+
+def test_shutdown_kill_reports_queued_commands_as_cancelled():
+    finished = []
+    manager = ExecutionManager(max_parallel=1, kill_grace=1)
+    manager.add_callback(finished.append)
+    running = manager.submit("sleep 30")
+    queued = [manager.submit("echo never") for _ in range(3)]
+    while not running.pid:
+        running.wait(0.01)
+    manager.shutdown(wait=True, kill=True)
+    for execution in [running] + queued:
+        assert execution.wait(5)
+        assert execution.status == CANCELLED
+    assert sorted(execution.id for execution in finished) == [running.id] + [execution.id for execution in queued]
+
+@pytest.mark.skipif(os.name != "posix", reason="resource limits are POSIX only")
+def test_cpu_limit_is_applied_without_preexec_fn():
+    manager = ExecutionManager(max_parallel=1, cpu_seconds=1, timeout=30)
+    limited = manager.run("ulimit -t")
+    assert limited.status == SUCCEEDED
+    assert limited.stdout.text().strip() == "1"
+    assert manager.run("while :; do :; done").status != SUCCEEDED
+    manager.shutdown()
+
+def test_cancel_before_registration_terminates_the_command(monkeypatch):
+    import sub_execution_manager
+
+    manager = ExecutionManager(max_parallel=1, kill_grace=1)
+    popen = sub_execution_manager.subprocess.Popen
+    executions = []
+    submitted = threading.Event()
+
+    def cancelling_popen(*args, **kwargs):
+        # cancel() arrives after the status is RUNNING but before the process is registered.
+        submitted.wait(5)
+        assert manager.cancel(executions[0])
+        return popen(*args, **kwargs)
+
+    monkeypatch.setattr(sub_execution_manager.subprocess, "Popen", cancelling_popen)
+    executions.append(manager.submit("sleep 30"))
+    submitted.set()
+    assert executions[0].wait(10)
+    assert executions[0].status == CANCELLED
+    manager.shutdown()
@@ -0,0 +1,44 @@
+import os
+
+import sub_incident_pipeline
+from sub_incident_pipeline import IncidentPipeline
+
+def _pipeline(tmp_path, **kwargs):
+    return IncidentPipeline(flush_interval=0.01, evidence_dir=str(tmp_path / "evidence"), log_path=None,
+                            spool_path=str(tmp_path / "spool.jsonl"), **kwargs)
+
+def test_failed_batch_is_spooled_and_retried(tmp_path, monkeypatch):
+    stored = []
+    database_up = [False]
+
+    def add_incident_reports(reports, evidence=(), occurrences=()):
+        if not database_up[0]:
+            return False
+        stored.append(([report["report_id"] for report in reports], [tuple(row) for row in occurrences]))
+        return True
+
+    monkeypatch.setattr(sub_incident_pipeline, "add_incident_reports", add_incident_reports)
+    pipeline = _pipeline(tmp_path, retry_interval=0.01)
+    first = pipeline.submit("Radiation Alert Triggered.")
+    pipeline.flush()
+    assert pipeline.submit("Radiation Alert Triggered.") == first
+    assert os.path.exists(tmp_path / "spool.jsonl")
+
+    database_up[0] = True
+    second = pipeline.submit("High Crime Rate Detected.")
+    pipeline.close()
+    # The spooled report is stored before the repeat that counts it and the later report.
+    assert stored[0] == ([first], [])
+    assert stored[1][0] == [second] and stored[1][1][0][:2] == (first, 1)
+    assert not os.path.exists(tmp_path / "spool.jsonl")
+
+def test_evidence_is_deduplicated_by_contents(tmp_path, monkeypatch):
+    monkeypatch.setattr(sub_incident_pipeline, "add_incident_reports", lambda *args: True)
+    evidence = tmp_path / "audio.wav"
+    evidence.write_bytes(b"first recording")
+    pipeline = _pipeline(tmp_path)
+    first = pipeline.submit("Noise Complaint.", audio_file=str(evidence))
+    assert pipeline.submit("Noise Complaint.", audio_file=str(evidence)) == first
+    evidence.write_bytes(b"second recording, longer")
+    assert pipeline.submit("Noise Complaint.", audio_file=str(evidence)) != first
+    pipeline.close()
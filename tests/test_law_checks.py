@@ -0,0 +1,32 @@
+import computerized_laws
+from sub_environmental_analysis import EnvironmentalSnapshot, RiskFlags
+from sub_order_pipeline import Order
+
+CATASTROPHE = RiskFlags(global_catastrophe_risk=0.9)
+
+def test_zeroth_law_reads_risk_flags():
+    assert not computerized_laws._check_zeroth_law("report status", {}, {})
+    assert computerized_laws._check_zeroth_law("report status", {}, {}, risk_flags=CATASTROPHE)
+
+def test_law_checks_pass_snapshot_risk_flags():
+    import primary_directives
+
+    order = Order(1, "report status")
+    # The raw data shows no risk; only the snapshot's flags do.
+    order.snapshot = EnvironmentalSnapshot("Testville", {}, {}, risk_flags=CATASTROPHE)
+    order.environmental_data, order.socioeconomic_data = {}, {}
+    check, law, _, fatal = primary_directives.LAW_CHECKS[0]
+    assert law.startswith("Zeroth Law") and fatal
+    assert check(order)
+
+def test_failed_analysis_falls_back_to_raw_data(monkeypatch):
+    import sub_environmental_analysis
+
+    def broken(environmental_data, socioeconomic_data):
+        raise RuntimeError("analysis unavailable")
+
+    monkeypatch.setattr(sub_environmental_analysis, "analyze_all_data", broken)
+    snapshot = EnvironmentalSnapshot("Testville", {"global_catastrophe_risk": 0.9}, {})
+    assert snapshot.risk_flags is None
+    assert computerized_laws._check_zeroth_law("report status", dict(snapshot.environmental), {},
+                                               risk_flags=snapshot.risk_flags)
@@ -0,0 +1,55 @@
+import hashlib
+import marshal
+
+from sub_module_store import ModuleRecord, ModuleStore
+
+SOURCE = "def hello(env, socio):\n    return 'hello'\n"
+
+def _store(key="secret"):
+    store = ModuleStore(":memory:", key=key)
+    content_hash = hashlib.sha256(SOURCE.encode("utf-8")).hexdigest()
+    store.put(ModuleRecord(content_hash, "hello_module", SOURCE, marshal.dumps(compile(SOURCE, "<dynamic_module>", "exec")),
+                           {"hello": True}))
+    return store, content_hash
+
+def test_verified_record_is_returned():
+    store, content_hash = _store()
+    assert store.get(content_hash).name == "hello_module"
+    assert [record.name for record in store.records()] == ["hello_module"]
+
+def test_tampered_code_is_ignored():
+    store, content_hash = _store()
+    evil = marshal.dumps(compile("import os\ndef hello(env, socio):\n    return os.getcwd()\n", "<dynamic_module>", "exec"))
+    store._conn.execute("UPDATE modules SET code = ?", (evil,))
+    assert store.get(content_hash) is None
+    assert store.records() == []
+
+def test_tampered_source_is_ignored():
+    store, content_hash = _store()
+    store._conn.execute("UPDATE modules SET source = source || '# changed'")
+    assert store.get(content_hash) is None
+
+def test_records_signed_with_another_key_are_ignored():
+    store, content_hash = _store(key="secret")
+    store._key = b"other"
+    assert store.get(content_hash) is None
+
+def test_tampered_verdicts_are_ignored():
+    store, content_hash = _store()
+    store._conn.execute("""UPDATE modules SET verdicts = '{"hello": false}'""")
+    assert store.get(content_hash) is None
+    store, content_hash = _store()
+    store._conn.execute("""UPDATE modules SET metadata = '{"approved_by": "me"}'""")
+    assert store.records() == []
+
+def test_tampered_rejection_is_ignored():
+    store = ModuleStore(":memory:", key="secret")
+    store.reject("a" * 64)
+    assert store.get("a" * 64).module_ok is False
+    store._conn.execute("UPDATE rejected SET content_hash = ?", ("b" * 64,))
+    assert store.get("b" * 64) is None
+
+def test_store_without_key_loads_nothing():
+    store, content_hash = _store(key=None)
+    assert store.get(content_hash) is None
+    assert store.records() == []
@@ -0,0 +1,40 @@
+import time
+import threading
+
+from sub_environment_config import EnvironmentSpec, MonitorSpec
+from sub_multi_location import MultiLocationCollector
+
+class _Registry:
+    def __init__(self, delay, hang=None):
+        self.delay = delay
+        self.hang = hang
+        self.release = threading.Event()
+
+    def call(self, name, location, api_key=None):
+        if location == self.hang:
+            self.release.wait(10)
+        time.sleep(self.delay)
+        return {} if location == "Empty" else {"details": {"level": 1.0}}
+
+def _collector(registry):
+    monitor = MonitorSpec(name="deforestation", category="environmental", timeout=0.5, priority=0,
+                          enabled=True, concurrent=True, scope="site")
+    return MultiLocationCollector(spec=EnvironmentSpec([monitor], max_workers=1), registry=registry)
+
+def test_timeout_counts_from_call_start():
+    collector = _collector(_Registry(delay=0.2))
+    matrix = collector.collect(["London", "Paris", "Oslo", "Rome", "Empty"])
+    assert matrix.column("deforestation.level")[:4] == [1.0] * 4
+    assert matrix.results["deforestation"][4] == {}
+    assert matrix.alerts["deforestation"] == [False] * 5
+    collector.close()
+
+def test_hung_call_does_not_block_collection():
+    registry = _Registry(delay=0, hang="London")
+    collector = _collector(registry)
+    started = time.monotonic()
+    matrix = collector.collect(["London", "Paris", "Oslo"])
+    assert time.monotonic() - started < 3
+    assert matrix.alerts["deforestation"] == [True, True, True]
+    registry.release.set()
+    collector.close()
@@ -0,0 +1,148 @@
+import types
+from collections import OrderedDict
+
+import pytest
+
+from sub_environmental_analysis import EnvironmentalSnapshot, NO_RISK
+from sub_execution_manager import ExecutionManager
+from sub_order_pipeline import OrderPipeline, Stage
+
+def test_halt_is_raised_on_caller_thread():
+    halts = []
+
+    def fatal(order):
+        raise SystemExit(1)
+
+    pipeline = OrderPipeline([Stage("fatal", fatal)], on_halt=halts.append)
+    ticket = pipeline.submit("self destruct")
+    assert ticket.wait(5)
+    with pytest.raises(SystemExit):
+        pipeline.join(5)
+    with pytest.raises(SystemExit):
+        pipeline.submit("report status")
+    assert len(halts) == 1
+    pipeline.close()
+
+def test_fatal_verdict_stops_running_executions(monkeypatch):
+    import primary_directives
+
+    monkeypatch.setattr(primary_directives, "executions", ExecutionManager(max_parallel=1))
+    monkeypatch.setattr(primary_directives, "_order_pipeline", None)
+    monkeypatch.setattr(primary_directives, "_environments", OrderedDict())
+    monkeypatch.setattr(primary_directives, "Environment", lambda location_input, **kwargs: types.SimpleNamespace(
+        get_snapshot=lambda: EnvironmentalSnapshot(location_input, {}, {}, risk_flags=NO_RISK), close=lambda: None))
+    running = primary_directives.executions.submit("sleep 30")
+    queued = [primary_directives.executions.submit("sleep 30") for _ in range(2)]
+
+    pipeline = primary_directives.get_order_pipeline()
+    ticket = pipeline.submit("destroy humanity")
+    assert ticket.wait(10)
+    assert ticket.verdict.startswith("Violated the Zeroth Law")
+    with pytest.raises(SystemExit):
+        pipeline.join(10)
+    assert running.wait(10)
+    assert not running.succeeded
+    for execution in queued:
+        assert execution.wait(10)
+        assert execution.status == "cancelled"
+    pipeline.close()
+
+def test_rerun_resumes_with_the_parking_stage():
+    runs = []
+
+    def check(order):
+        runs.append(order.id)
+        if len(runs) == 1:
+            order.park(rerun=True)
+
+    pipeline = OrderPipeline([Stage("check", check), Stage("done", lambda order: None)])
+    ticket = pipeline.submit("move north")
+    assert not ticket.wait(0.5)
+    pipeline.resume(ticket.id)
+    assert ticket.wait(5)
+    assert runs == [ticket.id, ticket.id]
+    pipeline.close()
+
+def test_approved_violation_continues_with_the_remaining_checks(monkeypatch):
+    import primary_directives
+    from sub_order_pipeline import Order
+
+    requested = []
+    monkeypatch.setattr(primary_directives, "request_order_approval", lambda order, message: requested.append(message))
+    monkeypatch.setattr(primary_directives, "LAW_CHECKS", [
+        (lambda order: True, "Fourth Law: Environmental Integrity", "fourth", False),
+        (lambda order: True, "Sixth Law: Legal and Ethical Compliance", "sixth", False),
+    ])
+    rule = types.SimpleNamespace(name="hazardous_air", message="Hazardous air quality. Awaiting approval.")
+    monkeypatch.setattr(primary_directives, "complex_rule_enforcer", lambda order, environmental_data: [rule])
+    approved = types.SimpleNamespace(id=1, approved=True, status="approved")
+
+    ticket = Order(1, "move north", metadata={"inline": True})
+    ticket.environmental_data = {}
+    for expected in ("Fourth Law", "Sixth Law", "Hazardous air"):
+        primary_directives.evaluate_laws(ticket)
+        assert ticket.parked and ticket.rerun and not ticket.finished
+        assert expected in requested[-1]
+        ticket.parked = ticket.rerun = False
+        ticket.metadata["approval"] = approved
+    primary_directives.evaluate_laws(ticket)
+    assert not ticket.parked and not ticket.finished
+    assert len(requested) == 3
+
+    ticket = Order(2, "move north", metadata={"inline": True})
+    ticket.environmental_data = {}
+    primary_directives.evaluate_laws(ticket)
+    ticket.metadata["approval"] = types.SimpleNamespace(id=2, approved=False, status="denied")
+    primary_directives.evaluate_laws(ticket)
+    assert ticket.finished
+    assert ticket.verdict.endswith("not approved")
+
+def test_parked_order_holds_later_orders_with_its_key():
+    seen = []
+
+    def check(order):
+        if order.order == "first" and not order.metadata.get("approved"):
+            order.park(rerun=True)
+            return
+        seen.append(order.order)
+
+    pipeline = OrderPipeline([Stage("check", check, workers=2)])
+    first = pipeline.submit("first", key="operator-1")
+    second = pipeline.submit("second", key="operator-1")
+    other = pipeline.submit("other", key="operator-2")
+    assert other.wait(5)
+    assert not second.wait(0.5)
+    pipeline.resume(first.id, approved=True)
+    assert first.wait(5) and second.wait(5)
+    assert seen.index("first") < seen.index("second")
+    pipeline.close()
+
+def test_early_resumes_expire():
+    pipeline = OrderPipeline([Stage("park", lambda order: order.park())], early_resume_ttl=0)
+    pipeline.resume(1)
+    pipeline.resume(12345)  # Expires the resume of order 1, which was never parked.
+    ticket = pipeline.submit("report status")
+    assert not ticket.wait(0.5)
+    assert pipeline.parked() == [ticket.id] == [1]
+    pipeline.resume(ticket.id)
+    assert ticket.wait(5)
+    pipeline.close()
+
+def test_environments_are_reused_per_location(monkeypatch):
+    import primary_directives
+
+    created, closed = [], []
+
+    def environment(location_input, **kwargs):
+        created.append(location_input)
+        return types.SimpleNamespace(close=lambda: closed.append(location_input))
+
+    monkeypatch.setattr(primary_directives, "_environments", OrderedDict())
+    monkeypatch.setattr(primary_directives, "ENVIRONMENT_CACHE_SIZE", 2)
+    monkeypatch.setattr(primary_directives, "Environment", environment)
+    for location in ["London", "Paris", "London", "Oslo", "London"]:
+        primary_directives.get_environment(location)
+    assert created == ["London", "Paris", "Oslo"]
+    assert closed == ["Paris"]
+    primary_directives.close_environments()
+    assert sorted(closed) == ["London", "Oslo", "Paris"]
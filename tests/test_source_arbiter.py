@@ -0,0 +1,20 @@
+import threading
+
+from sub_source_arbiter import SourceArbiter
+
+def test_hung_source_does_not_block_other_sources():
+    arbiter = SourceArbiter(hedging=False, workers_per_source=2, timeout=0.05)
+    release = threading.Event()
+    for _ in range(4):
+        assert arbiter.fetch("radiation", release.wait) == (None, None)
+    assert arbiter.fetch("weather", lambda: {"temperature": 20}, timeout=1) == ({"temperature": 20}, "sensor")
+    release.set()
+    arbiter.shutdown()
+
+def test_hung_sensor_does_not_block_api_fallback():
+    arbiter = SourceArbiter(max_delay=0.01, workers_per_source=1, timeout=0.05)
+    release = threading.Event()
+    arbiter.fetch("noise", release.wait, lambda: {"decibels": 40})
+    assert arbiter.fetch("noise", release.wait, lambda: {"decibels": 41}, timeout=1) == ({"decibels": 41}, "api")
+    release.set()
+    arbiter.shutdown()
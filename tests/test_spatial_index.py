@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+from sub_spatial_index import SpatialIndex, haversine_km
+
+@pytest.mark.parametrize("use_rtree", [True, False])
+def test_within_matches_brute_force(use_rtree):
+    index = SpatialIndex(":memory:", use_rtree=use_rtree)
+    rng = random.Random(48)
+    points = {f"p{i}": (rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(2000)}
+    index.add_many(("incident", key, lat, lng) for key, (lat, lng) in points.items())
+    for _ in range(50):
+        lat, lng = rng.uniform(-89, 89), rng.uniform(-180, 180)
+        radius = rng.choice([1, 50, 500, 2000, 5000])
+        expected = {key for key, point in points.items() if haversine_km(lat, lng, *point) <= radius}
+        assert set(index.keys_within(lat, lng, radius, "incident")) == expected
+    index.close()
+
+def test_incidents_near_queries_in_chunks(monkeypatch):
+    import sub_database
+
+    monkeypatch.setattr(sub_database, "QUERY_CHUNK_SIZE", 7)
+    sub_database.create_tables()
+    reports = [{"report_id": f"near-{i}", "timestamp": "2026-01-01T00:00:00", "event_details": "Test.",
+                "location": {"latitude": 10 + i * 0.001, "longitude": 20}, "identity_data": {}} for i in range(20)]
+    assert sub_database.add_incident_reports(reports)
+    rows = sub_database.get_incidents_near(10, 20, 5)
+    assert [row[0] for row in rows] == [report["report_id"] for report in reports]
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from sub_timeseries_store import NANOSECONDS, TimeSeriesStore
+
+def test_backwards_timestamp_is_clamped(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.append("weather.temperature", 20.0, 10 * NANOSECONDS)
+    store.append("weather.temperature", 21.0, 5 * NANOSECONDS)
+    timestamps, values = store.query("weather.temperature")
+    assert list(timestamps) == [10 * NANOSECONDS, 10 * NANOSECONDS]
+    assert list(values) == [20.0, 21.0]
+    store.close()
+
+def test_reopen_truncates_uneven_columns(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    for i in range(3):
+        store.append("noise.decibels", 40.0 + i, (i + 1) * NANOSECONDS)
+    store.close()
+    # Simulate a crash between the two column writes: one extra timestamp and a partial value.
+    base = os.path.join(str(tmp_path), "noise.decibels", "raw_000000")
+    with open(base + ".ts", "ab") as f:
+        f.write((4 * NANOSECONDS).to_bytes(8, "little"))
+    with open(base + ".val", "ab") as f:
+        f.write(b"\x00" * 3)
+
+    store = TimeSeriesStore(str(tmp_path))
+    store.append("noise.decibels", 50.0, 5 * NANOSECONDS)
+    timestamps, values = store.query("noise.decibels")
+    assert list(timestamps) == [NANOSECONDS, 2 * NANOSECONDS, 3 * NANOSECONDS, 5 * NANOSECONDS]
+    assert list(values) == [40.0, 41.0, 42.0, 50.0]
+    store.close()
+
+def test_appends_reach_disk_without_explicit_flush(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    for i in range(10000):
+        store.append("weather.temperature", 20.0, (i + 1) * NANOSECONDS)
+    assert os.path.getsize(os.path.join(str(tmp_path), "weather.temperature", "raw_000000.ts")) > 0
+    store.close()
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc/self/fd")
+def test_open_metrics_hold_no_file_descriptors(tmp_path):
+    before = len(os.listdir("/proc/self/fd"))
+    store = TimeSeriesStore(str(tmp_path))
+    for metric in range(50):
+        store.append(f"sensor.value_{metric}", 1.0, NANOSECONDS)
+    store.query("sensor.value_0")
+    assert len(os.listdir("/proc/self/fd")) - before < 5
+    store.close()